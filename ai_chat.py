@@ -1439,7 +1439,7 @@ class AiChat:
                 code = code_info.get('code', '')
                 
                 # Получаем текущее содержимое редактора
-                text = self.parent.code_editor.get("1.0", tk.END)
+                text = self.parent.document.text()
                 lines = text.split("\n")
                 
                 # Проверяем валидность номера строки
@@ -1460,7 +1460,7 @@ class AiChat:
                 code = code_info.get('code', '')
                 
                 # Получаем текущее содержимое редактора
-                text = self.parent.code_editor.get("1.0", tk.END)
+                text = self.parent.document.text()
                 lines = text.split("\n")
                 
                 # Проверяем валидность номеров строк
@@ -0,0 +1,714 @@
+"""
+Модуль индекса скобок и отступов для редактора кода.
+
+Для каждой строки хранятся компактные массивы: колонки скобок, их символы
+и уровни вложенности относительно начала строки, ширина отступа и
+многострочный литерал, открытый на конце строки. Правки приходят дельтами
+(apply_edit), и заново сканируются только изменённые строки - и строки
+после них, пока состояние литерала на конце строки не совпадёт с прежним.
+Глубина вложенности на начало любой строки и поиск парной скобки
+вычисляются по блочному дереву отрезков над строками за O(log n), поэтому
+подсветка парных скобок, радужные скобки и направляющие отступов для
+видимой области не зависят от размера файла.
+"""
+
+import re
+import tkinter as tk
+from array import array
+
+import fenwick
+from edit_tracker import changed_rows
+from syntax_highlighter import diff_lines
+from editor_views import visible_windows, window_segments
+from syntax_tokenizer import apply_ranges
+
+OPEN_BRACKETS = "([{"
+CLOSE_BRACKETS = ")]}"
+PAIRS = {"(": ")", "[": "]", "{": "}"}
+
+# Начало однострочного комментария по расширению файла
+COMMENT_PREFIXES = {
+    ".py": "#",
+    ".sh": "#",
+    ".rb": "#",
+    ".yaml": "#",
+    ".yml": "#",
+    ".toml": "#",
+}
+DEFAULT_COMMENT_PREFIX = "//"
+
+# Многострочные литералы по расширению файла: (открывающий разделитель,
+# выражение для остатка литерала до закрывающего разделителя включительно)
+_TRIPLE_QUOTES = (('"""', r'(?:[^\\]|\\.)*?"""'), ("'''", r"(?:[^\\]|\\.)*?'''"))
+MULTILINE_LITERALS = {
+    ".py": _TRIPLE_QUOTES,
+    ".toml": _TRIPLE_QUOTES,
+    ".sh": (),
+    ".rb": (),
+    ".yaml": (),
+    ".yml": (),
+}
+DEFAULT_MULTILINE_LITERALS = (("/*", r".*?\*/"),)
+
+# Количество цветов радужных скобок
+RAINBOW_DEPTH = 3
+
+
+def scan_line(line, bracket_re, closers=(), state=0):
+    """
+    Находит скобки в строке кода, пропуская строковые литералы и комментарии.
+
+    Args:
+        line: строка кода
+        bracket_re: выражение скобок, литералов и комментариев (BracketIndex.set_filetype)
+        closers: выражения закрывающих разделителей многострочных литералов
+        state: литерал, открытый на начало строки (номер в closers с единицы, 0 - нет)
+
+    Returns:
+        Кортеж (cols, kinds, levels, net, low, state): колонки скобок, их символы,
+        уровни вложенности относительно начала строки (у открывающей - уровень
+        до неё, у закрывающей - после неё, так что парные скобки имеют один
+        уровень), итоговое изменение глубины, минимальная глубина в строке и
+        литерал, открытый на конце строки
+    """
+    cols = array("I")
+    kinds = []
+    levels = array("i")
+    depth = low = 0
+    pos = 0
+    if state:
+        # Строка начинается внутри литерала: скобки ищутся после его конца
+        closed = closers[state - 1].match(line)
+        if closed is None:
+            return cols, "", levels, 0, 0, state
+        pos = closed.end()
+        state = 0
+    length = len(line)
+    search = bracket_re.search
+    while pos < length:
+        match = search(line, pos)
+        if match is None:
+            break
+        pos = match.end()
+        group = match.lastgroup
+        if group != "bracket":
+            if group:
+                # Открыт многострочный литерал (группа literal<номер>): ищем его конец в той же строке
+                number = int(group[len("literal"):])
+                closed = closers[number].match(line, pos)
+                if closed is None:
+                    state = number + 1
+                    break
+                pos = closed.end()
+            continue
+        char = match.group()
+        if char in OPEN_BRACKETS:
+            levels.append(depth)
+            depth += 1
+        else:
+            depth -= 1
+            levels.append(depth)
+            if depth < low:
+                low = depth
+        cols.append(match.start())
+        kinds.append(char)
+    return cols, "".join(kinds), levels, depth, low, state
+
+
+def indent_width(line):
+    """Возвращает ширину отступа строки в символах (-1 для пустой строки)"""
+    stripped = len(line.lstrip(" \t"))
+    return len(line) - stripped if stripped else -1
+
+
+class _DepthTree:
+    """
+    Дерево отрезков над парами (изменение глубины, минимальная глубина
+    относительно начала элемента): элементами служат строки блока или блоки
+    индекса. Глубины в запросах отсчитываются от переданной глубины на
+    границе, поэтому деревья блоков не зависят от строк перед блоком.
+    """
+
+    def __init__(self, net, low):
+        """
+        Args:
+            net: array("i") изменений глубины элементов
+            low: array("i") минимальных глубин элементов
+        """
+        total = len(net)
+        size = 1
+        while size < total:
+            size *= 2
+        tree_sum = array("i", bytes(8 * size))
+        tree_min = array("i", bytes(8 * size))
+        tree_sum[size:size + total] = net
+        tree_min[size:size + total] = low
+        for node in range(size - 1, 0, -1):
+            left = 2 * node
+            left_sum = tree_sum[left]
+            tree_sum[node] = left_sum + tree_sum[left + 1]
+            right_min = left_sum + tree_min[left + 1]
+            left_min = tree_min[left]
+            tree_min[node] = left_min if left_min < right_min else right_min
+        self.count = total
+        self.size = size
+        self.sum = tree_sum
+        self.min = tree_min
+
+    @property
+    def net(self):
+        """Изменение глубины на всех элементах"""
+        return self.sum[1]
+
+    @property
+    def low(self):
+        """Минимальная глубина на всех элементах"""
+        return self.min[1]
+
+    def update(self, item, net, low):
+        """Обновляет лист элемента item и его предков"""
+        tree_sum, tree_min = self.sum, self.min
+        node = self.size + item
+        tree_sum[node] = net
+        tree_min[node] = low
+        node //= 2
+        while node:
+            left = 2 * node
+            tree_sum[node] = tree_sum[left] + tree_sum[left + 1]
+            tree_min[node] = min(tree_min[left], tree_sum[left] + tree_min[left + 1])
+            node //= 2
+
+    def prefix(self, item):
+        """Изменение глубины на элементах [0, item)"""
+        total = 0
+        low = self.size
+        high = self.size + min(item, self.count)
+        tree_sum = self.sum
+        while low < high:
+            if low & 1:
+                total += tree_sum[low]
+                low += 1
+            if high & 1:
+                high -= 1
+                total += tree_sum[high]
+            low //= 2
+            high //= 2
+        return total
+
+    def _cover(self, low, high):
+        """Возвращает узлы дерева, покрывающие элементы [low, high), слева направо"""
+        left_nodes = []
+        right_nodes = []
+        low += self.size
+        high += self.size
+        while low < high:
+            if low & 1:
+                left_nodes.append(low)
+                low += 1
+            if high & 1:
+                high -= 1
+                right_nodes.append(high)
+            low //= 2
+            high //= 2
+        return left_nodes + right_nodes[::-1]
+
+    def first_drop(self, start, depth, target):
+        """
+        Первый элемент не раньше start, где глубина опускается до target.
+
+        Args:
+            depth: глубина на начало элемента start
+
+        Returns:
+            (элемент, глубина на его начало) или None
+        """
+        tree_sum, tree_min = self.sum, self.min
+        for node in self._cover(start, self.count):
+            if depth + tree_min[node] > target:
+                depth += tree_sum[node]
+                continue
+            while node < self.size:
+                node *= 2
+                if depth + tree_min[node] > target:
+                    depth += tree_sum[node]
+                    node += 1
+            return node - self.size, depth
+        return None
+
+    def last_drop(self, stop, depth, target):
+        """
+        Последний элемент раньше stop, где глубина опускается до target.
+
+        Args:
+            depth: глубина на начало элемента stop
+
+        Returns:
+            (элемент, глубина на его начало) или None
+        """
+        tree_sum, tree_min = self.sum, self.min
+        for node in reversed(self._cover(0, stop)):
+            start = depth - tree_sum[node]
+            if start + tree_min[node] > target:
+                depth = start
+                continue
+            while node < self.size:
+                node *= 2
+                right_start = start + tree_sum[node]
+                if right_start + tree_min[node + 1] <= target:
+                    node += 1
+                    start = right_start
+            return node - self.size, start
+        return None
+
+
+class BracketIndex:
+    """
+    Инкрементальный индекс скобок и направляющих отступов для виджета tk.Text.
+
+    Деревья отрезков хранят для каждой строки пару (изменение глубины,
+    минимальная глубина относительно начала строки): строки разбиты на блоки
+    по BLOCK_LINES со своими деревьями, над блоками - ещё одно дерево. Правка
+    внутри строк обновляет листья точечно, вставка и удаление строк
+    перестраивают только затронутые блоки, а дерево над блоками - лишь когда
+    блоки делятся или сливаются.
+    """
+
+    # Количество строк, размечаемых сверх видимой области
+    VIEWPORT_MARGIN = 20
+    # Примерное число строк в блоке дерева отрезков
+    BLOCK_LINES = 256
+
+    def __init__(self, text_widget, tab_size=4):
+        """
+        Args:
+            text_widget: виджет tk.Text
+            tab_size: ширина уровня отступа в пробелах
+        """
+        self.text = text_widget
+        self.tab_size = tab_size
+        self.enabled = True
+        self.column_limit = None  # Скобки правее этой колонки не размечаются
+        self.document = None      # Модель документа, из которой берутся строки (None - из виджета)
+        self.folds = None         # FoldManager: свёрнутые строки не размечаются
+        self.views = [text_widget] # Окна, показывающие буфер (виджет и его двойники)
+        self.lines = []
+        self.cols = []            # array("I") колонок скобок каждой строки
+        self.kinds = []           # Строка символов скобок каждой строки
+        self.levels = []          # array("i") относительных уровней скобок
+        self.net = array("i")     # Изменение глубины на строке
+        self.low = array("i")     # Минимальная глубина в строке относительно её начала
+        self.indents = array("i") # Ширина отступа (-1 - пустая строка)
+        self.states = array("b")  # Многострочный литерал, открытый на конце строки (см. scan_line)
+        self._lines_owned = False  # self.lines можно изменять на месте (не общий список документа)
+        self._blocks = []         # _DepthTree строк каждого блока
+        self._top = None          # _DepthTree над блоками
+        self._counts = None       # Дерево Фенвика числа строк в блоках
+        self._render_job = None
+        self._match = ()
+        self._bracket_re = None
+        self._closers = ()
+        self.set_filetype(".py")
+
+    def set_filetype(self, extension):
+        """Выбирает синтаксис комментариев и многострочных литералов по расширению файла"""
+        extension = extension or ".py"
+        prefix = COMMENT_PREFIXES.get(extension, DEFAULT_COMMENT_PREFIX)
+        literals = MULTILINE_LITERALS.get(extension, DEFAULT_MULTILINE_LITERALS)
+        openers = "".join(f"(?P<literal{number}>{re.escape(opener)})|"
+                          for number, (opener, _) in enumerate(literals))
+        bracket_re = re.compile(
+            r"""{}.*|{}"(?:[^"\\]|\\.)*"?|'(?:[^'\\]|\\.)*'?|(?P<bracket>[()\[\]{{}}])""".format(
+                re.escape(prefix), openers))
+        if self._bracket_re is not None and bracket_re.pattern == self._bracket_re.pattern:
+            return
+        self._bracket_re = bracket_re
+        self._closers = tuple(re.compile(closer) for _, closer in literals)
+        self.invalidate()
+
+    def invalidate(self):
+        """Сбрасывает индекс, следующее обновление отсканирует текст заново"""
+        self.lines = []
+        self.cols = []
+        self.kinds = []
+        self.levels = []
+        self.net = array("i")
+        self.low = array("i")
+        self.indents = array("i")
+        self.states = array("b")
+        self._rebuild_tree()
+
+    def snapshot(self):
+        """
+        Возвращает состояние индекса для последующего restore (например, при
+        переключении буферов). Массивы не копируются, поэтому до следующего
+        update индекс нужно сбросить через invalidate или restore.
+        """
+        self._lines_owned = False
+        return (self._bracket_re, self._closers, self.lines, self.cols, self.kinds, self.levels,
+                self.net, self.low, self.indents, self.states)
+
+    def restore(self, state):
+        """Подставляет состояние, полученное от snapshot"""
+        (self._bracket_re, self._closers, self.lines, self.cols, self.kinds, self.levels,
+         self.net, self.low, self.indents, self.states) = state
+        self._lines_owned = False
+        self._match = ()
+        self._rebuild_tree()
+
+    def clear(self):
+        """Удаляет разметку скобок и направляющих из виджета"""
+        for tag in self.tags():
+            self.text.tag_remove(tag, "1.0", tk.END)
+        self._match = ()
+
+    @staticmethod
+    def tags():
+        """Теги, которые ставит индекс"""
+        return tuple(f"bracket_{level}" for level in range(RAINBOW_DEPTH)) + (
+            "bracket_match", "bracket_mismatch", "indent_guide")
+
+    def update(self):
+        """
+        Читает текст, если индекс пуст, или учитывает изменения сравнением строк,
+        если правки не передаются через apply_edit (document = None).
+        """
+        if not self.enabled:
+            return
+        if self.document is not None:
+            if self.lines:
+                return  # Правки уже учтены apply_edit
+            lines = self.document.lines()
+        else:
+            lines = self.text.get("1.0", "end-1c").split("\n")
+        change = diff_lines(self.lines, lines)
+        if change is None:
+            return
+        first, old_end, new_end = change
+        self.lines = lines
+        self._lines_owned = False
+        self._replace_rows(first, old_end, new_end, lines[first:new_end])
+
+    def apply_edit(self, start, end, text):
+        """
+        Переносит правку документа в индекс, заново сканируя только затронутые строки.
+
+        Args:
+            start: начало заменённого текста (строка, колонка с нуля; позиция до правки),
+                None - текст заменён целиком
+            end: конец заменённого текста
+            text: вставленный текст
+        """
+        if self.document is None or not self.lines:
+            return  # Индекс пуст: текст будет прочитан целиком при update
+        if start is None:
+            self.invalidate()
+            return
+        first, old_end, new_end = changed_rows(start, end, text)
+        new_lines = self.document.lines(first, new_end)
+        if not self._lines_owned:
+            self.lines = list(self.lines)
+            self._lines_owned = True
+        self.lines[first:old_end] = new_lines
+        self._replace_rows(first, old_end, new_end, new_lines)
+
+    def _replace_rows(self, first, old_end, new_end, new_lines):
+        """
+        Сканирует строки new_lines, заменившие строки [first, old_end) (self.lines
+        уже содержит новые строки), и строки после них, если на конце изменённых
+        строк открылся или закрылся многострочный литерал.
+        """
+        bracket_re, closers = self._bracket_re, self._closers
+        state = self.states[first - 1] if first else 0
+        entering = self.states[old_end - 1] if old_end else 0  # Прежнее состояние на начало строки new_end
+        scanned = []
+        for line in new_lines:
+            item = scan_line(line, bracket_re, closers, state)
+            state = item[5]
+            scanned.append(item)
+        self.cols[first:old_end] = [item[0] for item in scanned]
+        self.kinds[first:old_end] = [item[1] for item in scanned]
+        self.levels[first:old_end] = [item[2] for item in scanned]
+        self.net[first:old_end] = array("i", [item[3] for item in scanned])
+        self.low[first:old_end] = array("i", [item[4] for item in scanned])
+        self.indents[first:old_end] = array("i", [indent_width(line) for line in new_lines])
+        self.states[first:old_end] = array("b", [item[5] for item in scanned])
+        self._splice_tree(first, old_end, new_end)
+
+        # Строки ниже пересканируются, пока состояние на их начало отличается от прежнего
+        row = new_end
+        total = len(self.lines)
+        while state != entering and row < total:
+            entering = self.states[row]
+            cols, kinds, levels, net, low, state = scan_line(self.lines[row], bracket_re, closers, state)
+            self.cols[row] = cols
+            self.kinds[row] = kinds
+            self.levels[row] = levels
+            self.net[row] = net
+            self.low[row] = low
+            self.states[row] = state
+            self._update_row(row)
+            row += 1
+
+    # --- Деревья отрезков над строками ---
+
+    def _rebuild_tree(self):
+        """Делит строки на блоки и строит деревья блоков и дерево над блоками"""
+        size = self.BLOCK_LINES
+        total = len(self.net)
+        self._blocks = [_DepthTree(self.net[low:low + size], self.low[low:low + size])
+                        for low in range(0, total, size)] or [_DepthTree(array("i"), array("i"))]
+        self._rebuild_top()
+
+    def _rebuild_top(self):
+        """Строит дерево над блоками после изменения их числа"""
+        blocks = self._blocks
+        self._top = _DepthTree(array("i", [block.net for block in blocks]),
+                               array("i", [block.low for block in blocks]))
+        self._counts = fenwick.build([block.count for block in blocks])
+
+    def _locate(self, row):
+        """Номер блока строки row и её номер в блоке"""
+        block, offset = fenwick.search(self._counts, row)
+        if block == len(self._blocks):
+            # Строка за последней: конец последнего блока
+            block -= 1
+            offset += self._blocks[block].count
+        return block, offset
+
+    def _block_start(self, block):
+        """Первая строка блока"""
+        return fenwick.prefix(self._counts, block)
+
+    def _update_row(self, row):
+        """Обновляет лист строки row в дереве её блока и лист блока в дереве над блоками"""
+        block, offset = self._locate(row)
+        tree = self._blocks[block]
+        tree.update(offset, self.net[row], self.low[row])
+        self._top.update(block, tree.net, tree.low)
+
+    def _splice_tree(self, first, old_end, new_end):
+        """Переносит в деревья замену строк [first, old_end) строками [first, new_end)"""
+        if old_end == new_end:
+            for row in range(first, new_end):
+                self._update_row(row)
+            return
+        low_block, _ = self._locate(first)
+        high_block = self._locate(old_end - 1)[0] + 1 if old_end > first else low_block + 1
+        start = self._block_start(low_block)
+        stop = self._block_start(high_block) + new_end - old_end
+        size = self.BLOCK_LINES
+        # Маленький блок сливается со следующим, чтобы блоков не становилось больше нужного
+        if stop - start < size // 4 and high_block < len(self._blocks):
+            stop += self._blocks[high_block].count
+            high_block += 1
+        step = size if stop - start > 2 * size else max(stop - start, 1)
+        blocks = [_DepthTree(self.net[low:min(low + step, stop)], self.low[low:min(low + step, stop)])
+                  for low in range(start, stop, step)]
+        if not blocks and high_block - low_block == len(self._blocks):
+            blocks = [_DepthTree(array("i"), array("i"))]
+        if len(blocks) == 1 and high_block - low_block == 1:
+            # Число блоков не изменилось: обновляются только листья блока
+            self._blocks[low_block] = blocks[0]
+            self._top.update(low_block, blocks[0].net, blocks[0].low)
+            fenwick.increase(self._counts, low_block, new_end - old_end)
+            return
+        self._blocks[low_block:high_block] = blocks
+        self._rebuild_top()
+
+    def depth_at(self, row):
+        """Возвращает глубину вложенности скобок на начало строки row (с нуля)"""
+        block, offset = self._locate(min(row, len(self.net)))
+        return self._top.prefix(block) + self._blocks[block].prefix(offset)
+
+    def _first_drop(self, start, target):
+        """Первая строка не раньше start, где глубина опускается до target"""
+        block, offset = self._locate(start)
+        tree = self._blocks[block]
+        depth = self._top.prefix(block)
+        found = tree.first_drop(offset, depth + tree.prefix(offset), target)
+        if found is None:
+            found = self._top.first_drop(block + 1, depth + tree.net, target)
+            if found is None:
+                return None
+            block, depth = found
+            found = self._blocks[block].first_drop(0, depth, target)
+        row, depth = found
+        return self._block_start(block) + row, depth
+
+    def _last_drop(self, stop, target):
+        """Последняя строка раньше stop, где глубина опускается до target"""
+        block, offset = self._locate(stop)
+        tree = self._blocks[block]
+        depth = self._top.prefix(block)
+        found = tree.last_drop(offset, depth + tree.prefix(offset), target)
+        if found is None:
+            found = self._top.last_drop(block, depth, target)
+            if found is None:
+                return None
+            block, depth = found
+            tree = self._blocks[block]
+            found = tree.last_drop(tree.count, depth + tree.net, target)
+        row, depth = found
+        return self._block_start(block) + row, depth
+
+    # --- Запросы ---
+
+    def bracket_at(self, row, col):
+        """Возвращает номер скобки строки row, стоящей в колонке col, или None"""
+        if row >= len(self.cols):
+            return None
+        cols = self.cols[row]
+        low, high = 0, len(cols)
+        while low < high:
+            middle = (low + high) // 2
+            if cols[middle] < col:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(cols) and cols[low] == col:
+            return low
+        return None
+
+    def find_match(self, row, col):
+        """
+        Находит скобку, парную скобке в позиции (row, col), строки с нуля.
+
+        Returns:
+            Кортеж (строка, колонка, совпадает ли вид скобки) или None
+        """
+        number = self.bracket_at(row, col)
+        if number is None:
+            return None
+        char = self.kinds[row][number]
+        level = self.levels[row][number]
+        if char in OPEN_BRACKETS:
+            found = self._scan_forward(row, number + 1, level)
+            if found is None:
+                drop = self._first_drop(row + 1, self.depth_at(row) + level)
+                if drop is None:
+                    return None
+                line_no, depth = drop
+                found = self._scan_forward(line_no, 0, self.depth_at(row) + level - depth)
+            expected = PAIRS[char]
+        else:
+            found = self._scan_backward(row, number - 1, level)
+            if found is None:
+                drop = self._last_drop(row, self.depth_at(row) + level)
+                if drop is None:
+                    return None
+                line_no, depth = drop
+                found = self._scan_backward(line_no, len(self.cols[line_no]) - 1,
+                                            self.depth_at(row) + level - depth)
+            expected = next(key for key, value in PAIRS.items() if value == char)
+        if found is None:
+            return None
+        line_no, number = found
+        return line_no, self.cols[line_no][number], self.kinds[line_no][number] == expected
+
+    def _scan_forward(self, row, number, level):
+        """Ищет в строке row закрывающую скобку уровня level, начиная с номера number"""
+        levels = self.levels[row]
+        kinds = self.kinds[row]
+        for index in range(number, len(levels)):
+            if levels[index] == level and kinds[index] in CLOSE_BRACKETS:
+                return row, index
+            if levels[index] < level:
+                return None
+        return None
+
+    def _scan_backward(self, row, number, level):
+        """Ищет в строке row открывающую скобку уровня level, двигаясь назад от номера number"""
+        levels = self.levels[row]
+        kinds = self.kinds[row]
+        for index in range(number, -1, -1):
+            if levels[index] == level and kinds[index] in OPEN_BRACKETS:
+                return row, index
+            if levels[index] < level:
+                return None
+        return None
+
+    def guide_columns(self, row):
+        """Возвращает колонки направляющих отступа строки row"""
+        indent = self.indents[row] if row < len(self.indents) else -1
+        if indent <= 0:
+            return range(0)
+        step = 1 if self.lines[row].startswith("\t") else self.tab_size
+        return range(0, indent, step)
+
+    # --- Разметка виджета ---
+
+    def schedule_render(self):
+        """Откладывает разметку видимой области до простоя цикла событий"""
+        if self._render_job is None:
+            self._render_job = self.text.after_idle(self._run_scheduled_render)
+
+    def _run_scheduled_render(self):
+        self._render_job = None
+        self.render()
+
+    def render(self):
+        """Размечает радужные скобки и направляющие отступов в видимой области"""
+        if not self.enabled or not self.lines:
+            return
+        windows = visible_windows(self.views, self.VIEWPORT_MARGIN, len(self.lines))
+
+        ranges = {tag: [] for tag in self.tags()[:RAINBOW_DEPTH]}
+        ranges["indent_guide"] = guides = []
+        limit = self.column_limit
+        segments = window_segments(windows, self.folds)
+        for low, high in segments:
+            depth = self.depth_at(low)
+            for row in range(low, high):
+                line_no = row + 1
+                for col, level in zip(self.cols[row], self.levels[row]):
+                    if limit and col >= limit:
+                        break
+                    indices = ranges[f"bracket_{(depth + level) % RAINBOW_DEPTH}"]
+                    indices.extend((f"{line_no}.{col}", f"{line_no}.{col + 1}"))
+                depth += self.net[row]
+                for col in self.guide_columns(row):
+                    guides.extend((f"{line_no}.{col}", f"{line_no}.{col + 1}"))
+
+        for tag in ranges:
+            self.text.tag_remove(tag, "1.0", tk.END)
+        apply_ranges(self.text, ranges)
+
+    def highlight_match(self, index=tk.INSERT):
+        """Подсвечивает скобку у курсора (справа или слева от него) и парную ей"""
+        for tag in ("bracket_match", "bracket_mismatch"):
+            self.text.tag_remove(tag, "1.0", tk.END)
+        self._match = ()
+        if not self.enabled:
+            return
+        row, col = map(int, self.text.index(index).split("."))
+        for candidate in (col, col - 1):
+            if candidate < 0 or self.bracket_at(row - 1, candidate) is None:
+                continue
+            found = self.find_match(row - 1, candidate)
+            if found is None:
+                # Скобка без пары
+                self.text.tag_add("bracket_mismatch", f"{row}.{candidate}")
+                return
+            match_row, match_col, same_kind = found
+            tag = "bracket_match" if same_kind else "bracket_mismatch"
+            self.text.tag_add(tag, f"{row}.{candidate}")
+            self.text.tag_add(tag, f"{match_row + 1}.{match_col}")
+            self._match = ((row, candidate), (match_row + 1, match_col))
+            return
+
+    def jump_to_match(self, view=None):
+        """
+        Переносит курсор к скобке, парной скобке у курсора.
+
+        Args:
+            view: окно, курсор которого переносится (по умолчанию основной виджет)
+        """
+        view = view or self.text
+        self.highlight_match(view.index(tk.INSERT))
+        if not self._match:
+            return False
+        match_row, match_col = self._match[1]
+        view.mark_set(tk.INSERT, f"{match_row}.{match_col}")
+        view.see(tk.INSERT)
+        self.highlight_match(view.index(tk.INSERT))
+        return True
@@ -0,0 +1,150 @@
+"""
+Модуль открытых буферов редактора.
+
+В виджете tk.Text находится только активный буфер. Неактивные буферы
+хранятся как снимки: текст, позиция курсора и прокрутки, состояние
+подсветки и индекса скобок, история отмены, поэтому переключение не требует ни чтения
+файла, ни повторного разбора. Когда неактивные буферы занимают больше
+заданного объёма памяти, давно не использовавшиеся сжимаются zlib,
+а их кэши разбора отбрасываются.
+"""
+
+import zlib
+from collections import OrderedDict
+
+
+class Buffer:
+    """Снимок неактивного буфера"""
+
+    def __init__(self, path, text, cursor="1.0", yview=0.0, highlight=None, brackets=None,
+                 modified=False, long_lines=False, plain_text=False, undo=None, recovery=None):
+        """
+        Args:
+            path: путь к файлу буфера
+            text: текст буфера (None - буфер нужно перечитать с диска)
+            cursor: позиция курсора (индекс Tk)
+            yview: доля прокрутки по вертикали
+            highlight: состояние подсветчика (IncrementalHighlighter.snapshot)
+            brackets: состояние индекса скобок (BracketIndex.snapshot)
+            modified: есть несохранённые изменения
+            long_lines: буфер открыт в защищённом режиме длинных строк
+            plain_text: буфер показывается без подсветки синтаксиса
+            undo: история отмены буфера (UndoHistory)
+            recovery: журнал восстановления буфера (RecoveryJournal)
+        """
+        self.path = path
+        self._text = text
+        self._compressed = None
+        self.cursor = cursor
+        self.yview = yview
+        self.highlight = highlight
+        self.brackets = brackets
+        self.modified = modified
+        self.long_lines = long_lines
+        self.plain_text = plain_text
+        self.undo = undo
+        self.recovery = recovery
+
+    @property
+    def compressed(self):
+        return self._compressed is not None
+
+    @property
+    def unloaded(self):
+        """Текст не хранится, буфер нужно перечитать с диска"""
+        return self._text is None and self._compressed is None
+
+    @property
+    def resident(self):
+        """Количество символов текста, хранящихся в несжатом виде"""
+        return len(self._text) if self._text is not None else 0
+
+    def text(self):
+        """Текст буфера (сжатый буфер распаковывается)"""
+        if self._compressed is not None:
+            return zlib.decompress(self._compressed).decode("utf-8", errors="surrogatepass")
+        return self._text
+
+    def compress(self):
+        """Сжимает текст, отбрасывает кэши разбора и вытесняет историю отмены в журнал"""
+        if self._text is None or self._compressed is not None:
+            return
+        self._compressed = zlib.compress(self._text.encode("utf-8", errors="surrogatepass"), 1)
+        self._text = None
+        self.highlight = None
+        self.brackets = None
+        if self.undo is not None:
+            self.undo.spill()
+
+
+class BufferManager:
+    """Открытые буферы: активный и снимки неактивных в порядке использования"""
+
+    def __init__(self, memory_cap=64 * 1024 * 1024):
+        """
+        Args:
+            memory_cap: сколько символов текста неактивных буферов хранится несжатым
+        """
+        self.memory_cap = memory_cap
+        self.opened = []                # Пути открытых буферов в порядке открытия
+        self.snapshots = OrderedDict()  # Путь -> Buffer, последний - использованный последним
+        self.active = None              # Путь буфера, находящегося в виджете
+
+    def __contains__(self, path):
+        return path in self.opened
+
+    def get(self, path):
+        return self.snapshots.get(path)
+
+    def activate(self, path):
+        """
+        Делает буфер активным (его содержимое переносится в виджет).
+
+        Returns:
+            Снимок буфера или None, если буфер открывается впервые
+        """
+        if path not in self.opened:
+            self.opened.append(path)
+        self.active = path
+        return self.snapshots.pop(path, None)
+
+    def store(self, buffer):
+        """Сохраняет снимок буфера, покидающего виджет, и ограничивает память"""
+        if buffer.path not in self.opened:
+            self.opened.append(buffer.path)
+        self.snapshots[buffer.path] = buffer
+        self.snapshots.move_to_end(buffer.path)
+        if self.active == buffer.path:
+            self.active = None
+        self.enforce_cap()
+
+    def close(self, path):
+        """Закрывает буфер"""
+        if path in self.opened:
+            self.opened.remove(path)
+        self.snapshots.pop(path, None)
+        if self.active == path:
+            self.active = None
+
+    def rename(self, old_path, new_path):
+        """Переименовывает активный буфер (сохранение под другим именем)"""
+        if new_path in self.opened and new_path != old_path:
+            self.close(new_path)
+        if old_path in self.opened:
+            self.opened[self.opened.index(old_path)] = new_path
+        else:
+            self.opened.append(new_path)
+        self.active = new_path
+
+    def recent(self):
+        """Путь неактивного буфера, использованного последним"""
+        return next(reversed(self.snapshots), None)
+
+    def enforce_cap(self):
+        """Сжимает давно не использовавшиеся буферы, пока несжатые тексты превышают лимит"""
+        resident = sum(buffer.resident for buffer in self.snapshots.values())
+        for buffer in self.snapshots.values():
+            if resident <= self.memory_cap:
+                break
+            resident -= buffer.resident
+            buffer.compress()
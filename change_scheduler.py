@@ -0,0 +1,131 @@
+"""
+Модуль планировщика работы редактора после изменения текста.
+
+Каждое нажатие клавиши не запускает весь конвейер обновлений сразу:
+задачи только помечаются как требующие выполнения. Повторные пометки
+одной задачи сливаются в одну. Дешёвые задачи (позиция курсора, текущая
+строка) выполняются немедленно, дорогие - после паузы в наборе
+в порядке приоритета, порциями в пределах бюджета кадра. Каждая пометка
+откладывает дорогие задачи заново, но не дольше предельной задержки
+от первой невыполненной пометки.
+"""
+
+import time
+import traceback
+
+
+class EditorTask:
+    """Задача конвейера обновлений редактора"""
+
+    def __init__(self, name, callback, priority, immediate):
+        """
+        Args:
+            name: уникальное имя задачи
+            callback: функция без аргументов
+            priority: порядок выполнения (меньше - раньше)
+            immediate: выполнять сразу при пометке, без задержки
+        """
+        self.name = name
+        self.callback = callback
+        self.priority = priority
+        self.immediate = immediate
+
+
+class ChangeScheduler:
+    """Планировщик, сливающий повторные запросы задач редактора"""
+
+    # Пауза после последней пометки перед выполнением дорогих задач (мс)
+    DELAY = 30
+    # Предельная задержка дорогих задач от первой невыполненной пометки (мс)
+    MAX_LATENCY = 150
+    # Бюджет времени на одну порцию дорогих задач (секунды)
+    FRAME_BUDGET = 0.012
+
+    def __init__(self, widget):
+        """
+        Args:
+            widget: любой виджет Tk, через цикл событий которого планируется работа
+        """
+        self.widget = widget
+        self.tasks = {}
+        self.dirty = set()
+        self._job = None
+        self._pending_since = None
+
+    def register(self, name, callback, priority=100, immediate=False):
+        """Регистрирует задачу (задача с тем же именем заменяется)"""
+        self.tasks[name] = EditorTask(name, callback, priority, immediate)
+
+    def unregister(self, name):
+        """Удаляет задачу"""
+        self.tasks.pop(name, None)
+        self.dirty.discard(name)
+
+    def mark(self, *names):
+        """
+        Помечает задачи как требующие выполнения.
+
+        Без аргументов помечаются все зарегистрированные задачи. Немедленные
+        задачи выполняются сразу, остальные - через DELAY после последней
+        пометки, но не позже MAX_LATENCY после первой.
+        """
+        names = names or tuple(self.tasks)
+        immediate = []
+        deferred = False
+        for name in names:
+            task = self.tasks.get(name)
+            if task is None:
+                continue
+            if task.immediate:
+                immediate.append(task)
+            else:
+                self.dirty.add(name)
+                deferred = True
+        for task in sorted(immediate, key=lambda item: item.priority):
+            self._call(task)
+        if not deferred:
+            return
+        now = time.perf_counter()
+        if self._pending_since is None:
+            self._pending_since = now
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+        waited = (now - self._pending_since) * 1000
+        delay = max(0, min(self.DELAY, int(self.MAX_LATENCY - waited)))
+        self._job = self.widget.after(delay, self._run)
+
+    def flush(self):
+        """Сразу выполняет все помеченные задачи"""
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+        self._pending_since = None
+        while self.dirty:
+            self._call(self._pop_next())
+
+    def _pop_next(self):
+        """Снимает пометку с задачи с наивысшим приоритетом и возвращает её"""
+        task = min((self.tasks[name] for name in self.dirty), key=lambda item: item.priority)
+        self.dirty.discard(task.name)
+        return task
+
+    def _run(self):
+        """Выполняет помеченные задачи по приоритету, пока не исчерпан бюджет кадра"""
+        self._job = None
+        self._pending_since = None
+        deadline = time.perf_counter() + self.FRAME_BUDGET
+        while self.dirty:
+            self._call(self._pop_next())
+            if time.perf_counter() >= deadline:
+                break
+        if self.dirty:
+            # Оставшиеся задачи ждут с этого момента
+            self._pending_since = time.perf_counter()
+            self._job = self.widget.after_idle(self._run)
+
+    def _call(self, task):
+        try:
+            task.callback()
+        except Exception as e:
+            print(f"[ERROR] Задача редактора {task.name}: {e}")
+            traceback.print_exc()
@@ -0,0 +1,188 @@
+"""
+Модуль сворачивания блоков кода.
+
+Области сворачивания определяются по отступам из индекса скобок и
+отступов: блок - строки после заголовка, отступ которых больше отступа
+заголовка. Свёрнутый блок скрывается тегом с elide, поэтому Tk не
+раскладывает его строки, а подсветка, разметка пробелов и скобок
+пропускают скрытые строки. Свёрнутые диапазоны хранятся в самом теге и
+сдвигаются вместе с текстом при правках.
+"""
+
+import re
+from bisect import bisect_right
+
+# Строки-определения, до которых сворачивается файл, по расширению
+DEFINITION_PATTERNS = {
+    ".py": re.compile(r"[ \t]*(?:async[ \t]+)?def[ \t]"),
+    ".pyw": re.compile(r"[ \t]*(?:async[ \t]+)?def[ \t]"),
+    ".js": re.compile(r"[ \t]*(?:export[ \t]+)?(?:async[ \t]+)?function\b"),
+}
+
+
+class FoldManager:
+    """Сворачивание блоков кода в виджете tk.Text по отступам"""
+
+    # Тег скрытого текста
+    TAG = "folded"
+    # Тег строки-заголовка свёрнутого блока
+    HEAD_TAG = "fold_head"
+
+    def __init__(self, text_widget, bracket_index):
+        """
+        Args:
+            text_widget: виджет tk.Text
+            bracket_index: BracketIndex, из которого берутся отступы строк
+        """
+        self.text = text_widget
+        self.index = bracket_index
+        self.text.tag_configure(self.TAG, elide=True)
+        self._ranges = None
+        self._starts = []
+
+    def invalidate(self):
+        """Сбрасывает кэш скрытых диапазонов (после правки текста)"""
+        self._ranges = None
+
+    # --- Скрытые строки ---
+
+    def hidden_ranges(self):
+        """Скрытые строки: отсортированные пары [first, stop) с нумерацией от нуля"""
+        if self._ranges is None:
+            bounds = [int(str(index).split(".")[0]) for index in self.text.tag_ranges(self.TAG)]
+            # Тег начинается в конце строки-заголовка H и кончается в конце последней скрытой строки E
+            self._ranges = list(zip(bounds[::2], bounds[1::2]))
+            self._starts = [first for first, stop in self._ranges]
+        return self._ranges
+
+    def visible_segments(self, low, high):
+        """Разбивает строки [low, high) на участки без скрытых строк"""
+        ranges = self.hidden_ranges()
+        position = max(bisect_right(self._starts, low) - 1, 0)
+        start = low
+        for first, stop in ranges[position:]:
+            if first >= high:
+                break
+            if stop <= start:
+                continue
+            if first > start:
+                yield start, first
+            start = max(start, stop)
+        if start < high:
+            yield start, high
+
+    # --- Области сворачивания ---
+
+    def region(self, row):
+        """
+        Блок, заголовком которого служит строка row (с нуля).
+
+        Returns:
+            Скрываемые строки [first, stop) или None, если строка не открывает блок
+        """
+        indents = self.index.indents
+        if row >= len(indents) or indents[row] < 0:
+            return None
+        base = indents[row]
+        last = None
+        for current in range(row + 1, len(indents)):
+            width = indents[current]
+            if width < 0:
+                continue
+            if width <= base:
+                break
+            last = current
+        if last is None:
+            return None
+        return row + 1, last + 1
+
+    def enclosing_region(self, row):
+        """Заголовок и строки ближайшего блока, содержащего строку row или открываемого ею"""
+        found = self.region(row)
+        if found:
+            return row, found
+        indents = self.index.indents
+        width = indents[row] if row < len(indents) else -1
+        for head in range(row - 1, -1, -1):
+            if 0 <= indents[head] and (width < 0 or indents[head] < width):
+                found = self.region(head)
+                if found and found[1] > row:
+                    return head, found
+                if indents[head] == 0:
+                    break
+        return None
+
+    # --- Сворачивание ---
+
+    def fold(self, head, first, stop):
+        """Скрывает строки [first, stop) под заголовком head"""
+        self.text.tag_add(self.TAG, f"{head + 1}.end", f"{stop}.end")
+        self.text.tag_add(self.HEAD_TAG, f"{head + 1}.0", f"{head + 1}.end")
+        self.invalidate()
+
+    def is_folded(self, row):
+        """Свёрнут ли блок под строкой row"""
+        return self.TAG in self.text.tag_names(f"{row + 1}.end")
+
+    def unfold(self, row):
+        """Разворачивает блок под строкой row"""
+        found = self.text.tag_nextrange(self.TAG, f"{row + 1}.end")
+        if found:
+            self.text.tag_remove(self.TAG, *found)
+        self.text.tag_remove(self.HEAD_TAG, f"{row + 1}.0", f"{row + 1}.end")
+        self.invalidate()
+
+    def toggle(self, row):
+        """
+        Сворачивает или разворачивает блок у строки row.
+
+        Returns:
+            Строка-заголовок блока или None, если блока нет
+        """
+        if self.is_folded(row):
+            self.unfold(row)
+            return row
+        self.index.update()
+        found = self.enclosing_region(row)
+        if not found:
+            return None
+        head, (first, stop) = found
+        self.fold(head, first, stop)
+        return head
+
+    def fold_definitions(self, lines, extension):
+        """
+        Сворачивает тела всех определений (для языков без шаблона - все блоки
+        верхнего уровня). Все диапазоны ставятся одним вызовом tag_add.
+        """
+        self.index.update()
+        pattern = DEFINITION_PATTERNS.get(extension)
+        indents = self.index.indents
+        hidden = []
+        heads = []
+        covered = 0
+        for row, line in enumerate(lines):
+            if row < covered:
+                continue
+            if pattern is not None:
+                if not pattern.match(line):
+                    continue
+            elif indents[row] != 0:
+                continue
+            found = self.region(row)
+            if found:
+                first, stop = found
+                hidden.extend((f"{row + 1}.end", f"{stop}.end"))
+                heads.extend((f"{row + 1}.0", f"{row + 1}.end"))
+                covered = stop
+        if hidden:
+            self.text.tag_add(self.TAG, *hidden)
+            self.text.tag_add(self.HEAD_TAG, *heads)
+        self.invalidate()
+        return len(hidden) // 2
+
+    def unfold_all(self):
+        """Разворачивает все блоки"""
+        self.text.tag_remove(self.TAG, "1.0", "end")
+        self.text.tag_remove(self.HEAD_TAG, "1.0", "end")
+        self.invalidate()
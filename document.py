@@ -0,0 +1,305 @@
+"""
+Модуль модели документа редактора.
+
+Текст хранится в таблице фрагментов (piece table): фрагменты ссылаются на
+неизменяемые строки - исходный текст и тексты вставок, поэтому правка не
+копирует буфер, а снимок документа - это кортеж ссылок на фрагменты.
+Длины строк хранятся блоками с деревьями Фенвика, так что начало строки
+и строка по смещению находятся за O(log n), а правка со вставкой или
+удалением строк не перестраивает индекс целиком. Модель синхронизируется
+с виджетом tk.Text по правкам, которые перехватывает EditTracker.
+"""
+
+from array import array
+
+import fenwick
+
+
+class LineIndex:
+    """
+    Индекс длин строк (длина включает завершающий перевод строки).
+
+    Длины хранятся блоками примерно по BLOCK_LINES строк; у каждого блока
+    своё дерево Фенвика, а над суммами и числом строк блоков - ещё два.
+    Начало строки и строка по смещению находятся за O(log n), правка
+    перестраивает только затронутые блоки, а деревья над блоками - лишь
+    когда блоки делятся или сливаются. Копия индекса разделяет блоки с
+    оригиналом: блок копируется тем индексом, который первым его меняет.
+    """
+
+    BLOCK_LINES = 512
+
+    def __init__(self, lengths=(0,)):
+        self.build(lengths)
+
+    def build(self, lengths):
+        """Строит индекс по длинам строк за O(n)"""
+        lengths = array("q", lengths)
+        size = self.BLOCK_LINES
+        self._blocks = [lengths[low:low + size] for low in range(0, len(lengths), size)] or [array("q")]
+        self._trees = [fenwick.build(block) for block in self._blocks]
+        self._owned = [True] * len(self._blocks)
+        self._rebuild_blocks()
+
+    def _rebuild_blocks(self):
+        """Пересчитывает деревья над блоками после изменения их числа"""
+        self._sums = fenwick.build([fenwick.prefix(tree, len(block))
+                                    for block, tree in zip(self._blocks, self._trees)])
+        self._counts = fenwick.build([len(block) for block in self._blocks])
+        self._size = sum(len(block) for block in self._blocks)
+
+    def copy(self):
+        """Возвращает копию индекса, разделяющую с ним блоки до первого изменения"""
+        other = LineIndex.__new__(LineIndex)
+        other._blocks = list(self._blocks)
+        other._trees = list(self._trees)
+        other._sums = array("q", self._sums)
+        other._counts = array("q", self._counts)
+        other._size = self._size
+        # Блоки теперь общие: изменяющий индекс сначала копирует блок
+        self._owned = [False] * len(self._blocks)
+        other._owned = [False] * len(other._blocks)
+        return other
+
+    def __len__(self):
+        return self._size
+
+    def _locate(self, line):
+        """Номер блока строки line и её номер в блоке"""
+        block, offset = fenwick.search(self._counts, line)
+        if block == len(self._blocks) and block:
+            # Строка за последней: конец последнего блока
+            block -= 1
+            offset += len(self._blocks[block])
+        return block, offset
+
+    def _own(self, block):
+        """Блок, который можно изменять (общий с копией индекса копируется)"""
+        if not self._owned[block]:
+            self._blocks[block] = array("q", self._blocks[block])
+            self._trees[block] = array("q", self._trees[block])
+            self._owned[block] = True
+        return self._blocks[block]
+
+    def length(self, line):
+        """Длина строки line"""
+        block, offset = self._locate(line)
+        return self._blocks[block][offset]
+
+    def start(self, line):
+        """Смещение начала строки line (с нуля)"""
+        block, offset = self._locate(line)
+        return fenwick.prefix(self._sums, block) + fenwick.prefix(self._trees[block], offset)
+
+    def find(self, offset):
+        """Номер строки, содержащей смещение offset"""
+        block, offset = fenwick.search(self._sums, offset)
+        if block == len(self._blocks):
+            return self._size - 1
+        line, _ = fenwick.search(self._trees[block], offset)
+        return min(fenwick.prefix(self._counts, block) + line, self._size - 1)
+
+    def add(self, line, delta):
+        """Изменяет длину строки line на delta"""
+        block, offset = self._locate(line)
+        self._own(block)[offset] += delta
+        fenwick.increase(self._trees[block], offset, delta)
+        fenwick.increase(self._sums, block, delta)
+
+    def splice(self, first, count, lengths):
+        """Заменяет длины строк [first, first + count) новыми"""
+        if len(lengths) == count:
+            for line, length in enumerate(lengths, first):
+                self.add(line, length - self.length(line))
+            return
+        low, offset = self._locate(first)
+        high = self._locate(first + count - 1)[0] + 1 if count else low + 1
+        old_total = fenwick.prefix(self._sums, high) - fenwick.prefix(self._sums, low)
+        if high - low == 1:
+            merged = self._own(low)
+        else:
+            merged = array("q")
+            for block in self._blocks[low:high]:
+                merged.extend(block)
+        merged[offset:offset + count] = array("q", lengths)
+        size = self.BLOCK_LINES
+        # Маленький блок сливается со следующим, чтобы блоков не становилось больше нужного
+        if len(merged) < size // 4 and high < len(self._blocks):
+            merged = merged + self._blocks[high]
+            high += 1
+        if len(merged) > 2 * size:
+            blocks = [merged[start:start + size] for start in range(0, len(merged), size)]
+        elif merged or len(self._blocks) == high - low:
+            blocks = [merged]
+        else:
+            blocks = []
+
+        if len(blocks) == 1 and high - low == 1:
+            # Число блоков не изменилось: обновляются только суммы блока
+            self._blocks[low] = merged
+            self._trees[low] = fenwick.build(merged)
+            self._owned[low] = True
+            fenwick.increase(self._sums, low, sum(merged) - old_total)
+            fenwick.increase(self._counts, low, len(lengths) - count)
+            self._size += len(lengths) - count
+            return
+        self._blocks[low:high] = blocks
+        self._trees[low:high] = [fenwick.build(block) for block in blocks]
+        self._owned[low:high] = [True] * len(blocks)
+        self._rebuild_blocks()
+
+
+class TextSnapshot:
+    """Неизменяемый снимок текста: фрагменты и индекс строк на момент снимка"""
+
+    def __init__(self, pieces, index, version):
+        self._pieces = pieces
+        self._index = index
+        self.version = version
+        self._text = None
+
+    def __len__(self):
+        return self._index.start(len(self._index))
+
+    @property
+    def line_count(self):
+        """Количество строк"""
+        return len(self._index)
+
+    def text(self):
+        """Весь текст"""
+        if self._text is None:
+            self._text = "".join(buffer[start:start + length] for buffer, start, length in self._pieces)
+        return self._text
+
+    def get(self, start, end):
+        """Текст между смещениями [start, end)"""
+        if self._text is not None:
+            return self._text[start:end]
+        parts = []
+        position = 0
+        for buffer, piece_start, length in self._pieces:
+            piece_end = position + length
+            if piece_end > start and position < end:
+                low = max(start - position, 0)
+                high = min(end - position, length)
+                parts.append(buffer[piece_start + low:piece_start + high])
+            position = piece_end
+            if position >= end:
+                break
+        return "".join(parts)
+
+    def offset(self, line, column):
+        """Смещение позиции (строка, колонка), строки и колонки с нуля"""
+        return self._index.start(line) + column
+
+    def position(self, offset):
+        """Позиция (строка, колонка) по смещению"""
+        line = self._index.find(offset)
+        return line, offset - self._index.start(line)
+
+    def line(self, line):
+        """Текст строки line (с нуля) без перевода строки"""
+        start = self._index.start(line)
+        end = start + self._index.length(line)
+        if line < len(self._index) - 1:
+            end -= 1
+        return self.get(start, end)
+
+    def lines(self, start=0, stop=None):
+        """Строки [start, stop) без переводов строк"""
+        if start == 0 and stop is None:
+            return self.text().split("\n")
+        stop = len(self._index) if stop is None else min(stop, len(self._index))
+        if start >= stop:
+            return []
+        low = self._index.start(start)
+        high = self._index.start(stop)
+        if stop < len(self._index):
+            high -= 1
+        return self.get(low, high).split("\n")
+
+
+class Document(TextSnapshot):
+    """
+    Изменяемый документ на таблице фрагментов.
+
+    Число фрагментов ограничено: когда их становится больше COMPACT_PIECES,
+    текст собирается в одну строку, поэтому поиск фрагмента остаётся
+    дешёвым, а снимки - кортежами небольшого размера.
+    """
+
+    COMPACT_PIECES = 512
+
+    def __init__(self, text=""):
+        super().__init__([], LineIndex(), 0)
+        self.reset(text)
+
+    def reset(self, text):
+        """Заменяет весь текст документа"""
+        self._pieces = [(text, 0, len(text))] if text else []
+        self._index.build([len(line) + 1 for line in text.split("\n")])
+        self._index.add(len(self._index) - 1, -1)
+        self._text = text
+        self._lines = None
+        self.version += 1
+
+    def snapshot(self):
+        """Возвращает неизменяемый снимок текущего текста"""
+        snapshot = TextSnapshot(tuple(self._pieces), self._index.copy(), self.version)
+        snapshot._text = self._text
+        return snapshot
+
+    def lines(self, start=0, stop=None):
+        """Строки [start, stop); полный список кэшируется до следующей правки и не должен изменяться"""
+        if start == 0 and stop is None:
+            if self._lines is None:
+                self._lines = self.text().split("\n")
+            return self._lines
+        return super().lines(start, stop)
+
+    def replace(self, start, end, text):
+        """Заменяет текст между позициями start и end (строка, колонка с нуля) на text"""
+        index = self._index
+        first_line, first_column = start
+        last_line, last_column = end
+        low = index.start(first_line) + first_column
+        high = index.start(last_line) + last_column
+
+        # Длины строк: хвост последней затронутой строки переходит в последнюю новую строку
+        tail = index.length(last_line) - last_column
+        parts = text.split("\n")
+        if len(parts) == 1:
+            lengths = [first_column + len(text) + tail]
+        else:
+            lengths = [first_column + len(parts[0]) + 1]
+            lengths.extend(len(part) + 1 for part in parts[1:-1])
+            lengths.append(len(parts[-1]) + tail)
+        index.splice(first_line, last_line - first_line + 1, lengths)
+
+        self._text = None
+        self._lines = None
+        self._replace_pieces(low, high, text)
+        self.version += 1
+
+    def _split(self, offset):
+        """Делит фрагменты так, чтобы offset пришёлся на границу; возвращает номер фрагмента"""
+        position = 0
+        pieces = self._pieces
+        for number, (buffer, start, length) in enumerate(pieces):
+            if position == offset:
+                return number
+            if offset < position + length:
+                cut = offset - position
+                pieces[number:number + 1] = [(buffer, start, cut), (buffer, start + cut, length - cut)]
+                return number + 1
+            position += length
+        return len(pieces)
+
+    def _replace_pieces(self, low, high, text):
+        first = self._split(low)
+        last = self._split(high) if high > low else first
+        self._pieces[first:last] = [(text, 0, len(text))] if text else []
+        if len(self._pieces) > self.COMPACT_PIECES:
+            text = self.text()
+            self._pieces = [(text, 0, len(text))]
@@ -0,0 +1,75 @@
+"""
+Модуль потока событий правки редактора.
+
+Каждая правка активного буфера публикуется как событие EditEvent:
+позиции до правки, вставленный текст и версия документа после неё.
+Подписчики (плагины, индексаторы, языковые сервисы) обновляют свои
+структуры по правке, не перечитывая и не сравнивая весь буфер. Фоновым
+потокам события передаются через очередь.
+"""
+
+import queue
+import traceback
+from collections import namedtuple
+
+EditEvent = namedtuple("EditEvent", "start end inserted_text version path")
+EditEvent.__doc__ = """
+Правка буфера.
+
+Текст между позициями start и end (строка, колонка с нуля; позиции до
+правки) заменён на inserted_text, после чего документ получил версию
+version. Если start равен None, содержимое буфера заменено целиком и
+подписчику нужно перечитать текст из снимка документа. Так публикуются
+открытие файла, создание нового файла, переключение буфера, загрузка
+окна большого файла, а также правки виджета, которые нельзя выразить
+одной дельтой (отмена средствами Tk, удаление нескольких диапазонов).
+Отмена и повтор через историю правок публикуются обычными дельтами.
+"""
+
+
+class EditEventStream:
+    """Рассылка событий правки подписчикам"""
+
+    def __init__(self):
+        self.subscribers = []
+        self._queues = []
+
+    def subscribe(self, callback):
+        """Подписывает функцию callback(event); она вызывается в потоке интерфейса"""
+        if callback not in self.subscribers:
+            self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """Отменяет подписку функции"""
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def subscribe_queue(self):
+        """
+        Подписка для фонового потока.
+
+        Returns:
+            queue.Queue, в которую помещается каждое событие
+        """
+        events = queue.Queue()
+        self._queues.append(events)
+        return events
+
+    def unsubscribe_queue(self, events):
+        """Отменяет подписку очереди"""
+        if events in self._queues:
+            self._queues.remove(events)
+
+    def publish(self, start, end, inserted_text, version, path):
+        """Рассылает событие правки"""
+        if not self.subscribers and not self._queues:
+            return
+        event = EditEvent(start, end, inserted_text, version, path)
+        for callback in list(self.subscribers):
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"[ERROR] Подписчик событий правки {callback}: {e}")
+                traceback.print_exc()
+        for events in list(self._queues):
+            events.put(event)
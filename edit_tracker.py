@@ -0,0 +1,247 @@
+"""
+Модуль перехвата правок виджета tk.Text.
+
+Команда виджета в Tcl переименовывается, а на её место ставится
+обработчик на Python (как в idlelib.redirector). Команды insert, delete
+и replace пропускаются к виджету, а их позиции и вставленный текст
+передаются подписчикам, которые обновляют свои структуры по правке,
+не перечитывая весь буфер. Многострочные операции собирают правки в
+пакет (EditTransaction) и применяют их одной командой.
+"""
+
+import traceback
+
+
+def parse_index(index):
+    """Переводит индекс Tk "строка.колонка" в пару с нумерацией строк с нуля"""
+    line, column = index.split(".")
+    return int(line) - 1, int(column)
+
+
+def changed_rows(start, end, text):
+    """
+    Строки, затронутые правкой: текст между позициями start и end заменён на text.
+
+    Returns:
+        Кортеж (first, old_end, new_end): строки [first, old_end) до правки
+        заменены строками [first, new_end) после неё
+    """
+    return start[0], end[0] + 1, start[0] + text.count("\n") + 1
+
+
+class EditTracker:
+    """
+    Перехватчик правок виджета tk.Text.
+
+    Подписчик вызывается после каждой правки как listener(start, end, text):
+    текст между позициями start и end (строка, колонка с нуля; позиции до
+    правки) заменён на text. Если правку не удалось разобрать (отмена,
+    удаление нескольких диапазонов), подписчик вызывается с start = None
+    и должен перечитать текст виджета целиком.
+    """
+
+    def __init__(self, text_widget):
+        """
+        Args:
+            text_widget: виджет tk.Text, правки которого перехватываются
+        """
+        self.text = text_widget
+        self.listeners = []
+        self.widget_name = text_widget._w
+        self.orig = self.widget_name + "_orig"
+        text_widget.tk.call("rename", self.widget_name, self.orig)
+        text_widget.tk.createcommand(self.widget_name, self._dispatch)
+
+    def close(self):
+        """Возвращает виджету исходную команду"""
+        tk_app = self.text.tk
+        tk_app.deletecommand(self.widget_name)
+        tk_app.call("rename", self.orig, self.widget_name)
+
+    def call(self, *args):
+        """Вызывает исходную команду виджета в обход перехвата"""
+        return self.text.tk.call((self.orig,) + args)
+
+    def contents(self):
+        """Весь текст виджета"""
+        return self.call("get", "1.0", "end-1c")
+
+    def transaction(self):
+        """Начинает пакет правок виджета"""
+        return EditTransaction(self)
+
+    def position(self, index):
+        """Позиция индекса (строка, колонка с нуля); индексы после end-1c прижимаются к нему"""
+        resolved = self.call("index", index)
+        last = self.call("index", "end-1c")
+        if self.call("compare", resolved, ">", last):
+            resolved = last
+        return parse_index(resolved)
+
+    def _dispatch(self, command, *args):
+        if command in ("insert", "delete", "replace") and args and self.listeners \
+                and str(self.call("cget", "-state")) != "disabled":
+            return self._edit(command, args)
+        result = self.call(command, *args)
+        if command == "edit" and args and args[0] in ("undo", "redo"):
+            self._notify(None, None, None)
+        return result
+
+    def _edit(self, command, args):
+        if command == "insert":
+            start = end = self.position(args[0])
+            text = "".join(args[1::2])
+        elif command == "delete" and len(args) > 2:
+            # Удаление нескольких диапазонов разом
+            result = self.call(command, *args)
+            self._notify(None, None, None)
+            return result
+        else:
+            start = self.position(args[0])
+            if len(args) > 1:
+                end = self.position(args[1])
+            else:
+                end = self.position(f"{args[0]}+1c")
+            text = "".join(args[2::2]) if command == "replace" else ""
+            if end < start:
+                if command == "delete":
+                    return self.call(command, *args)
+                end = start
+
+        result = self.call(command, *args)
+        if start != end or text:
+            self._notify(start, end, text)
+        return result
+
+    def _notify(self, start, end, text):
+        for listener in list(self.listeners):
+            try:
+                listener(start, end, text)
+            except Exception as e:
+                print(f"[ERROR] Обработчик правки {listener}: {e}")
+                traceback.print_exc()
+
+
+class EditTransaction:
+    """
+    Пакет правок виджета tk.Text.
+
+    Правки задаются позициями текста до начала пакета (строка, колонка с
+    нуля) и не должны пересекаться; позиции за концом текста прижимаются к
+    нему. commit применяет все правки одной командой replace над участком
+    от первого до последнего изменившегося символа: виджет перерисовывается
+    один раз, а подписчики EditTracker получают одно событие правки. Курсор
+    и выделение внутри участка переносятся так, как их сдвинули бы правки
+    по отдельности.
+    """
+
+    def __init__(self, tracker):
+        """
+        Args:
+            tracker: EditTracker виджета
+        """
+        self.tracker = tracker
+        self.edits = []
+
+    def replace(self, start, end, text):
+        """Заменяет текст между позициями start и end на text"""
+        self.edits.append((start, end, text))
+
+    def insert(self, position, text):
+        """Вставляет текст в позицию"""
+        self.edits.append((position, position, text))
+
+    def delete(self, start, end):
+        """Удаляет текст между позициями start и end"""
+        self.edits.append((start, end, ""))
+
+    def commit(self):
+        """Применяет собранные правки к виджету"""
+        edits = sorted(self.edits, key=lambda edit: (edit[0], edit[1]))
+        self.edits = []
+        if not edits:
+            return
+        last_row = parse_index(self.tracker.call("index", "end-1c"))[0]
+        first = min(edits[0][0][0], last_row)
+        last = min(max(end[0] for start, end, text in edits), last_row)
+        region = self.tracker.call("get", f"{first + 1}.0", f"{last + 1}.end")
+        lines = region.split("\n")
+        starts = [0]
+        for line in lines[:-1]:
+            starts.append(starts[-1] + len(line) + 1)
+
+        def offset(position):
+            row, column = position
+            if row > last_row:
+                return len(region)
+            return starts[row - first] + min(column, len(lines[row - first]))
+
+        pieces = []
+        spans = []
+        cursor = 0
+        for start, end, text in edits:
+            low = offset(start)
+            high = max(offset(end), low)
+            if low < cursor:
+                raise ValueError("Правки пакета пересекаются")
+            pieces.append(region[cursor:low])
+            pieces.append(text)
+            spans.append((low, high, len(text)))
+            cursor = high
+        pieces.append(region[cursor:])
+        replacement = "".join(pieces)
+        if replacement == region:
+            return
+
+        def moved(position):
+            """Смещение в replacement, куда правки переносят позицию region"""
+            position_offset = offset(position)
+            shift = 0
+            for low, high, length in spans:
+                if high <= position_offset:
+                    shift += length - (high - low)
+                elif low < position_offset:
+                    # Позиция внутри заменённого текста - к концу вставленного
+                    return low + shift + length
+                else:
+                    break
+            return position_offset + shift
+
+        def index_at(text, text_offset):
+            """Индекс Tk смещения в тексте, начинающемся со строки first"""
+            row = text.count("\n", 0, text_offset)
+            column = text_offset - (text.rfind("\n", 0, text_offset) + 1)
+            return f"{first + row + 1}.{column}"
+
+        # Курсор и выделение внутри заменяемого участка replace сдвинул бы к его началу
+        call = self.tracker.call
+        insert = parse_index(str(call("index", "insert")))
+        selection = [parse_index(str(index)) for index in call("tag", "ranges", "sel")]
+
+        # Заменяется только участок между общими началом и концом: метки и теги вокруг остаются
+        prefix = 0
+        limit = min(len(region), len(replacement))
+        while prefix < limit and region[prefix] == replacement[prefix]:
+            prefix += 1
+        suffix = 0
+        limit -= prefix
+        while suffix < limit and region[-1 - suffix] == replacement[-1 - suffix]:
+            suffix += 1
+        self.tracker.text.replace(index_at(region, prefix), index_at(region, len(region) - suffix),
+                                  replacement[prefix:len(replacement) - suffix])
+
+        line_shift = replacement.count("\n") - region.count("\n")
+
+        def moved_index(position):
+            row, column = position
+            if row < first:
+                return f"{row + 1}.{column}"
+            if row > last:
+                return f"{row + line_shift + 1}.{column}"
+            return index_at(replacement, moved(position))
+
+        if first <= insert[0] <= last:
+            call("mark", "set", "insert", moved_index(insert))
+        if any(first <= row <= last for row, _ in selection):
+            call("tag", "remove", "sel", "1.0", "end")
+            call("tag", "add", "sel", *[moved_index(position) for position in selection])
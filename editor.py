@@ -8,6 +8,10 @@ import customtkinter as ctk
 from tkinter import filedialog, messagebox
 
 from theme import KanagawaTheme
+from document import Document
+from edit_tracker import EditTracker
+from syntax_highlighter import IncrementalHighlighter
+from lexer_registry import LexerRegistry
 
 class CodeEditor:
     """Класс редактора кода"""
@@ -78,7 +82,8 @@ class CodeEditor:
             button_hover_color=KanagawaTheme.FOREGROUND
         )
         y_scrollbar.grid(row=0, column=2, sticky="ns")
-        self.text.configure(yscrollcommand=y_scrollbar.set)
+        self.y_scrollbar = y_scrollbar
+        self.text.configure(yscrollcommand=self._on_text_yscroll)
         
         x_scrollbar = ctk.CTkScrollbar(
             editor_frame, 
@@ -99,8 +104,18 @@ class CodeEditor:
         self.text.tag_configure("number", foreground=KanagawaTheme.NUMBER)
         self.text.tag_configure("operator", foreground=KanagawaTheme.OPERATOR)
         
+        # Правки виджета переносятся в модель документа, а из неё - в кэш строк подсветчика,
+        # поэтому подсветчик перекрашивает только изменившиеся строки, не перечитывая текст
+        self.document = Document()
+        self.highlighter = IncrementalHighlighter(self.text)
+        self.highlighter.document = self.document
+        self.edit_tracker = EditTracker(self.text)
+        self.edit_tracker.listeners.append(self._on_edit)
+        self.lexer_registry = getattr(self.parent, "lexer_registry", None) or LexerRegistry()
+        
         # Привязка событий
         self.text.bind("<KeyRelease>", self._on_text_change)
+        self.text.bind("<Configure>", lambda e: self.highlighter.schedule_viewport(), add="+")
         self.text.bind("<ButtonRelease-1>", self._highlight_current_line)
         
         # Подсвечиваем текущую строку при запуске
@@ -175,6 +190,14 @@ class CodeEditor:
         
         return "break"  # Предотвращаем стандартное поведение Shift+Tab
     
+    def _on_edit(self, start, end, text):
+        """Переносит правку виджета в модель документа и кэш строк подсветчика"""
+        if start is None:
+            self.document.reset(self.edit_tracker.contents())
+        else:
+            self.document.replace(start, end, text)
+        self.highlighter.apply_edit(start, end, text)
+    
     def _on_text_change(self, event=None):
         """Обработчик изменения текста в редакторе"""
         self._update_line_numbers()
@@ -210,9 +233,8 @@ class CodeEditor:
     
     def _update_line_numbers(self):
         """Обновляет номера строк"""
-        # Получаем текущий текст и считаем строки
-        text_content = self.text.get("1.0", tk.END)
-        lines = text_content.count('\n') + 1
+        # Количество строк берём из модели документа (с запасной строкой за концом текста)
+        lines = self.document.line_count + 1
         
         # Подготавливаем текст для номеров строк
         line_numbers_text = ''
@@ -234,125 +256,34 @@ class CodeEditor:
         self.text.yview(*args)
         self.line_numbers.yview(*args)
     
+    def _on_text_yscroll(self, first, last):
+        """Вызывается при любом изменении видимой области редактора"""
+        self.y_scrollbar.set(first, last)
+        # Подсвечиваем строки, открывшиеся при прокрутке
+        self.highlighter.schedule_viewport()
+    
     def _highlight_syntax(self):
         """Подсветка синтаксиса для кода"""
-        # Удаляем все теги подсветки
-        self.text.tag_remove("keyword", "1.0", tk.END)
-        self.text.tag_remove("string", "1.0", tk.END)
-        self.text.tag_remove("comment", "1.0", tk.END)
-        self.text.tag_remove("function", "1.0", tk.END)
-        self.text.tag_remove("class", "1.0", tk.END)
-        self.text.tag_remove("number", "1.0", tk.END)
-        self.text.tag_remove("operator", "1.0", tk.END)
-        
         # Определяем тип файла для подсветки
-        use_python_lexer = True
         if self.current_file:
-            if not self.current_file.endswith('.py'):
-                try:
-                    extension = os.path.splitext(self.current_file)[1]
-                    self.current_filetype = extension
-                    use_python_lexer = False
-                except:
-                    use_python_lexer = True
+            self.current_filetype = os.path.splitext(self.current_file)[1]
         
-        # Подсветка для Python (работает даже для несохраненных файлов)
-        if use_python_lexer or self.current_filetype == '.py':
-            # Ключевые слова
-            keywords = ["def", "class", "if", "else", "elif", "while", "for", "in", "try", 
-                       "except", "finally", "import", "from", "as", "return", "break", 
-                       "continue", "pass", "True", "False", "None", "and", "or", "not",
-                       "with", "async", "await", "yield", "lambda", "assert", "del", "global",
-                       "nonlocal", "raise", "is"]
-            
-            for keyword in keywords:
-                start_pos = "1.0"
-                while True:
-                    start_pos = self.text.search(f"\\y{keyword}\\y", start_pos, tk.END, regexp=True)
-                    if not start_pos:
-                        break
-                    end_pos = f"{start_pos}+{len(keyword)}c"
-                    self.text.tag_add("keyword", start_pos, end_pos)
-                    start_pos = end_pos
-            
-            # Операторы
-            operators = ["+", "-", "*", "/", "==", "!=", "<", ">", "<=", ">=", "=", "+=", "-=", "*=", "/="]
-            for op in operators:
-                start_pos = "1.0"
-                while True:
-                    start_pos = self.text.search(f"{op}", start_pos, tk.END)
-                    if not start_pos:
-                        break
-                    end_pos = f"{start_pos}+{len(op)}c"
-                    self.text.tag_add("operator", start_pos, end_pos)
-                    start_pos = end_pos
-            
-            # Числа
-            start_pos = "1.0"
-            while True:
-                start_pos = self.text.search(r'\y\d+\y', start_pos, tk.END, regexp=True)
-                if not start_pos:
-                    break
-                end_pos = self.text.search(r'\W', start_pos, tk.END, regexp=True)
-                if not end_pos:
-                    end_pos = tk.END
-                self.text.tag_add("number", start_pos, end_pos)
-                start_pos = end_pos
-            
-            # Строки
-            for quote in ['"', "'"]:
-                start_pos = "1.0"
-                while True:
-                    start_pos = self.text.search(f'{quote}', start_pos, tk.END)
-                    if not start_pos:
-                        break
-                    end_pos = self.text.search(f'{quote}', f"{start_pos}+1c", tk.END)
-                    if not end_pos:
-                        break
-                    end_pos = f"{end_pos}+1c"
-                    self.text.tag_add("string", start_pos, end_pos)
-                    start_pos = end_pos
-            
-            # Комментарии
-            start_pos = "1.0"
-            while True:
-                start_pos = self.text.search('#', start_pos, tk.END)
-                if not start_pos:
-                    break
-                line = int(float(start_pos))
-                end_pos = f"{line}.end"
-                self.text.tag_add("comment", start_pos, end_pos)
-                start_pos = f"{line+1}.0"
-            
-            # Функции
-            start_pos = "1.0"
-            while True:
-                start_pos = self.text.search('def ', start_pos, tk.END)
-                if not start_pos:
-                    break
-                name_start = f"{start_pos}+4c"
-                name_end = self.text.search('\\(', name_start, tk.END)
-                if not name_end:
-                    break
-                self.text.tag_add("function", name_start, name_end)
-                start_pos = name_end
-            
-            # Классы
-            start_pos = "1.0"
-            while True:
-                start_pos = self.text.search('class ', start_pos, tk.END)
-                if not start_pos:
-                    break
-                name_start = f"{start_pos}+6c"
-                name_end = self.text.search('\\(|:', name_start, tk.END, regexp=True)
-                if not name_end:
-                    break
-                self.text.tag_add("class", name_start, name_end)
-                start_pos = name_end
+        # Python подсвечивается собственным токенизатором (в том числе для несохраненных
+        # файлов), остальные языки - лексерами pygments. Перекрашиваются только
+        # изменившиеся строки в видимой области
+        tokenizer = self.lexer_registry.tokenizer_for(self.current_file)
+        if tokenizer:
+            self.highlighter.set_tokenizer(tokenizer)
+            self.highlighter.enabled = True
+            self.highlighter.highlight()
+        elif self.highlighter.enabled:
+            self.highlighter.enabled = False
+            self.highlighter.clear()
     
     def get_text(self):
         """Получить весь текст из редактора"""
-        return self.text.get("1.0", tk.END)
+        # Как text.get("1.0", END): с завершающим переводом строки виджета
+        return self.document.text() + "\n"
     
     def set_text(self, content):
         """Установить текст в редактор"""
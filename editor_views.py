@@ -0,0 +1,71 @@
+"""
+Модуль представлений буфера редактора.
+
+Второе окно редактора создаётся командой Tk "peer create": виджет-двойник
+использует то же дерево текста, что и исходный виджет, поэтому текст,
+теги подсветки и метки не копируются. У каждого окна своя прокрутка и
+свой курсор, а разметка видимой области выполняется для объединения
+окон всех представлений.
+"""
+
+import tkinter as tk
+
+
+def visible_windows(views, margin, total=None):
+    """
+    Диапазоны строк, видимых в представлениях, с запасом margin строк.
+
+    Args:
+        views: виджеты tk.Text, показывающие один буфер
+        margin: количество строк сверх видимой области
+        total: количество строк текста (None - без ограничения)
+
+    Returns:
+        Отсортированный список непересекающихся пар [low, high) с нумерацией от нуля
+    """
+    windows = []
+    for view in views:
+        first = int(view.index("@0,0").split(".")[0]) - 1
+        last = int(view.index(f"@0,{view.winfo_height()}").split(".")[0])
+        low = max(first - margin, 0)
+        high = max(last, first + 1) + margin
+        if total is not None:
+            high = min(high, total)
+        windows.append((low, high))
+    windows.sort()
+    merged = []
+    for low, high in windows:
+        if merged and low <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], high))
+        else:
+            merged.append((low, high))
+    return merged
+
+
+def window_segments(windows, folds=None):
+    """Участки окон [low, high) без строк, скрытых сворачиванием (folds - FoldManager или None)"""
+    for low, high in windows:
+        if folds:
+            yield from folds.visible_segments(low, high)
+        elif low < high:
+            yield low, high
+
+
+class PeerText(tk.Text):
+    """Виджет-двойник tk.Text: общий с исходным виджетом текст и теги, свои прокрутка и курсор"""
+
+    _count = 0
+
+    def __init__(self, master, text_widget, **kwargs):
+        """
+        Args:
+            master: родительский виджет
+            text_widget: виджет tk.Text, текст которого показывается
+            kwargs: параметры виджета (без функций обратного вызова)
+        """
+        PeerText._count += 1
+        name = f"peer{PeerText._count}"
+        path = f".{name}" if master._w == "." else f"{master._w}.{name}"
+        text_widget.tk.call(text_widget._w, "peer", "create", path, *text_widget._options(kwargs))
+        # Виджет Tk уже создан командой peer, остаётся связать с ним объект tkinter
+        tk.BaseWidget._setup(self, master, {"name": name})
@@ -0,0 +1,53 @@
+"""
+Модуль функций дерева Фенвика над массивом array("q").
+
+Дерево хранится в массиве с нулевым элементом-заглушкой: сумма префикса,
+изменение элемента и поиск позиции по сумме выполняются за O(log n).
+Используется индексами строк документа и скобок.
+"""
+
+from array import array
+
+
+def build(values):
+    """Строит дерево Фенвика (массив с нулевым элементом-заглушкой) за O(n)"""
+    size = len(values)
+    tree = array("q", bytes(8 * (size + 1)))
+    tree[1:] = array("q", values)
+    for node in range(1, size + 1):
+        parent = node + (node & -node)
+        if parent <= size:
+            tree[parent] += tree[node]
+    return tree
+
+
+def prefix(tree, count):
+    """Сумма первых count элементов дерева Фенвика"""
+    total = 0
+    while count > 0:
+        total += tree[count]
+        count &= count - 1
+    return total
+
+
+def increase(tree, position, delta):
+    """Прибавляет delta к элементу position (с нуля) дерева Фенвика"""
+    size = len(tree) - 1
+    node = position + 1
+    while node <= size:
+        tree[node] += delta
+        node += node & -node
+
+
+def search(tree, value):
+    """Наибольшее count, при котором сумма первых count элементов не больше value; и остаток"""
+    size = len(tree) - 1
+    count = 0
+    step = 1 << (size.bit_length() - 1) if size else 0
+    while step:
+        following = count + step
+        if following <= size and tree[following] <= value:
+            count = following
+            value -= tree[following]
+        step >>= 1
+    return count, value
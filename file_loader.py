@@ -0,0 +1,140 @@
+"""
+Модуль потоковой загрузки файлов в редактор.
+
+Файл читается и декодируется в фоновом потоке порциями, а порции
+вставляются в виджет tk.Text по одной за тик цикла событий. Первый экран
+появляется сразу, интерфейс остаётся отзывчивым, а дорогая обработка
+(подсветка, индексы) откладывается до конца загрузки.
+"""
+
+import io
+import os
+import queue
+import threading
+import tkinter as tk
+
+
+class ChunkedFileLoader:
+    """Загрузчик файла в виджет tk.Text порциями между тиками цикла событий"""
+
+    # Файлы такого размера (байт) и больше загружаются порциями
+    THRESHOLD = 1024 * 1024
+    # Размер порции в символах
+    CHUNK_CHARS = 256 * 1024
+    # Интервал между порциями (мс)
+    TICK = 1
+    # Как часто поток чтения, ждущий места в очереди, проверяет отмену (секунды)
+    PUT_TIMEOUT = 0.1
+
+    def __init__(self, text_widget):
+        """
+        Args:
+            text_widget: виджет tk.Text
+        """
+        self.text = text_widget
+        self.active = False
+        self.path = None
+        self._chunks = None
+        self._cancelled = None
+        self._job = None
+
+    def start(self, path, on_first_chunk=None, on_progress=None, on_done=None, on_error=None):
+        """
+        Начинает загрузку файла, заменяя содержимое виджета.
+
+        Args:
+            path: путь к файлу
+            on_first_chunk: вызывается после вставки первой порции
+            on_progress: функция (доля загруженного от 0 до 1)
+            on_done: вызывается после вставки последней порции
+            on_error: функция (исключение) при ошибке чтения
+        """
+        self.cancel()
+        self.active = True
+        self.path = path
+        self._chunks = queue.Queue(maxsize=8)
+        self._cancelled = threading.Event()
+        self._callbacks = (on_first_chunk, on_progress, on_done, on_error)
+        self._first = True
+        self.text.configure(state="normal")
+        self.text.delete("1.0", tk.END)
+        # Пока файл загружается, редактор доступен только для чтения
+        self.text.configure(state="disabled")
+        threading.Thread(target=self._read, args=(path, self._chunks, self._cancelled), daemon=True).start()
+        self._job = self.text.after(self.TICK, self._pump)
+
+    def cancel(self):
+        """Прерывает текущую загрузку"""
+        if not self.active:
+            return
+        self._cancelled.set()
+        if self._job is not None:
+            self.text.after_cancel(self._job)
+            self._job = None
+        self.active = False
+        self.text.configure(state="normal")
+
+    def _read(self, path, chunks, cancelled):
+        """Читает и декодирует файл (выполняется в фоновом потоке)"""
+        try:
+            size = os.path.getsize(path) or 1
+            with open(path, "rb") as raw:
+                reader = io.TextIOWrapper(raw, encoding="utf-8")
+                while not cancelled.is_set():
+                    chunk = reader.read(self.CHUNK_CHARS)
+                    if not chunk:
+                        break
+                    if not self._put(chunks, (chunk, min(raw.tell() / size, 1.0)), cancelled):
+                        return
+            self._put(chunks, None, cancelled)
+        except Exception as e:
+            self._put(chunks, e, cancelled)
+
+    def _put(self, chunks, item, cancelled):
+        """
+        Кладёт элемент в очередь, ожидая места; после отмены очередь никто не
+        разбирает, поэтому ожидание прерывается.
+
+        Returns:
+            False, если загрузка отменена
+        """
+        while not cancelled.is_set():
+            try:
+                chunks.put(item, timeout=self.PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _pump(self):
+        """Вставляет в виджет одну готовую порцию"""
+        self._job = None
+        on_first_chunk, on_progress, on_done, on_error = self._callbacks
+        try:
+            item = self._chunks.get_nowait()
+        except queue.Empty:
+            self._job = self.text.after(self.TICK, self._pump)
+            return
+
+        if item is None or isinstance(item, Exception):
+            self.active = False
+            self.text.configure(state="normal")
+            if item is None and on_done:
+                on_done()
+            elif item is not None and on_error:
+                on_error(item)
+            return
+
+        chunk, progress = item
+        self.text.configure(state="normal")
+        self.text.insert("end-1c", chunk)
+        self.text.configure(state="disabled")
+        if self._first:
+            self._first = False
+            self.text.mark_set(tk.INSERT, "1.0")
+            self.text.yview_moveto(0)
+            if on_first_chunk:
+                on_first_chunk()
+        if on_progress:
+            on_progress(progress)
+        self._job = self.text.after(self.TICK, self._pump)
@@ -0,0 +1,185 @@
+"""
+Модуль фонового сохранения файлов.
+
+Сохранение получает снимок текста буфера и выполняется в фоновом потоке:
+текст пишется во временный файл рядом с целевым, при необходимости
+сбрасывается на диск (fsync) и атомарно подменяет целевой файл через
+os.replace. Поток интерфейса не ждёт диска, а аварийное завершение во
+время записи оставляет на месте старую версию файла. Повторные
+сохранения одного файла, пришедшие до начала записи, сливаются: пишется
+только последний снимок.
+"""
+
+import os
+import queue
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Маска прав новых файлов: читается один раз при импорте, в потоке интерфейса,
+# потому что os.umask меняет её для всего процесса
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def write_atomic(path, content, fsync=True):
+    """
+    Записывает текст в файл через временный файл и os.replace.
+
+    Текст пишется так же, как open(path, "w", encoding="utf-8"): переводы
+    строк заменяются на принятые в системе. Если путь - символическая
+    ссылка, подменяется файл, на который она указывает. Новый файл получает
+    права по умолчанию с учётом umask, существующий - сохраняет свои.
+
+    Args:
+        path: путь к файлу
+        content: текст
+        fsync: сбрасывать данные и запись каталога на диск до возврата
+    """
+    path = os.path.realpath(path)
+    directory = os.path.dirname(path)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", errors="surrogatepass", newline=None) as f:
+            f.write(content)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        try:
+            # Новая версия файла сохраняет права доступа старой
+            mode = os.stat(path).st_mode & 0o7777
+        except OSError:
+            # mkstemp создаёт файл с правами 0600, а не по umask
+            mode = 0o666 & ~_UMASK
+        try:
+            os.chmod(temp_path, mode)
+        except OSError:
+            pass
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    if fsync and os.name == "posix":
+        # Переименование надёжно, только когда на диск сброшен и каталог
+        try:
+            dir_fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(dir_fd)
+        except OSError:
+            pass
+        finally:
+            os.close(dir_fd)
+
+
+class SaveJob:
+    """Сохранение снимка текста в файл"""
+
+    def __init__(self, path, content):
+        """
+        Args:
+            path: путь к файлу
+            content: снимок текста буфера
+        """
+        self.path = path
+        self.content = content
+        self.merged = 0           # Сколько более ранних сохранений слито в это
+        self.error = None         # Исключение записи (None - файл записан)
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Ждёт окончания записи; возвращает True, если файл записан"""
+        self.done.wait(timeout)
+        return self.done.is_set() and self.error is None
+
+
+class FileSaver:
+    """Фоновый поток, записывающий файлы заданий SaveJob"""
+
+    def __init__(self, fsync=True):
+        """
+        Args:
+            fsync: сбрасывать файлы на диск перед подменой
+        """
+        self.fsync = fsync
+        self.results = queue.Queue()   # Завершённые задания для потока интерфейса
+        self._pending = OrderedDict()  # Путь -> задание, запись которого ещё не начата
+        self._writing = {}             # Путь -> задание, которое пишется сейчас
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def save(self, path, content):
+        """
+        Ставит сохранение в очередь.
+
+        Если сохранение того же файла ещё не начато, его текст заменяется
+        новым снимком и возвращается то же задание.
+
+        Returns:
+            SaveJob
+        """
+        with self._condition:
+            job = self._pending.get(path)
+            if job is not None:
+                job.content = content
+                job.merged += 1
+                return job
+            job = SaveJob(path, content)
+            self._pending[path] = job
+            self._condition.notify()
+            return job
+
+    def busy(self, path=None):
+        """Есть ли незавершённые сохранения (файла path или любые)"""
+        with self._condition:
+            if path is None:
+                return bool(self._pending or self._writing)
+            return path in self._pending or path in self._writing
+
+    def wait(self, path=None, timeout=None):
+        """
+        Ждёт окончания сохранений файла path (None - всех файлов).
+
+        Returns:
+            True, если все дождавшиеся сохранения записаны успешно
+        """
+        with self._condition:
+            if path is None:
+                jobs = list(self._pending.values()) + list(self._writing.values())
+            else:
+                jobs = [job for job in (self._writing.get(path), self._pending.get(path)) if job]
+        return all(job.wait(timeout) for job in jobs)
+
+    def stop(self):
+        """Останавливает поток после записи очереди"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def _run(self):
+        """Основной цикл потока"""
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopped:
+                    self._condition.wait()
+                if not self._pending:
+                    break
+                path, job = self._pending.popitem(last=False)
+                self._writing[path] = job
+            try:
+                write_atomic(path, job.content, self.fsync)
+            except Exception as e:
+                print(f"[ERROR] Не удалось сохранить {path}: {e}")
+                job.error = e
+            # Результат попадает в очередь раньше, чем задание перестаёт считаться
+            # незавершённым: опрос по busy() не пропустит его
+            self.results.put(job)
+            with self._condition:
+                del self._writing[path]
+            job.done.set()
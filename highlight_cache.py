@@ -0,0 +1,276 @@
+"""
+Модуль дискового кэша подсветки синтаксиса.
+
+Результат разбора файла (состояния лексера и отрезки токенов каждой строки)
+сохраняется в компактном двоичном виде в ~/.vpycode/cache. Ключом служит
+хэш содержимого вместе с версией токенизатора, поэтому при повторном
+открытии неизменённого файла подсветка восстанавливается без разбора.
+В кэш записывается разбор, уже выполненный подсветчиком (при сохранении
+файла и переключении буфера): если подсветчик разобрал только начало
+текста, сохраняется начало, а остальное разбирается после открытия.
+Размер кэша ограничен, первыми удаляются давно не использованные записи.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import sys
+import threading
+from array import array
+
+# Каталог кэша по умолчанию
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".vpycode", "cache")
+
+_MAGIC = b"VPHC2"
+_HEADER_SIZE = struct.Struct("<I")
+_SUFFIX = ".hlc"
+
+
+class HighlightCache:
+    """Дисковый кэш разбора файлов с вытеснением давно не использованных записей"""
+
+    # Минимальное число строк файла для кэширования
+    MIN_LINES = 200
+    # Ограничения размера кэша
+    MAX_ENTRIES = 64
+    MAX_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        """
+        Args:
+            cache_dir: каталог для файлов кэша
+        """
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+
+    def _path(self, content, tokenizer):
+        digest = hashlib.sha1(tokenizer.version.encode("utf-8") + b"\0" +
+                              content.encode("utf-8", "surrogatepass")).hexdigest()
+        return os.path.join(self.cache_dir, digest + _SUFFIX)
+
+    def supports(self, content, tokenizer):
+        """
+        Проверяет, имеет ли смысл кэшировать разбор текста. Короткие файлы
+        разбираются быстрее, чем читаются из кэша, а синтаксическое дерево
+        tree-sitter не сохраняется на диск.
+        """
+        return (not getattr(tokenizer, "tree_based", False)
+                and content.count("\n") + 1 >= self.MIN_LINES)
+
+    def load(self, content, tokenizer):
+        """
+        Читает разбор текста из кэша.
+
+        Args:
+            content: текст файла
+            tokenizer: токенизатор, которым выполнялся разбор
+
+        Returns:
+            Кортеж (lines, states, spans, valid_upto) или None, если записи нет;
+            строки от valid_upto не разобраны (состояния и отрезки - None)
+        """
+        if not self.supports(content, tokenizer):
+            return None
+        path = self._path(content, tokenizer)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        try:
+            lines = content.split("\n")
+            result = self._decode(data, tokenizer, len(lines))
+        except Exception as e:
+            print(f"[ERROR] Повреждённая запись кэша подсветки {path}: {e}")
+            result = None
+        if result is None:
+            self._remove(path)
+            return None
+
+        # Отмечаем запись как недавно использованную
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        print(f"[DEBUG] Подсветка восстановлена из кэша: {len(lines)} строк")
+        return (lines,) + result
+
+    def store_async(self, content, tokenizer, states, spans):
+        """Сохраняет готовый разбор текста в кэш в фоновом потоке (аргументы как у store)"""
+        if not states or not self.supports(content, tokenizer):
+            return
+        thread = threading.Thread(target=self.store, args=(content, tokenizer, states, spans), daemon=True)
+        thread.start()
+
+    def store(self, content, tokenizer, states, spans):
+        """
+        Сохраняет разбор текста в кэш.
+
+        Args:
+            content: текст файла
+            tokenizer: токенизатор, которым выполнялся разбор
+            states: состояния лексера на конце разобранных строк от начала текста
+            spans: отрезки токенов тех же строк
+
+        Запись, в которой разобрано не меньше строк, не перезаписывается.
+        """
+        path = self._path(content, tokenizer)
+        line_count = content.count("\n") + 1
+        if self._stored_lines(path) >= min(len(states), line_count):
+            return
+        try:
+            data = self._encode(tokenizer, states[:line_count], spans[:line_count], line_count)
+        except Exception as e:
+            print(f"[ERROR] Не удалось подготовить кэш подсветки: {e}")
+            return
+
+        with self._lock:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                temp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(temp_path, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            except OSError as e:
+                print(f"[ERROR] Не удалось записать кэш подсветки: {e}")
+                return
+            self._evict()
+
+    def _stored_lines(self, path):
+        """Количество разобранных строк в записи кэша (0 - записи нет или она не читается)"""
+        try:
+            with open(path, "rb") as f:
+                header = self._read_header(f.read(len(_MAGIC) + _HEADER_SIZE.size), f.read)
+        except (OSError, ValueError, struct.error):
+            return 0
+        if not isinstance(header, dict):
+            return 0  # Чужой или повреждённый файл: запись будет заменена
+        valid = header.get("valid")
+        return valid if isinstance(valid, int) else 0
+
+    @staticmethod
+    def _read_header(prefix, read):
+        """
+        Разбирает заголовок записи.
+
+        Args:
+            prefix: начало записи (сигнатура и длина заголовка)
+            read: функция (количество байт) -> следующие байты записи
+
+        Returns:
+            Заголовок или None при неверной сигнатуре
+        """
+        if not prefix.startswith(_MAGIC):
+            return None
+        (header_size,) = _HEADER_SIZE.unpack_from(prefix, len(_MAGIC))
+        return json.loads(read(header_size).decode("utf-8"))
+
+    def _encode(self, tokenizer, states, spans, line_count):
+        """
+        Упаковывает разбор в двоичный вид: заголовок JSON с таблицей различных
+        состояний, затем массивы номеров состояний, смещений строк в массиве
+        отрезков, номеров тегов, начал и концов отрезков разобранных строк.
+        """
+        tag_ids = {tag: index for index, tag in enumerate(tokenizer.tags)}
+        state_table = []
+        state_ids = {}
+        line_states = array("I")
+        offsets = array("I", [0])
+        span_tags = array("B")
+        span_starts = array("I")
+        span_ends = array("I")
+
+        for state, line_spans in zip(states, spans):
+            state_id = state_ids.get(state)
+            if state_id is None:
+                state_id = state_ids[state] = len(state_table)
+                state_table.append(list(state))
+            line_states.append(state_id)
+            for tag, start, end in line_spans:
+                span_tags.append(tag_ids[tag])
+                span_starts.append(start)
+                span_ends.append(end)
+            offsets.append(len(span_tags))
+
+        header = json.dumps({
+            "version": tokenizer.version,
+            "byteorder": sys.byteorder,
+            "lines": line_count,
+            "valid": len(states),
+            "spans": len(span_tags),
+            "tags": list(tokenizer.tags),
+            "states": state_table,
+        }).encode("utf-8")
+        return b"".join((_MAGIC, _HEADER_SIZE.pack(len(header)), header,
+                         line_states.tobytes(), offsets.tobytes(), span_tags.tobytes(),
+                         span_starts.tobytes(), span_ends.tobytes()))
+
+    def _decode(self, data, tokenizer, line_count):
+        """Распаковывает запись кэша, возвращает (states, spans, valid_upto) или None"""
+        pos = len(_MAGIC) + _HEADER_SIZE.size
+
+        def read_bytes(size):
+            nonlocal pos
+            pos += size
+            return data[pos - size:pos]
+
+        header = self._read_header(data[:pos], read_bytes)
+        if header is None:
+            return None
+        if (header["version"] != tokenizer.version or header["byteorder"] != sys.byteorder
+                or header["lines"] != line_count or header["tags"] != list(tokenizer.tags)):
+            return None
+
+        def read(typecode, count):
+            nonlocal pos
+            values = array(typecode)
+            size = values.itemsize * count
+            values.frombytes(data[pos:pos + size])
+            pos += size
+            return values
+
+        span_count = header["spans"]
+        valid = header["valid"]
+        line_states = read("I", valid)
+        offsets = read("I", valid + 1)
+        span_tags = read("B", span_count)
+        span_starts = read("I", span_count)
+        span_ends = read("I", span_count)
+
+        state_table = [tuple(state) for state in header["states"]]
+        tags = tokenizer.tags
+        states = [state_table[state_id] for state_id in line_states]
+        spans = [[(tags[span_tags[i]], span_starts[i], span_ends[i])
+                  for i in range(offsets[line_no], offsets[line_no + 1])]
+                 for line_no in range(valid)]
+        # Строки после разобранного начала подсветчик разберёт сам
+        states.extend([None] * (line_count - valid))
+        spans.extend([None] * (line_count - valid))
+        return states, spans, valid
+
+    def _evict(self):
+        """Удаляет давно не использованные записи сверх ограничений кэша"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(_SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        entries.sort(reverse=True)
+        total = 0
+        for index, (_, size, name) in enumerate(entries):
+            total += size
+            if index >= self.MAX_ENTRIES or total > self.MAX_BYTES:
+                self._remove(os.path.join(self.cache_dir, name))
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,81 @@
+"""
+Фоновый поток для разбора текста при подсветке синтаксиса.
+
+Поток работает со снимком строк и номером поколения буфера. Новое задание
+делает все предыдущие устаревшими: они прерываются, не дожидаясь конца
+разбора, чтобы при непрерывном наборе текста не тратить время на уже
+неактуальный результат. Задание, разбор которого завершился ошибкой,
+тоже возвращается в очередь результатов - с исключением в поле error.
+"""
+
+import queue
+import threading
+
+from syntax_tokenizer import relex_lines
+
+
+class HighlightJob:
+    """Задание на разбор строк для фонового потока"""
+
+    def __init__(self, generation, tokenizer, lines, states, start, stop):
+        """
+        Args:
+            generation: поколение буфера, для которого создан снимок
+            tokenizer: токенизатор языка
+            lines: снимок строк текста
+            states: снимок кэша состояний строк
+            start: первая строка для разбора
+            stop: строка, до которой разбор обязателен
+        """
+        self.generation = generation
+        self.tokenizer = tokenizer
+        self.lines = lines
+        self.states = states
+        self.start = start
+        self.stop = stop
+        self.result = None
+        self.error = None         # Исключение разбора (задание завершилось неудачей)
+
+
+class HighlightWorker:
+    """Фоновый поток, выполняющий задания HighlightJob"""
+
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.latest_job = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, job):
+        """Ставит задание в очередь, все более старые задания становятся устаревшими"""
+        self.latest_job = job
+        self.jobs.put(job)
+
+    def cancel(self):
+        """Помечает устаревшими все задания"""
+        self.latest_job = None
+
+    def stop(self):
+        """Останавливает поток"""
+        self.jobs.put(None)
+
+    def _is_stale(self, job):
+        return job is not self.latest_job
+
+    def _run(self):
+        """Основной цикл потока"""
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            if self._is_stale(job):
+                continue
+            try:
+                job.result = relex_lines(job.tokenizer, job.lines, job.states,
+                                         job.start, job.stop,
+                                         is_cancelled=lambda: self._is_stale(job))
+            except Exception as e:
+                job.error = e
+            if job.result is not None or job.error is not None:
+                self.results.put(job)
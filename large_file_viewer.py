@@ -0,0 +1,218 @@
+"""
+Модуль просмотра очень больших файлов.
+
+Файл не читается в память целиком: он отображается через mmap, а индекс
+начал строк строится в фоновом потоке. В виджет tk.Text загружается
+только окно из нескольких тысяч строк вокруг видимой области; при
+прокрутке к краю окна оно сдвигается. Переход к строке и поиск работают
+по mmap, не превращая файл в строки Python.
+"""
+
+import mmap
+import threading
+import tkinter as tk
+from array import array
+from bisect import bisect_right
+
+
+class LargeFileViewer:
+    """Постраничный просмотр файла через mmap в виджете tk.Text (только чтение)"""
+
+    # Файлы такого размера (байт) и больше открываются в режиме просмотра
+    THRESHOLD = 64 * 1024 * 1024
+    # Количество строк в окне, загруженном в виджет
+    PAGE_LINES = 2000
+    # Ограничение размера окна в байтах (для файлов с очень длинными строками)
+    PAGE_BYTES = 4 * 1024 * 1024
+    # Окно сдвигается, когда видимая область ближе этой доли окна к его краю
+    EDGE = 0.1
+    # Интервал обновления прогресса индексации (мс)
+    POLL_INTERVAL = 200
+
+    def __init__(self, text_widget, on_progress=None, on_page=None):
+        """
+        Args:
+            text_widget: виджет tk.Text
+            on_progress: функция (проиндексировано строк, индексация завершена)
+            on_page: функция без аргументов, вызываемая после загрузки в виджет нового окна строк
+        """
+        self.text = text_widget
+        self.on_progress = on_progress
+        self.on_page = on_page
+        self.active = False
+        self.swapping = False     # В виджет загружается окно: правки виджета - не правки буфера
+        self.path = None
+        self.first = 0            # Номер первой строки окна в файле (с нуля)
+        self.offsets = array("q") # Смещения начал строк
+        self.indexed = False      # Индекс построен до конца файла
+        self._file = None
+        self._map = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._poll_job = None
+
+    def open(self, path):
+        """Открывает файл и показывает его начало"""
+        self.close()
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.path = path
+        self.active = True
+        self.offsets = array("q", [0])
+        self.indexed = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._build_index, args=(self._map, self.offsets, self._stop),
+                                        daemon=True)
+        self._thread.start()
+        self._poll_job = self.text.after(self.POLL_INTERVAL, self._poll_index)
+        self.show(0)
+
+    def close(self):
+        """Закрывает файл и возвращает виджету возможность редактирования"""
+        if not self.active:
+            return
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        if self._poll_job is not None:
+            self.text.after_cancel(self._poll_job)
+            self._poll_job = None
+        self._map.close()
+        self._file.close()
+        self._map = self._file = self._thread = None
+        self.active = False
+        self.path = None
+        self.first = 0
+        self.text.configure(state="normal")
+
+    @staticmethod
+    def _build_index(data, offsets, stop):
+        """Собирает смещения начал строк (выполняется в фоновом потоке)"""
+        find = data.find
+        append = offsets.append
+        position = find(b"\n")
+        count = 0
+        while position != -1:
+            append(position + 1)
+            count += 1
+            if not count & 0xFFFF and stop.is_set():
+                return
+            position = find(b"\n", position + 1)
+
+    def _poll_index(self):
+        """Сообщает о прогрессе индексации, пока фоновый поток не завершится"""
+        self._poll_job = None
+        if not self.active:
+            return
+        done = not self._thread.is_alive()
+        self.indexed = done
+        if self.on_progress:
+            self.on_progress(self.line_count(), done)
+        if not done:
+            self._poll_job = self.text.after(self.POLL_INTERVAL, self._poll_index)
+
+    def line_count(self):
+        """Количество проиндексированных строк"""
+        return len(self.offsets)
+
+    def line_of_offset(self, offset):
+        """Номер строки (с нуля), содержащей байтовое смещение"""
+        return bisect_right(self.offsets, offset) - 1
+
+    def _read(self, first, stop):
+        """Декодирует строки [first, stop) из mmap"""
+        start = self.offsets[first]
+        end = self.offsets[stop] - 1 if stop < len(self.offsets) else len(self._map)
+        end = min(end, start + self.PAGE_BYTES)
+        return self._map[start:end].decode("utf-8", errors="replace")
+
+    def show(self, line, top=None):
+        """
+        Загружает окно строк вокруг строки line (с нуля) и прокручивает к ней.
+
+        Args:
+            line: строка, которая должна оказаться в окне
+            top: строка файла, которая должна оказаться вверху видимой области
+        """
+        count = self.line_count()
+        first = max(min(line - self.PAGE_LINES // 2, count - self.PAGE_LINES), 0)
+        stop = min(first + self.PAGE_LINES, count)
+        if not self.indexed and stop == count:
+            # Конец индекса ещё не достигнут: хвост окна дочитаем при следующем сдвиге
+            stop = max(stop - 1, first + 1)
+        self.first = first
+        self.text.configure(state="normal")
+        self.swapping = True
+        try:
+            self.text.delete("1.0", tk.END)
+            self.text.insert("1.0", self._read(first, stop))
+        finally:
+            self.swapping = False
+            self.text.configure(state="disabled")
+        self.text.edit_reset()
+        if top is not None:
+            self.text.yview(f"{top - first + 1}.0")
+        if self.on_page:
+            self.on_page()
+
+    def goto(self, line):
+        """Переходит к строке line (с единицы)"""
+        line = max(min(line - 1, self.line_count() - 1), 0)
+        if not self.first <= line < self.first + self.loaded_lines():
+            self.show(line)
+        index = f"{line - self.first + 1}.0"
+        self.text.mark_set(tk.INSERT, index)
+        self.text.see(index)
+
+    def loaded_lines(self):
+        """Количество строк в загруженном окне"""
+        return int(self.text.index("end-1c").split(".")[0])
+
+    def search(self, pattern, after_line=0):
+        """
+        Ищет текст в файле начиная со строки after_line (с нуля), с переходом в начало.
+
+        Returns:
+            Номер строки с единицы или None, если текст не найден
+        """
+        needle = pattern.encode("utf-8")
+        if not needle:
+            return None
+        start = self.offsets[min(after_line, self.line_count() - 1)]
+        position = self._map.find(needle, start)
+        if position == -1:
+            position = self._map.find(needle, 0, start)
+        if position == -1:
+            return None
+        return self.line_of_offset(position) + 1
+
+    def on_scroll(self, first, last):
+        """
+        Сдвигает окно при приближении видимой области к его краю.
+
+        Args:
+            first, last: доли окна из yscrollcommand виджета
+
+        Returns:
+            Доли всего файла (first, last) для полосы прокрутки
+        """
+        first, last = float(first), float(last)
+        loaded = self.loaded_lines()
+        top = self.first + int(first * loaded)
+        count = self.line_count()
+        at_start = self.first == 0
+        at_end = self.first + loaded >= count
+        if (last > 1 - self.EDGE and not at_end) or (first < self.EDGE and not at_start):
+            self.show(top, top=top)
+            loaded = self.loaded_lines()
+            first, last = map(float, self.text.yview())
+        total = max(count, 1)
+        return (self.first + first * loaded) / total, (self.first + last * loaded) / total
+
+    def yview(self, *args):
+        """Команда полосы прокрутки: перемещение по всему файлу"""
+        if args and args[0] == "moveto":
+            line = int(float(args[1]) * self.line_count())
+            self.show(line, top=line)
+        else:
+            self.text.yview(*args)
@@ -0,0 +1,281 @@
+"""
+Модуль выбора токенизатора для подсветки синтаксиса по типу файла.
+
+Для Python используется собственный быстрый токенизатор, для остальных
+языков - лексеры pygments. Экземпляры лексеров создаются лениво при первом
+открытии файла с данным расширением и кэшируются.
+"""
+
+import os
+import re
+
+import pygments
+from pygments.lexer import RegexLexer, _TokenType
+from pygments.lexers import get_lexer_by_name, get_lexer_for_filename
+from pygments.token import Token
+from pygments.util import ClassNotFound
+
+from syntax_tokenizer import HIGHLIGHT_TAGS, PythonTokenizer
+from tree_sitter_backend import create_python_tokenizer
+
+# Соответствие типов токенов pygments тегам темы Kanagawa (проверяются по порядку)
+TOKEN_TAGS = [
+    (Token.Comment, "comment"),
+    (Token.Literal.String, "string"),
+    (Token.Literal.Number, "number"),
+    (Token.Operator.Word, "keyword"),
+    (Token.Keyword, "keyword"),
+    (Token.Name.Function, "function"),
+    (Token.Name.Class, "class"),
+    (Token.Name.Decorator, "function"),
+    (Token.Name.Tag, "keyword"),
+    (Token.Name.Attribute, "function"),
+    (Token.Operator, "operator"),
+]
+
+# Конструкции регулярных выражений, которые могут захватить перевод строки
+_SPANNING = (r"\n", r"\s", r"\W", r"\D", "[^", "(?s")
+
+
+class PygmentsTokenizer:
+    """
+    Токенизатор на основе лексера pygments.
+
+    Для лексеров на регулярных выражениях, правила которых не выходят за
+    конец строки, состоянием строки служит стек состояний лексера, поэтому
+    разбор можно продолжить с любой строки. Остальные лексеры (многострочные
+    комментарии и строки одним правилом, ExtendedRegexLexer с контекстом,
+    лексеры с собственным циклом разбора) разбирают текст целиком от начала.
+    """
+
+    tags = HIGHLIGHT_TAGS
+    initial_state = ("root",)
+
+    def __init__(self, lexer):
+        """
+        Args:
+            lexer: экземпляр лексера pygments
+        """
+        self.lexer = lexer
+        # Версия разбора для дискового кэша
+        self.version = f"pygments-{pygments.__version__}-{type(lexer).__name__}"
+        self._tag_cache = {}
+        self.resumable = _line_bounded(lexer, self.tag_for)
+
+    def tag_for(self, token_type):
+        """Возвращает тег подсветки для типа токена или None"""
+        try:
+            return self._tag_cache[token_type]
+        except KeyError:
+            tag = None
+            for parent, candidate in TOKEN_TAGS:
+                if token_type in parent:
+                    tag = candidate
+                    break
+            self._tag_cache[token_type] = tag
+            return tag
+
+    def tokenize_line(self, line, state):
+        """
+        Разбирает одну строку кода.
+
+        Returns:
+            Кортеж (spans, new_state), где spans - список (тег, начальная колонка, конечная колонка)
+        """
+        if self.resumable:
+            tokens, state = self._lex_with_stack(line + "\n", state)
+        else:
+            tokens = self.lexer.get_tokens_unprocessed(line + "\n")
+
+        spans = []
+        length = len(line)
+        for pos, token_type, value in tokens:
+            if pos >= length:
+                break
+            tag = self.tag_for(token_type)
+            if tag and value:
+                _append_span(spans, tag, pos, min(pos + len(value), length))
+        return spans, state
+
+    def tokenize_lines(self, lines, stop, is_cancelled=None):
+        """
+        Разбирает текст целиком от начала, пока не будут разобраны строки до stop.
+
+        Args:
+            lines: строки текста
+            stop: строка, до которой нужен разбор
+            is_cancelled: функция без аргументов, возвращающая True для прерывания разбора
+
+        Returns:
+            Список отрезков строк [0, stop) или None при прерывании
+        """
+        spans = [[] for _ in range(stop)]
+        if not stop:
+            return spans
+        text = "\n".join(lines) + "\n"
+        row = 0
+        row_start = 0
+        row_end = len(lines[0])  # Позиция перевода строки row
+        tokens = self.lexer.get_tokens_unprocessed(text)
+        for count, (pos, token_type, value) in enumerate(tokens):
+            if is_cancelled and not count & 0x3FF and is_cancelled():
+                return None
+            end = pos + len(value)
+            tag = self.tag_for(token_type)
+            # Многострочный токен делится по строкам
+            while pos < end:
+                while pos > row_end:
+                    row += 1
+                    if row >= stop:
+                        return spans
+                    row_start = row_end + 1
+                    row_end = row_start + len(lines[row])
+                if tag and pos < row_end:
+                    _append_span(spans[row], tag, pos - row_start, min(end, row_end) - row_start)
+                pos = min(end, row_end + 1)
+        return spans
+
+    def _lex_with_stack(self, text, stack):
+        """
+        Повторяет цикл RegexLexer.get_tokens_unprocessed, но возвращает
+        итоговый стек состояний вместе с токенами.
+        """
+        lexer = self.lexer
+        tokendefs = lexer._tokens
+        statestack = list(stack)
+        statetokens = tokendefs[statestack[-1]]
+        tokens = []
+        pos = 0
+        length = len(text)
+        while pos < length:
+            for rexmatch, action, new_state in statetokens:
+                m = rexmatch(text, pos)
+                if not m:
+                    continue
+                if action is not None:
+                    if type(action) is _TokenType:
+                        tokens.append((pos, action, m.group()))
+                    else:
+                        tokens.extend(action(lexer, m))
+                if m.end() == pos and new_state is None:
+                    # Пустое совпадение без смены состояния - пропускаем символ
+                    pos += 1
+                pos = max(pos, m.end())
+                if new_state is not None:
+                    if isinstance(new_state, tuple):
+                        for state in new_state:
+                            if state == '#pop':
+                                if len(statestack) > 1:
+                                    statestack.pop()
+                            elif state == '#push':
+                                statestack.append(statestack[-1])
+                            else:
+                                statestack.append(state)
+                    elif isinstance(new_state, int):
+                        if abs(new_state) >= len(statestack):
+                            del statestack[1:]
+                        else:
+                            del statestack[new_state:]
+                    elif new_state == '#push':
+                        statestack.append(statestack[-1])
+                    statetokens = tokendefs[statestack[-1]]
+                break
+            else:
+                if text[pos] == "\n":
+                    # На конце строки без совпадений лексер возвращается в корневое состояние
+                    statestack = ["root"]
+                    statetokens = tokendefs["root"]
+                pos += 1
+        return tokens, tuple(statestack)
+
+
+def _append_span(spans, tag, start, end):
+    """Добавляет отрезок, объединяя его с предыдущим соседним отрезком того же тега"""
+    if spans and spans[-1][0] == tag and spans[-1][2] == start:
+        spans[-1] = (tag, spans[-1][1], end)
+    else:
+        spans.append((tag, start, end))
+
+
+def _line_bounded(lexer, tag_for):
+    """
+    Можно ли разбирать текст лексером построчно, продолжая со стека состояний.
+
+    Это так для RegexLexer без собственного цикла разбора, если ни одно правило,
+    дающее тег или меняющее состояние, не может захватить перевод строки
+    внутри совпадения. Правила без тега (пробелы) безопасны: на следующей
+    строке они совпадут снова.
+    """
+    if not isinstance(lexer, RegexLexer):
+        return False
+    # ExtendedRegexLexer и лексеры с постобработкой переопределяют цикл разбора
+    if type(lexer).get_tokens_unprocessed is not RegexLexer.get_tokens_unprocessed:
+        return False
+    for rules in lexer._tokens.values():
+        for rexmatch, action, new_state in rules:
+            if type(action) is _TokenType and tag_for(action) is None and new_state is None:
+                continue
+            pattern = rexmatch.__self__
+            if pattern.flags & re.DOTALL or any(marker in pattern.pattern for marker in _SPANNING):
+                return False
+    return True
+
+
+class LexerRegistry:
+    """Реестр токенизаторов с кэшированием по расширению файла"""
+
+    def __init__(self):
+        self._tokenizers = {}  # Расширение -> токенизатор (None - подсветки нет)
+        self._factories = {}   # Расширение -> функция, создающая лексер pygments
+        # Python разбирается инкрементально через tree-sitter, если он установлен
+        self._python = create_python_tokenizer() or PythonTokenizer()
+
+    def register(self, extensions, lexer):
+        """
+        Регистрирует лексер для расширений файлов. Лексер создаётся при первом использовании.
+
+        Args:
+            extensions: список расширений (".js", ...)
+            lexer: имя лексера pygments, класс лексера или функция без аргументов,
+                   возвращающая экземпляр лексера
+        """
+        if isinstance(lexer, str):
+            factory = lambda name=lexer: get_lexer_by_name(name)
+        else:
+            factory = lexer
+        for extension in extensions:
+            extension = extension.lower()
+            self._factories[extension] = factory
+            self._tokenizers.pop(extension, None)
+
+    def tokenizer_for(self, file_path):
+        """
+        Возвращает токенизатор для файла.
+
+        Args:
+            file_path: путь к файлу или None для несохранённого буфера (Python)
+
+        Returns:
+            Токенизатор или None, если язык не поддерживается
+        """
+        if not file_path:
+            return self._python
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == ".py":
+            return self._python
+        # Файлы без расширения (Makefile, Dockerfile) кэшируются по имени
+        key = extension or os.path.basename(file_path).lower()
+        if key in self._tokenizers:
+            return self._tokenizers[key]
+
+        tokenizer = None
+        try:
+            factory = self._factories.get(extension)
+            lexer = factory() if factory else get_lexer_for_filename(file_path)
+            tokenizer = PygmentsTokenizer(lexer)
+        except ClassNotFound:
+            pass
+        except Exception as e:
+            print(f"[ERROR] Не удалось создать лексер для {key}: {e}")
+        self._tokenizers[key] = tokenizer
+        return tokenizer
@@ -0,0 +1,123 @@
+"""
+Модуль панели номеров строк редактора.
+
+Номера рисуются на холсте только для видимых строк по координатам из
+dlineinfo, поэтому перерисовка не зависит от размера файла. Элементы
+холста переиспользуются между перерисовками, а при неизменной видимой
+области и активной строке перерисовка пропускается.
+"""
+
+import tkinter as tk
+import tkinter.font as tkfont
+
+
+class LineNumberGutter(tk.Canvas):
+    """Холст с номерами видимых строк виджета tk.Text"""
+
+    def __init__(self, master, text_widget, font, fg, active_fg, bg, padx=5, **kwargs):
+        """
+        Args:
+            master: родительский виджет
+            text_widget: виджет tk.Text, строки которого нумеруются
+            font: шрифт номеров (кортеж Tk)
+            fg: цвет номеров
+            active_fg: цвет номера строки с курсором
+            bg: цвет фона
+            padx: отступ номеров от краёв панели
+        """
+        super().__init__(master, bg=bg, bd=0, highlightthickness=0, takefocus=0, **kwargs)
+        self.text = text_widget
+        self.fg = fg
+        self.active_fg = active_fg
+        self.padx = padx
+        self.line_offset = 0      # Сдвиг номеров (строки виджета - окно внутри большого файла)
+        self.font = tkfont.Font(font=font)
+        self._items = []          # Переиспользуемые элементы холста
+        self._digits = 0          # Количество цифр, под которое рассчитана ширина
+        self._state = None        # Параметры последней перерисовки
+        self._redraw_job = None
+        self.set_width(1)
+        self.bind("<Configure>", lambda e: self.schedule_redraw())
+        # Колесо мыши над панелью прокручивает редактор
+        self.bind("<MouseWheel>", self._on_mousewheel)
+        self.bind("<Button-4>", lambda e: self.text.yview_scroll(-1, "units"))
+        self.bind("<Button-5>", lambda e: self.text.yview_scroll(1, "units"))
+
+    def _on_mousewheel(self, event):
+        self.text.yview_scroll(-1 if event.delta > 0 else 1, "units")
+        return "break"
+
+    def set_font(self, font):
+        """Меняет шрифт номеров"""
+        self.font.configure(**tkfont.Font(font=font).actual())
+        self._digits = 0
+        self._state = None
+        self.schedule_redraw()
+
+    def set_colors(self, fg, active_fg, bg):
+        """Меняет цвета панели"""
+        self.fg = fg
+        self.active_fg = active_fg
+        self.configure(bg=bg)
+        self._state = None
+        self.schedule_redraw()
+
+    def set_width(self, digits):
+        """Подбирает ширину панели под номера из digits цифр (не меньше трёх)"""
+        digits = max(digits, 3)
+        if digits != self._digits:
+            self._digits = digits
+            self.configure(width=self.font.measure("9" * digits) + 2 * self.padx)
+
+    def schedule_redraw(self):
+        """Откладывает перерисовку до простоя цикла событий, когда раскладка текста готова"""
+        if self._redraw_job is None:
+            self._redraw_job = self.after_idle(self._run_scheduled_redraw)
+
+    def _run_scheduled_redraw(self):
+        self._redraw_job = None
+        self.redraw()
+
+    def redraw(self):
+        """Перерисовывает номера видимых строк"""
+        text = self.text
+        total = int(text.index("end-1c").split(".")[0])
+        active = int(text.index(tk.INSERT).split(".")[0])
+        first = text.index("@0,0")
+        first_info = text.dlineinfo(first)
+        height = text.winfo_height()
+        # Последняя видимая строка меняется и при скрытии строк (elide) выше неё
+        last = text.index(f"@0,{height}")
+        state = (first, first_info and first_info[1], last, total, active, height, self.line_offset)
+        if state == self._state:
+            return
+        self._state = state
+        self.set_width(len(str(total + self.line_offset)))
+
+        x = int(self.cget("width")) - self.padx
+        used = 0
+        y = first_info[1] if first_info else height
+        while y < height:
+            # Следующая экранная строка: переносы и скрытые (elide) строки пропускаются сами
+            index = text.index(f"@0,{y}")
+            info = text.dlineinfo(index)
+            if info is None or info[1] + info[3] <= y:
+                break
+            y = info[1] + info[3]
+            line, column = map(int, index.split("."))
+            if column:
+                continue
+            color = self.active_fg if line == active else self.fg
+            if used < len(self._items):
+                item = self._items[used]
+                self.coords(item, x, info[1])
+                self.itemconfigure(item, text=str(line + self.line_offset), fill=color, state="normal")
+            else:
+                item = self.create_text(x, info[1], anchor="ne", text=str(line + self.line_offset),
+                                        fill=color, font=self.font)
+                self._items.append(item)
+            used += 1
+
+        # Лишние элементы скрываем, чтобы не создавать их заново при прокрутке
+        for item in self._items[used:]:
+            self.itemconfigure(item, state="hidden")
@@ -0,0 +1,68 @@
+"""
+Модуль защиты редактора от очень длинных строк.
+
+Одна строка в сотни килобайт (минифицированный JS, дамп JSON) делает
+виджет tk.Text и подсветку синтаксиса крайне медленными. В защищённом
+режиме подсветка ограничивается первыми колонками строк, а хвосты длинных
+строк скрываются тегом с elide и раскрываются по запросу.
+"""
+
+import tkinter as tk
+
+
+class LongLineGuard:
+    """Защищённый режим для файлов с патологически длинными строками"""
+
+    # Строка такой длины включает защищённый режим при открытии файла
+    LONG_LINE_THRESHOLD = 5000
+    # Подсветка синтаксиса выполняется только до этой колонки
+    COLUMN_LIMIT = 1000
+    # Текст строки после этой колонки скрывается
+    ELIDE_COLUMN = 2000
+
+    def __init__(self, text_widget):
+        """
+        Args:
+            text_widget: виджет tk.Text
+        """
+        self.text = text_widget
+        self.active = False
+        self.text.tag_configure("elided", elide=True)
+
+    def detect(self, content):
+        """Проверяет, есть ли в тексте строки длиннее порога"""
+        return any(len(line) > self.LONG_LINE_THRESHOLD for line in content.split("\n"))
+
+    def enable(self):
+        """Включает защищённый режим и скрывает хвосты длинных строк"""
+        self.active = True
+        self.elide_long_lines()
+
+    def disable(self):
+        """Выключает защищённый режим и показывает весь текст"""
+        self.active = False
+        self.reveal_all()
+
+    def elide_long_lines(self):
+        """Скрывает текст длинных строк после ELIDE_COLUMN одним вызовом tag_add"""
+        lines = self.text.get("1.0", "end-1c").split("\n")
+        indices = []
+        for row, line in enumerate(lines, 1):
+            if len(line) > self.ELIDE_COLUMN:
+                indices.extend((f"{row}.{self.ELIDE_COLUMN}", f"{row}.end"))
+        if indices:
+            self.text.tag_add("elided", *indices)
+        return len(indices) // 2
+
+    def reveal(self, index=tk.INSERT):
+        """Показывает скрытый текст строки, в которой находится индекс"""
+        row = self.text.index(index).split(".")[0]
+        self.text.tag_remove("elided", f"{row}.0", f"{row}.end")
+
+    def reveal_all(self):
+        """Показывает весь скрытый текст"""
+        self.text.tag_remove("elided", "1.0", tk.END)
+
+    def hidden_count(self):
+        """Возвращает количество строк со скрытым текстом"""
+        return len(self.text.tag_ranges("elided")) // 2
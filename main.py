@@ -2,10 +2,7 @@ import os
 import sys
 import tkinter as tk
 import customtkinter as ctk
-from tkinter import filedialog, messagebox, scrolledtext
-from pygments import highlight
-from pygments.lexers import get_lexer_for_filename, Python3Lexer
-from pygments.formatters import get_formatter_by_name
+from tkinter import filedialog, messagebox, scrolledtext, simpledialog
 import subprocess
 import tempfile
 import threading
@@ -23,6 +20,29 @@ from ai_defaults import DEFAULT_AI_PROMPT, DEFAULT_API_SETTINGS, CODE_BLOCK_PATT
 # Импортируем систему плагинов
 from plugins.manager import PluginManager
 
+# Инкрементальная подсветка синтаксиса
+from syntax_highlighter import IncrementalHighlighter
+from lexer_registry import LexerRegistry
+from highlight_cache import HighlightCache
+from long_line_guard import LongLineGuard
+from bracket_index import BracketIndex
+from line_gutter import LineNumberGutter
+from editor_views import PeerText
+from change_scheduler import ChangeScheduler
+from document import Document
+from edit_tracker import EditTracker
+from large_file_viewer import LargeFileViewer
+from file_loader import ChunkedFileLoader
+from whitespace_renderer import WhitespaceRenderer
+from buffer_manager import Buffer, BufferManager
+from paste_guard import PasteGuard
+from edit_events import EditEventStream
+from undo_history import UndoHistory, content_digest
+from recovery_journal import RecoveryJournal, RecoveryWriter, pending_recoveries
+from code_folding import FoldManager
+from file_saver import FileSaver
+from semantic_highlighter import SemanticHighlighter
+
 # Импортируем модули для работы с чтением файлов
 try:
     import read_file_handler
@@ -65,6 +85,9 @@ class KanagawaTheme:
     NUMBER = "#FF9E64"      # Orange for numbers
     CLASS = "#7FB4CA"       # Cyan for classes
     OPERATOR = "#FF5D62"    # Red for operators
+    PARAMETER = "#B8B4D0"   # Light violet for parameters
+    DECORATOR = "#E6C384"   # Yellow for decorators
+    BUILTIN = "#7AA89F"     # Aqua for builtins
     
     # UI colors
     SELECTION = "#2D4F67"
@@ -119,9 +142,18 @@ class EditorSettings:
             'new_file': 'Control-n',
             'find': 'Control-f',
             'toggle_console': 'Control-grave',  # Control + `
-            'toggle_explorer': 'Control-b'
+            'toggle_explorer': 'Control-b',
+            'jump_to_bracket': 'Control-bracketright',
+            'next_buffer': 'Control-Tab',
+            'toggle_fold': 'Control-braceleft',
+            'split_view': 'Control-backslash'
         }
         
+        # Сколько мегабайт текста неактивных буферов хранится несжатым
+        self.buffer_memory_mb = 64
+        # Сбрасывать сохраняемые файлы на диск (fsync) перед подменой старой версии
+        self.fsync_on_save = True
+        
     def get_font(self):
         """Returns the font tuple based on current settings"""
         return (self.font_family, self.font_size)
@@ -137,6 +169,8 @@ class EditorSettings:
                     'tab_size': self.tab_size,
                     'use_spaces_for_tab': self.use_spaces_for_tab,
                     'show_whitespace': self.show_whitespace,
+                    'buffer_memory_mb': self.buffer_memory_mb,
+                    'fsync_on_save': self.fsync_on_save,
                     'hotkeys': self.hotkeys,
                     'ai_api_key': self.ai_api_key,
                     'ai_initial_prompt': self.ai_initial_prompt
@@ -156,7 +190,9 @@ class EditorSettings:
                 self.tab_size = data.get('tab_size', self.tab_size)
                 self.use_spaces_for_tab = data.get('use_spaces_for_tab', self.use_spaces_for_tab)
                 self.show_whitespace = data.get('show_whitespace', self.show_whitespace)
-                self.hotkeys = data.get('hotkeys', self.hotkeys)
+                self.buffer_memory_mb = data.get('buffer_memory_mb', self.buffer_memory_mb)
+                self.fsync_on_save = data.get('fsync_on_save', self.fsync_on_save)
+                self.hotkeys = {**self.hotkeys, **data.get('hotkeys', {})}
                 self.ai_api_key = data.get('ai_api_key', self.ai_api_key)
                 self.ai_initial_prompt = data.get('ai_initial_prompt', self.ai_initial_prompt)
             return True
@@ -192,6 +228,15 @@ class CodeEditor(ctk.CTk):
             }
         }
         
+        # Токенизаторы для подсветки синтаксиса (плагины регистрируют свои языки)
+        self.lexer_registry = LexerRegistry()
+        # Дисковый кэш разбора файлов (~/.vpycode/cache)
+        self.highlight_cache = HighlightCache()
+        # Файлы сохраняются в фоновом потоке через временный файл и os.replace
+        self.file_saver = FileSaver(fsync=self.settings.fsync_on_save)
+        self._save_poll_job = None
+        self._save_callbacks = {}  # SaveJob -> функции, вызываемые после успешной записи файла
+        
         # Отключаем стандартную строку заголовка только в Windows
         if os.name == 'nt':
             self.protocol("WM_DELETE_WINDOW", self.quit)
@@ -211,6 +256,10 @@ class CodeEditor(ctk.CTk):
         self.temp_file = None
         self.current_filetype = '.py'  # По умолчанию Python для подсветки
         
+        # Открытые буферы: в виджете только активный, остальные хранятся снимками
+        self.buffers = BufferManager(self.settings.buffer_memory_mb * 1024 * 1024)
+        self.buffer_modified = False
+        
         # Номера строк и активная строка
         self.active_line = None
         
@@ -240,6 +289,9 @@ class CodeEditor(ctk.CTk):
         # Настройка интерфейса
         self.setup_ui()
         
+        # Буферы, оставшиеся несохранёнными после аварийного завершения
+        self.after(300, self.offer_recovery)
+        
         # Теперь когда интерфейс создан, загружаем и активируем плагины
         print("[DEBUG] Начинаем загрузку и активацию плагинов")
         self.plugin_manager.load_plugins()
@@ -405,6 +457,15 @@ class CodeEditor(ctk.CTk):
                                        text_color=KanagawaTheme.FOREGROUND, font=("Arial", 10))
         open_editors_label.pack(side="left", padx=10)
         
+        # Список открытых буферов: щелчок переключает, средняя кнопка закрывает
+        self.open_editors_list = tk.Listbox(open_editors_frame, bg=KanagawaTheme.DARKER_BG,
+                                            fg=KanagawaTheme.FOREGROUND, bd=0, highlightthickness=0,
+                                            selectbackground=KanagawaTheme.SELECTION,
+                                            font=("Consolas", 10), height=5, activestyle="none")
+        self.open_editors_list.pack(fill="x", padx=5)
+        self.open_editors_list.bind("<ButtonRelease-1>", self.on_open_editor_click)
+        self.open_editors_list.bind("<ButtonRelease-2>", self.on_open_editor_close)
+        
         # Дерево файлов проекта
         self.project_tree = tk.Listbox(self.project_frame, bg=KanagawaTheme.DARKER_BG, 
                                     fg=KanagawaTheme.FOREGROUND, bd=0, highlightthickness=0,
@@ -425,16 +486,7 @@ class CodeEditor(ctk.CTk):
         editor_frame.grid(row=0, column=0, sticky="nsew", padx=0, pady=0)
         editor_frame.grid_rowconfigure(0, weight=1)
         editor_frame.grid_columnconfigure(1, weight=1)
-        
-        # Номера строк
-        self.line_numbers = tk.Text(editor_frame, width=4, padx=5, pady=5, bd=0,
-                                 bg=KanagawaTheme.BACKGROUND, fg=KanagawaTheme.COMMENT,
-                                 insertbackground=KanagawaTheme.CURSOR,
-                                 selectbackground=KanagawaTheme.SELECTION,
-                                 font=self.settings.get_font(), takefocus=0)
-        self.line_numbers.grid(row=0, column=0, sticky="ns")
-        self.line_numbers.insert("1.0", "1")
-        self.line_numbers.configure(state="disabled")
+        self.editor_frame = editor_frame
         
         # Текстовый редактор
         self.code_editor = tk.Text(editor_frame, wrap="none", bd=0, padx=5, pady=5,
@@ -443,32 +495,128 @@ class CodeEditor(ctk.CTk):
                                 selectbackground=KanagawaTheme.SELECTION,
                                 font=self.settings.get_font())
         self.code_editor.grid(row=0, column=1, sticky="nsew", padx=0, pady=0)
+        # code_editor - окно с фокусом, main_editor - основное окно буфера
+        self.main_editor = self.code_editor
+        
+        # Модель документа: текст и индекс строк на Python, синхронизируются по перехваченным правкам
+        self.document = Document()
+        self.edit_events = EditEventStream()
+        self._replacing_buffer = False  # Текст виджета заменяется другим буфером, а не правится
+        # История отмены на дельтах правок; для файлов сохраняется в журнал на диске
+        self.undo_history = UndoHistory()
+        # Журнал восстановления: правки несохранённого буфера дописываются на диск дельтами
+        self.recovery_writer = RecoveryWriter()
+        self.recovered_buffers = pending_recoveries()
+        self.recovery = RecoveryJournal(self.recovery_writer)
+        self._recovery_job = None
+        self.edit_tracker = EditTracker(self.code_editor)
+        self.edit_tracker.listeners.append(self.on_editor_edit)
+        self.main_tracker = self.edit_tracker
+        
+        # Номера строк рисуются на холсте только для видимых строк
+        self.line_numbers = LineNumberGutter(editor_frame, self.code_editor, self.settings.get_font(),
+                                             fg=KanagawaTheme.COMMENT, active_fg=KanagawaTheme.FOREGROUND,
+                                             bg=KanagawaTheme.BACKGROUND)
+        self.line_numbers.grid(row=0, column=0, sticky="ns")
         
         # Настройка визуализации пробелов
         self.code_editor.tag_configure("whitespace", foreground="#404040")
+        self.code_editor.tag_configure("whitespace_tab", background=KanagawaTheme.LIGHTER_BG)
+        self.code_editor.tag_configure("whitespace_trailing", background=KanagawaTheme.DELETION)
+        self.whitespace_renderer = WhitespaceRenderer(self.code_editor)
+        self.whitespace_renderer.document = self.document
+        self.whitespace_renderer.enabled = self.settings.show_whitespace
+        
+        # Настройка тегов для подсветки в цветах Kanagawa
+        self.code_editor.tag_configure("keyword", foreground=KanagawaTheme.KEYWORD)
+        self.code_editor.tag_configure("string", foreground=KanagawaTheme.STRING)
+        self.code_editor.tag_configure("comment", foreground=KanagawaTheme.COMMENT)
+        self.code_editor.tag_configure("function", foreground=KanagawaTheme.FUNCTION)
+        self.code_editor.tag_configure("class", foreground=KanagawaTheme.CLASS)
+        self.code_editor.tag_configure("number", foreground=KanagawaTheme.NUMBER)
+        self.code_editor.tag_configure("operator", foreground=KanagawaTheme.OPERATOR)
+        
+        # Подсветчик перекрашивает только изменившиеся строки
+        self.highlighter = IncrementalHighlighter(self.code_editor)
+        self.highlighter.document = self.document
+        
+        # Семантическая подсветка (ast в отдельном процессе) поверх лексической
+        self.code_editor.tag_configure("semantic_function", foreground=KanagawaTheme.FUNCTION)
+        self.code_editor.tag_configure("semantic_class", foreground=KanagawaTheme.CLASS)
+        self.code_editor.tag_configure("parameter", foreground=KanagawaTheme.PARAMETER)
+        self.code_editor.tag_configure("decorator", foreground=KanagawaTheme.DECORATOR)
+        self.code_editor.tag_configure("builtin", foreground=KanagawaTheme.BUILTIN)
+        self.semantic_highlighter = SemanticHighlighter(self.code_editor, self.highlighter)
+        
+        # Защищённый режим для файлов с очень длинными строками
+        self.long_line_guard = LongLineGuard(self.code_editor)
+        
+        # Постраничный просмотр очень больших файлов через mmap (только чтение)
+        self.large_file = LargeFileViewer(self.code_editor, on_progress=self.on_large_file_progress,
+                                          on_page=self.on_large_file_page)
+        
+        # Потоковая загрузка файлов среднего размера
+        self.file_loader = ChunkedFileLoader(self.code_editor)
+        
+        # Большие вставки из буфера обмена вставляются порциями, анализ - один раз после вставки
+        self.paste_guard = PasteGuard(self.code_editor)
+        self.plain_text = False  # Буфер показывается без подсветки синтаксиса
+        
+        # Индекс скобок и отступов: парные и радужные скобки, направляющие отступов
+        self.code_editor.tag_configure("indent_guide", background=KanagawaTheme.LIGHTER_BG)
+        self.code_editor.tag_configure("bracket_0", foreground=KanagawaTheme.DECORATOR)
+        self.code_editor.tag_configure("bracket_1", foreground=KanagawaTheme.KEYWORD)
+        self.code_editor.tag_configure("bracket_2", foreground=KanagawaTheme.FUNCTION)
+        self.code_editor.tag_configure("bracket_match", background=KanagawaTheme.SELECTION)
+        self.code_editor.tag_configure("bracket_mismatch", foreground=KanagawaTheme.CONSOLE_ERROR)
+        self.bracket_index = BracketIndex(self.code_editor, self.settings.tab_size)
+        self.bracket_index.document = self.document
+        
+        # Сворачивание блоков по отступам: свёрнутые строки скрыты elide и не размечаются
+        self.folds = FoldManager(self.code_editor, self.bracket_index)
+        self.code_editor.tag_configure(FoldManager.HEAD_TAG, underline=True)
+        self.highlighter.folds = self.folds
+        self.bracket_index.folds = self.folds
+        self.whitespace_renderer.folds = self.folds
+        
+        # Окна буфера: основное и окно разделённого вида (двойник виджета с общим текстом и тегами).
+        # Подсветка и разметка выполняются для видимых областей всех окон
+        self.editor_views = [self.code_editor]
+        self.highlighter.views = self.editor_views
+        self.bracket_index.views = self.editor_views
+        self.whitespace_renderer.views = self.editor_views
+        self.paste_guard.views = self.editor_views
+        self.split_editor = None
+        self.split_tracker = None
+        self.split_gutter = None
+        self.split_scrollbar = None
         
         # Настройка табуляции
         self.code_editor.configure(tabs=self.settings.tab_size * 7)  # Примерный размер в пикселях
         
-        # Привязываем события редактора
-        self.code_editor.bind("<KeyRelease>", self.on_text_change)
-        self.code_editor.bind("<Button-1>", self.highlight_current_line)
-        self.code_editor.bind("<ButtonRelease-1>", self.highlight_current_line)
-        self.code_editor.bind("<Tab>", self.handle_tab)
-        self.code_editor.bind("<Shift-Tab>", self.handle_shift_tab)
+        # Конвейер обновлений после изменения текста: повторные запросы сливаются,
+        # курсор и текущая строка обновляются сразу, остальное - с задержкой по приоритету
+        self.change_scheduler = ChangeScheduler(self.code_editor)
+        self.change_scheduler.register("cursor_position", self.update_cursor_position, priority=0, immediate=True)
+        self.change_scheduler.register("current_line", self.highlight_current_line, priority=1, immediate=True)
+        self.change_scheduler.register("syntax", self.highlight_syntax, priority=10)
+        self.change_scheduler.register("brackets", self.update_brackets, priority=20)
+        self.change_scheduler.register("line_numbers", self.update_line_numbers, priority=30)
+        self.change_scheduler.register("whitespace", self.update_whitespace, priority=40)
         
-        # Добавляем обработку нажатия Enter для автоматической табуляции
-        self.code_editor.bind("<Return>", self.handle_return)
+        # Привязываем события редактора
+        self.bind_editor_events(self.code_editor, self.line_numbers)
         
         # Горячие клавиши
         self.bind_hotkeys()
         
         # Полосы прокрутки для редактора
-        y_scrollbar = ctk.CTkScrollbar(editor_frame, command=self.on_scroll_y,
+        y_scrollbar = ctk.CTkScrollbar(editor_frame, command=self.scroll_editor,
                                      button_color=KanagawaTheme.SCROLLBAR,
                                      button_hover_color=KanagawaTheme.FOREGROUND)
         y_scrollbar.grid(row=0, column=2, sticky="ns")
-        self.code_editor.configure(yscrollcommand=y_scrollbar.set)
+        self.y_scrollbar = y_scrollbar
+        self.code_editor.configure(yscrollcommand=self.on_editor_yscroll)
         
         x_scrollbar = ctk.CTkScrollbar(editor_frame, command=self.code_editor.xview, 
                                      orientation="horizontal",
@@ -621,6 +769,11 @@ class CodeEditor(ctk.CTk):
                                             text_color=KanagawaTheme.FOREGROUND)
         self.line_col_indicator.pack(side="right", padx=10)
         
+        # Индикатор защищённого режима длинных строк (показывается только в этом режиме)
+        self.long_line_indicator = ctk.CTkLabel(status_bar, text="", text_color=KanagawaTheme.DECORATOR,
+                                                cursor="hand2")
+        self.long_line_indicator.bind("<Button-1>", lambda e: self.reveal_long_line())
+        
         # Подсвечиваем текущую строку при запуске
         self.highlight_current_line()
         
@@ -1429,32 +1582,36 @@ class CodeEditor(ctk.CTk):
             self._do_insert_code(code, insert_type, line_num, start_line, end_line)
             return
             
-        # Получаем текущее содержимое файла
-        current_content = self.code_editor.get("1.0", tk.END)
+        # Получаем текущее содержимое файла (снимок документа, без копирования буфера виджета)
+        snapshot = self.document.snapshot()
+        current_content = snapshot.text()
         
         # Формируем новое содержимое с учетом вставки кода
         if insert_type == "line" and line_num is not None:
             # Предварительный просмотр замены указанной строки
-            new_content = self._simulate_line_replacement(current_content, line_num, code)
+            new_content = self._simulate_line_replacement(snapshot.lines(), line_num, code)
             review_line = line_num
         elif insert_type == "range" and start_line is not None and end_line is not None:
             # Предварительный просмотр замены диапазона строк
-            new_content = self._simulate_range_replacement(current_content, start_line, end_line, code)
+            new_content = self._simulate_range_replacement(snapshot.lines(), start_line, end_line, code)
             review_line = start_line
         else:
             # Вставка в текущую позицию (для предпросмотра используем позицию курсора)
             cursor_pos = self.code_editor.index(tk.INSERT)
             cursor_line = int(cursor_pos.split('.')[0])
-            new_content = self._simulate_insertion_at_cursor(current_content, cursor_pos, code)
+            new_content = self._simulate_insertion_at_cursor(snapshot.lines(), cursor_pos, code)
             review_line = cursor_line
         
         # Показываем диалог предварительного просмотра изменений
         def accept_changes(content):
-            # При принятии изменений применяем их к редактору
-            with open(self.current_file, "w", encoding="utf-8") as f:
-                f.write(content)
-            self.load_file(self.current_file, goto_line=review_line)
-            self.status_text.configure(text="Изменения применены")
+            # При принятии изменений применяем их к редактору, когда файл записан
+            path = self.current_file
+            
+            def on_written():
+                self.load_file(path, goto_line=review_line)
+                self.status_text.configure(text="Изменения применены")
+            
+            self.write_file(path, content, on_written=on_written)
         
         def reject_changes():
             # При отказе просто закрываем диалог
@@ -1473,64 +1630,48 @@ class CodeEditor(ctk.CTk):
     
     def _do_insert_code(self, code, insert_type="standard", line_num=None, start_line=None, end_line=None):
         """Непосредственно вставляет код в редактор без предварительного просмотра"""
+        # Удаление, дополнение пустыми строками и вставка применяются одним пакетом правок
+        transaction = self.edit_tracker.transaction()
+        total_lines = int(self.code_editor.index('end-1c').split('.')[0])
+        text_end = self.edit_tracker.position('end-1c')
+        
         if insert_type == "line" and line_num is not None:
             # Вставка на указанную строку (заменяя существующую строку)
-            insert_position = f"{line_num}.0"
-            
-            # Проверяем, существует ли такая строка в файле
-            total_lines = int(self.code_editor.index('end-1c').split('.')[0])
-            
-            # Если указанная строка больше, чем общее количество строк,
-            # добавляем пустые строки
             if line_num > total_lines:
-                missing_lines = line_num - total_lines
-                self.code_editor.insert('end', '\n' * missing_lines)
-                # Заменяем последнюю строку (которая пустая)
-                self.code_editor.insert(f"{line_num}.0", code)
+                # Если указанная строка больше, чем общее количество строк,
+                # добавляем пустые строки
+                transaction.insert(text_end, '\n' * (line_num - total_lines) + code)
                 self.status_text.configure(text=f"Код вставлен в строку {line_num}")
             else:
-                # Удаляем существующую строку и вставляем новый код
-                self.code_editor.delete(f"{line_num}.0", f"{line_num}.end+1c")  # +1c для включения символа новой строки
-                self.code_editor.insert(f"{line_num}.0", code)
+                # Заменяем существующую строку вместе с символом новой строки
+                transaction.replace((line_num - 1, 0), (line_num, 0), code)
                 self.status_text.configure(text=f"Заменена строка {line_num}")
         
         elif insert_type == "range" and start_line is not None and end_line is not None:
             # Замена указанного диапазона строк
-            total_lines = int(self.code_editor.index('end-1c').split('.')[0])
-            
-            # Если начальная строка за пределами файла, добавляем строки
             if start_line > total_lines:
-                missing_lines = start_line - total_lines
-                self.code_editor.insert('end', '\n' * missing_lines)
-            
-            # Устанавливаем точку начала замены
-            start_position = f"{start_line}.0"
-            
-            # Устанавливаем точку конца замены
-            if end_line > int(self.code_editor.index('end-1c').split('.')[0]):
-                end_position = 'end-1c'
+                # Если начальная строка за пределами файла, добавляем строки
+                transaction.insert(text_end, '\n' * (start_line - total_lines) + code)
             else:
-                end_position = f"{end_line}.end+1c"  # +1c для включения символа новой строки
-            
-            # Удаляем старый текст и вставляем новый
-            self.code_editor.delete(start_position, end_position)
-            self.code_editor.insert(start_position, code)
+                # Строки диапазона заменяются вместе с последним символом новой строки
+                transaction.replace((start_line - 1, 0), (end_line, 0), code)
             self.status_text.configure(text=f"Заменены строки {start_line}-{end_line}")
             
         else:
             # Стандартная вставка в текущую позицию курсора
-            self.code_editor.insert(tk.INSERT, code)
+            transaction.insert(self.edit_tracker.position(tk.INSERT), code)
             self.status_text.configure(text="Код вставлен в редактор")
         
-        # Обновляем подсветку синтаксиса
-        self.highlight_syntax()
+        transaction.commit()
+        
+        # Одно событие изменения для конвейера обновлений
+        self.change_scheduler.mark()
         
         # Фокусируемся на редакторе
         self.code_editor.focus_set()
     
-    def _simulate_line_replacement(self, content, line_num, new_code):
-        """Симулирует замену строки для предварительного просмотра"""
-        lines = content.splitlines()
+    def _simulate_line_replacement(self, lines, line_num, new_code):
+        """Симулирует замену строки для предварительного просмотра (список lines изменяется)"""
         total_lines = len(lines)
         
         # Если нужная строка за пределами файла, добавляем пустые строки
@@ -1547,9 +1688,8 @@ class CodeEditor(ctk.CTk):
         # Формируем новое содержимое
         return "\n".join(lines)
     
-    def _simulate_range_replacement(self, content, start_line, end_line, new_code):
-        """Симулирует замену диапазона строк для предварительного просмотра"""
-        lines = content.splitlines()
+    def _simulate_range_replacement(self, lines, start_line, end_line, new_code):
+        """Симулирует замену диапазона строк для предварительного просмотра (список lines изменяется)"""
         total_lines = len(lines)
         
         # Если начальная строка за пределами файла, добавляем пустые строки
@@ -1576,15 +1716,13 @@ class CodeEditor(ctk.CTk):
         # Формируем новое содержимое
         return "\n".join(lines)
     
-    def _simulate_insertion_at_cursor(self, content, cursor_pos, new_code):
-        """Симулирует вставку кода в позицию курсора для предварительного просмотра"""
+    def _simulate_insertion_at_cursor(self, lines, cursor_pos, new_code):
+        """Симулирует вставку кода в позицию курсора для предварительного просмотра (список lines изменяется)"""
         # Разбиваем позицию курсора на строку и колонку
         line, col = cursor_pos.split('.')
         line_num = int(line)
         col_num = int(col)
         
-        lines = content.splitlines()
-        
         # Если строка существует, вставляем код
         if line_num <= len(lines):
             current_line = lines[line_num - 1]
@@ -1690,6 +1828,7 @@ class CodeEditor(ctk.CTk):
         menu.add_separator()
         menu.add_command(label="Сохранить", command=self.save_file)
         menu.add_command(label="Сохранить как...", command=self.save_file_as)
+        menu.add_command(label="Закрыть файл", command=self.close_buffer)
         menu.add_separator()
         menu.add_command(label="Выход", command=self.quit)
         
@@ -1720,6 +1859,21 @@ class CodeEditor(ctk.CTk):
                     activebackground=KanagawaTheme.SELECTION, activeforeground=KanagawaTheme.FOREGROUND)
         menu.add_command(label="Проводник", command=self.toggle_explorer)
         menu.add_command(label="Терминал", command=self.toggle_console)
+        menu.add_command(label="Перейти к строке...", command=self.goto_line)
+        menu.add_command(label="Объединить редактор" if self.split_editor else "Разделить редактор",
+                         command=self.toggle_split_view)
+        menu.add_separator()
+        menu.add_command(label="Свернуть/развернуть блок", command=self.toggle_fold)
+        menu.add_command(label="Свернуть до определений", command=self.fold_definitions)
+        menu.add_command(label="Развернуть всё", command=self.unfold_all)
+        if self.plain_text:
+            menu.add_command(label="Включить подсветку синтаксиса",
+                             command=lambda: self.set_plain_text_mode(False))
+        if self.long_line_guard.active:
+            menu.add_separator()
+            menu.add_command(label="Показать скрытый текст строки", command=self.reveal_long_line)
+            menu.add_command(label="Выключить защиту длинных строк",
+                             command=lambda: self.set_long_line_mode(False))
         
         # Отображаем меню в позиции кнопки
         x = self.winfo_rootx() + 125
@@ -1741,14 +1895,33 @@ class CodeEditor(ctk.CTk):
     
     def new_file(self):
         """Создать новый файл"""
+        self.stash_active_buffer()
+        self.close_large_file()
+        self.file_loader.cancel()
+        self.paste_guard.cancel()
         self.current_file = None
-        self.code_editor.delete("1.0", tk.END)
+        self.undo_history = None
+        if self.recovery is not None:
+            # Содержимое прежнего буфера без файла отбрасывается вместе с его журналом
+            self.recovery.discard()
+            self.recovery = None
+        self.replace_buffer_text("")
+        self.undo_history = UndoHistory()
+        self.recovery = RecoveryJournal(self.recovery_writer)
+        self.buffer_modified = False
+        self.set_plain_text_mode(False)
         self.title("VSKode Editor - Новый файл - Kanagawa")
+        self.set_long_line_mode(False)
         self.update_line_numbers()
+        self.update_brackets()
+        self.update_open_editors()
         self.status_text.configure(text="Новый файл")
     
     def save_file_as(self):
         """Сохранить файл как..."""
+        if self.large_file.active:
+            self.status_text.configure(text="Большой файл открыт только для чтения")
+            return
         file_path = filedialog.asksaveasfilename(
             defaultextension=".py",
             filetypes=[
@@ -1762,15 +1935,28 @@ class CodeEditor(ctk.CTk):
             self.save_file()
     
     def on_text_change(self, event=None):
-        """Обработчик изменения текста в редакторе"""
-        self.update_line_numbers()
-        self.highlight_syntax()
-        self.highlight_current_line()
-        self.update_cursor_position()
-        
-        # Показываем пробелы в текущей строке, если включено
-        if self.settings.show_whitespace:
-            self.show_whitespace(True)
+        """Обработчик изменения текста в редакторе: помечает задачи конвейера обновлений"""
+        self.change_scheduler.mark()
+    
+    def bind_editor_events(self, editor, gutter):
+        """Привязывает обработчики событий к окну редактора"""
+        editor.bind("<KeyRelease>", self.on_text_change)
+        editor.bind("<Button-1>", self.highlight_current_line)
+        editor.bind("<ButtonRelease-1>", self.highlight_current_line)
+        editor.bind("<Tab>", self.handle_tab)
+        editor.bind("<Shift-Tab>", self.handle_shift_tab)
+        editor.bind("<<Paste>>", self.handle_paste)
+        editor.bind("<<Undo>>", self.undo_edit)
+        editor.bind("<<Redo>>", self.redo_edit)
+        # Обработка нажатия Enter для автоматической табуляции
+        editor.bind("<Return>", self.handle_return)
+        # Команды редактора выполняются в окне, получившем фокус
+        editor.bind("<FocusIn>", lambda e: self.focus_editor_view(editor), add="+")
+        # При изменении размеров окна подсвечиваем новую видимую область
+        editor.bind("<Configure>", lambda e: self.highlighter.schedule_viewport(), add="+")
+        editor.bind("<Configure>", lambda e: self.semantic_highlighter.schedule_viewport(), add="+")
+        editor.bind("<Configure>", lambda e: self.bracket_index.schedule_render(), add="+")
+        editor.bind("<Configure>", lambda e: gutter.schedule_redraw(), add="+")
     
     def highlight_current_line(self, event=None):
         """Подсвечивает текущую строку курсора"""
@@ -1787,42 +1973,305 @@ class CodeEditor(ctk.CTk):
         self.code_editor.tag_add("current_line", f"{line}.0", f"{line}.end+1c")
         self.code_editor.tag_config("current_line", background=KanagawaTheme.LINE_HIGHLIGHT)
         
+        # Парная скобка у курсора
+        self.bracket_index.highlight_match(self.code_editor.index(tk.INSERT))
+        
         # Обновляем активную строку в номерах строк
         if self.active_line != line:
             self.active_line = line
             self.update_line_numbers()
     
+    def on_editor_edit(self, start, end, text):
+        """Переносит правку виджета в модель документа и публикует её подписчикам"""
+        if self.large_file.swapping:
+            # Смена окна большого файла - не правка буфера: модель документа лишь следует за
+            # виджетом, а подписчики узнают о новом тексте из on_large_file_page
+            if start is None:
+                self.document.reset(self.edit_tracker.contents())
+            else:
+                self.document.replace(start, end, text)
+            return
+        history = self.undo_history
+        self.folds.invalidate()
+        if start is None:
+            self.document.reset(self.edit_tracker.contents())
+            if history is not None:
+                # Правку нельзя выразить дельтой: прежняя история к тексту не подходит
+                self.undo_history = UndoHistory()
+            if self.recovery is not None:
+                self.recovery.checkpoint(self.document.text())
+        else:
+            if history is not None and not history.applying:
+                offset = self.document.offset(*start)
+                end_offset = self.document.offset(*end)
+                history.record(offset, self.document.get(offset, end_offset), text)
+            if self.recovery is not None:
+                self.recovery.record(start, end, text, self.document)
+            self.document.replace(start, end, text)
+        # Подсветка и индекс скобок обновляют кэши строк по дельте правки
+        self.highlighter.apply_edit(start, end, text)
+        self.bracket_index.apply_edit(start, end, text)
+        if self.recovery is not None and self._recovery_job is None:
+            self._recovery_job = self.after(RecoveryJournal.FLUSH_INTERVAL, self.flush_recovery)
+        if not self._replacing_buffer and not self.file_loader.active:
+            # Открытие файла и смена буфера публикуются одним событием сброса (replace_buffer_text)
+            self.edit_events.publish(start, end, text, self.document.version, self.current_file)
+        if not self.buffer_modified:
+            self.buffer_modified = True
+            self.update_open_editors()
+    
+    def flush_recovery(self):
+        """Сбрасывает журнал восстановления на диск; накопившиеся правки заменяет контрольной точкой"""
+        self._recovery_job = None
+        if self.recovery is None:
+            return
+        if self.recovery.needs_checkpoint(len(self.document)):
+            self.recovery.checkpoint(self.document.text())
+        else:
+            self.recovery.flush()
+    
+    def offer_recovery(self):
+        """Предлагает восстановить буферы, не сохранённые до аварийного завершения"""
+        recovered, self.recovered_buffers = self.recovered_buffers, []
+        if not recovered:
+            return
+        names = "\n".join(os.path.basename(item.path) if item.path else "Новый файл" for item in recovered)
+        if not messagebox.askyesno("Восстановление",
+                                   f"Найдены несохранённые изменения:\n{names}\n\nВосстановить их?"):
+            for item in recovered:
+                # Журнал, в который уже пишутся новые правки, не трогаем
+                if self.recovery is None or not self.recovery.started or item.journal != self.recovery.file:
+                    self.recovery_writer.remove(item.journal)
+            return
+        # Буфер без файла восстанавливается последним: открытие файла его заменяет
+        untitled = [item for item in recovered if item.path is None]
+        for item in sorted(recovered, key=lambda item: item.path is None):
+            if item.path is None:
+                if item is not untitled[0]:
+                    continue  # Буфер без файла один: остальные предлагаются при следующем запуске
+                self.new_file()
+                self.code_editor.insert("1.0", item.text)
+                # Текст уже записан в журнал нового буфера
+                self.recovery_writer.remove(item.journal)
+                continue
+            path = os.path.abspath(item.path)
+            if path != self.buffers.active:
+                self.stash_active_buffer()
+            self.buffers.activate(path)
+            self._restore_buffer(Buffer(path, item.text, modified=True,
+                                        recovery=RecoveryJournal(self.recovery_writer, path)))
+            # Восстановленный текст сразу попадает в новый журнал
+            self.recovery.checkpoint(item.text)
+        self.status_text.configure(text=f"Восстановлено буферов: {len(recovered) - len(untitled[1:])}")
+    
+    def update_brackets(self):
+        """Обновляет индекс скобок по изменённым строкам и размечает видимую область"""
+        if self.large_file.active:
+            return
+        self.bracket_index.set_filetype(os.path.splitext(self.current_file)[1] if self.current_file else ".py")
+        self.bracket_index.update()
+        self.bracket_index.highlight_match(self.code_editor.index(tk.INSERT))
+        self.bracket_index.schedule_render()
+    
+    def update_whitespace(self):
+        """Показывает пробелы, если это включено в настройках"""
+        if self.settings.show_whitespace:
+            self.show_whitespace(True)
+    
+    def toggle_fold(self):
+        """Сворачивает или разворачивает блок у курсора"""
+        if self.large_file.active:
+            return
+        row = int(self.code_editor.index(tk.INSERT).split(".")[0]) - 1
+        head = self.folds.toggle(row)
+        if head is None:
+            self.status_text.configure(text="Нет блока для сворачивания")
+            return
+        if self.folds.is_folded(head):
+            # Курсор не должен оставаться в скрытом тексте
+            self.code_editor.mark_set(tk.INSERT, f"{head + 1}.end")
+        self._refresh_folded_view()
+    
+    def fold_definitions(self):
+        """Сворачивает тела всех определений файла"""
+        if self.large_file.active:
+            return
+        extension = os.path.splitext(self.current_file)[1] if self.current_file else ".py"
+        count = self.folds.fold_definitions(self.document.lines(), extension)
+        self.code_editor.see(tk.INSERT)
+        self.status_text.configure(text=f"Свёрнуто блоков: {count}")
+        self._refresh_folded_view()
+    
+    def unfold_all(self):
+        """Разворачивает все свёрнутые блоки"""
+        self.folds.unfold_all()
+        self._refresh_folded_view()
+    
+    def _refresh_folded_view(self):
+        """Обновляет видимую область после сворачивания или разворачивания"""
+        self.change_scheduler.mark("current_line", "syntax", "brackets", "line_numbers", "whitespace")
+    
+    def jump_to_matching_bracket(self):
+        """Переносит курсор к скобке, парной скобке у курсора"""
+        if self.bracket_index.jump_to_match(self.code_editor):
+            self.highlight_current_line()
+    
+    def set_long_line_mode(self, enabled):
+        """Включает или выключает защищённый режим для длинных строк"""
+        guard = self.long_line_guard
+        if enabled == guard.active:
+            return
+        if enabled:
+            guard.enable()
+            self.highlighter.set_column_limit(guard.COLUMN_LIMIT)
+            self.bracket_index.column_limit = guard.COLUMN_LIMIT
+            self.whitespace_renderer.column_limit = guard.COLUMN_LIMIT
+            self.long_line_indicator.pack(side="right", padx=10)
+            print(f"[DEBUG] Защищённый режим длинных строк: скрыт текст в {guard.hidden_count()} строках")
+        else:
+            guard.disable()
+            self.highlighter.set_column_limit(None)
+            self.bracket_index.column_limit = None
+            self.whitespace_renderer.column_limit = None
+            self.long_line_indicator.pack_forget()
+        self.update_long_line_indicator()
+        self.highlight_syntax()
+    
+    def update_long_line_indicator(self):
+        """Обновляет индикатор защищённого режима в строке состояния"""
+        if self.long_line_guard.active:
+            hidden = self.long_line_guard.hidden_count()
+            self.long_line_indicator.configure(
+                text=f"Длинные строки: скрыто {hidden} (показать)" if hidden else "Длинные строки: защита")
+    
+    def reveal_long_line(self):
+        """Показывает скрытый хвост строки под курсором"""
+        self.long_line_guard.reveal(tk.INSERT)
+        self.update_long_line_indicator()
+    
     def update_cursor_position(self):
         """Обновляет индикатор позиции курсора в строке состояния"""
         current_position = self.code_editor.index(tk.INSERT)
         line, col = current_position.split('.')
-        self.line_col_indicator.configure(text=f"Строка: {line}, Символ: {int(col)+1}")
+        if self.large_file.active:
+            line = int(line) + self.large_file.first
+        position_text = f"Строка: {line}, Символ: {int(col)+1}"
+        
+        # Текущее определение (класс, функция) по синтаксическому дереву
+        definitions = self.highlighter.enclosing_definitions(int(line) - 1)
+        if definitions:
+            position_text += " | " + ".".join(name for _, name, _, _ in definitions)
+        self.line_col_indicator.configure(text=position_text)
     
     def update_line_numbers(self):
-        """Обновляет номера строк"""
-        # Получаем текущий текст и считаем строки
-        text_content = self.code_editor.get("1.0", tk.END)
-        lines = text_content.count('\n') + 1
-        
-        # Подготавливаем текст для номеров строк
-        line_numbers_text = ''
-        for i in range(1, lines + 1):
-            # Выделяем активную строку жирным
-            if str(i) == self.active_line:
-                line_numbers_text += f"{i}\n"
-            else:
-                line_numbers_text += f"{i}\n"
+        """Обновляет номера строк (перерисовываются только видимые строки)"""
+        self.line_numbers.schedule_redraw()
+        if self.split_gutter is not None:
+            self.split_gutter.schedule_redraw()
+    
+    def scroll_editor(self, *args):
+        """Команда полосы прокрутки редактора"""
+        if self.large_file.active:
+            self.large_file.yview(*args)
+        else:
+            self.code_editor.yview(*args)
+    
+    def on_editor_yscroll(self, first, last):
+        """Вызывается при любом изменении видимой области редактора"""
+        if self.large_file.active:
+            # В виджете только окно большого файла: окно сдвигается у края, полоса показывает весь файл
+            first, last = self.large_file.on_scroll(first, last)
+            self.line_numbers.line_offset = self.large_file.first
+        self.y_scrollbar.set(first, last)
+        # Номера строк следуют за прокруткой редактора сразу, без отдельного yview
+        self.line_numbers.redraw()
+        # Подсвечиваем строки, открывшиеся при прокрутке (колесо мыши, полоса прокрутки, переход к строке)
+        self.highlighter.schedule_viewport()
+        self.semantic_highlighter.schedule_viewport()
+        self.bracket_index.schedule_render()
+        self.whitespace_renderer.schedule_render()
+    
+    def on_split_yscroll(self, first, last):
+        """Вызывается при изменении видимой области второго окна редактора"""
+        self.split_scrollbar.set(first, last)
+        self.split_gutter.redraw()
+        self.highlighter.schedule_viewport()
+        self.semantic_highlighter.schedule_viewport()
+        self.bracket_index.schedule_render()
+        self.whitespace_renderer.schedule_render()
+    
+    def toggle_split_view(self):
+        """Разделяет редактор на два окна одного буфера или объединяет их"""
+        if self.split_editor is not None:
+            self.close_split_view()
+        elif self.large_file.active:
+            self.status_text.configure(text="Большой файл нельзя показать в двух окнах")
+        else:
+            self.open_split_view()
+    
+    def open_split_view(self):
+        """
+        Открывает второе окно текущего буфера под основным.
+
+        Окно - двойник виджета Tk (peer): текст, теги подсветки и свёрнутые
+        блоки общие, курсор, выделение и прокрутка у каждого окна свои.
+        """
+        main = self.main_editor
+        options = {name: main.cget(name) for name in
+                   ("wrap", "bd", "padx", "pady", "bg", "fg", "insertbackground",
+                    "selectbackground", "font", "tabs")}
+        self.split_editor = PeerText(self.editor_frame, main, **options)
+        self.split_editor.grid(row=2, column=1, sticky="nsew", padx=0, pady=(2, 0))
+        self.editor_frame.grid_rowconfigure(2, weight=1)
+        
+        # Правки из второго окна попадают к тем же подписчикам, что и правки основного
+        self.split_tracker = EditTracker(self.split_editor)
+        self.split_tracker.listeners = self.main_tracker.listeners
+        
+        self.split_gutter = LineNumberGutter(self.editor_frame, self.split_editor, self.settings.get_font(),
+                                             fg=self.theme.COMMENT, active_fg=self.theme.FOREGROUND,
+                                             bg=self.theme.BACKGROUND)
+        self.split_gutter.grid(row=2, column=0, sticky="ns", pady=(2, 0))
+        self.split_scrollbar = ctk.CTkScrollbar(self.editor_frame, command=self.split_editor.yview,
+                                                button_color=KanagawaTheme.SCROLLBAR,
+                                                button_hover_color=KanagawaTheme.FOREGROUND)
+        self.split_scrollbar.grid(row=2, column=2, sticky="ns", pady=(2, 0))
+        self.split_editor.configure(yscrollcommand=self.on_split_yscroll)
+        self.bind_editor_events(self.split_editor, self.split_gutter)
+        self.bind_hotkeys()
         
-        # Обновляем номера строк
-        self.line_numbers.configure(state="normal")
-        self.line_numbers.delete("1.0", tk.END)
-        self.line_numbers.insert("1.0", line_numbers_text)
-        self.line_numbers.configure(state="disabled")
+        self.editor_views.append(self.split_editor)
+        self.split_editor.mark_set(tk.INSERT, main.index(tk.INSERT))
+        self.split_editor.yview(int(main.index("@0,0").split(".")[0]) - 1)
+        self.split_editor.focus_set()
+    
+    def close_split_view(self):
+        """Закрывает второе окно редактора"""
+        if self.split_editor is None:
+            return
+        if self.code_editor is self.split_editor:
+            self.focus_editor_view(self.main_editor)
+        if self.paste_guard.target is self.split_editor:
+            # Вставка шла во второе окно: уже вставленные порции остаются в тексте
+            self.paste_guard.cancel()
+        self.editor_views.remove(self.split_editor)
+        self.split_tracker.close()
+        for widget in (self.split_editor, self.split_gutter, self.split_scrollbar):
+            widget.destroy()
+        self.editor_frame.grid_rowconfigure(2, weight=0)
+        self.split_editor = None
+        self.split_tracker = None
+        self.split_gutter = None
+        self.split_scrollbar = None
+        self.main_editor.focus_set()
     
-    def on_scroll_y(self, *args):
-        """Синхронизирует прокрутку редактора и номеров строк"""
-        self.code_editor.yview(*args)
-        self.line_numbers.yview(*args)
+    def focus_editor_view(self, editor):
+        """Делает окно editor текущим: команды редактора работают с его курсором и выделением"""
+        if editor is self.code_editor:
+            return
+        self.code_editor = editor
+        self.edit_tracker = self.split_tracker if editor is self.split_editor else self.main_tracker
+        self.highlight_current_line()
     
     def open_file(self):
         file_path = filedialog.askopenfilename(
@@ -1833,22 +2282,305 @@ class CodeEditor(ctk.CTk):
         )
         
         if file_path:
-            self.current_file = file_path
+            self.open_buffer(file_path)
+    
+    def open_buffer(self, file_path):
+        """Переключается на открытый буфер файла или открывает файл в новом буфере"""
+        file_path = os.path.abspath(file_path)
+        if file_path == self.buffers.active:
+            return
+        buffer = self.buffers.get(file_path)
+        if buffer is None or buffer.unloaded:
             self.load_file(file_path)
+            return
+        self.stash_active_buffer()
+        self.buffers.activate(file_path)
+        self._restore_buffer(buffer)
+    
+    def stash_active_buffer(self):
+        """Сохраняет снимок буфера, находящегося в виджете, перед его заменой"""
+        path = self.buffers.active
+        if path is None:
+            return
+        if self.large_file.active or self.file_loader.active:
+            # Просмотр большого файла и незавершённая загрузка при возврате открываются заново
+            buffer = Buffer(path, None)
+        else:
+            content = self.document.text()
+            # Разбор, выполненный подсветчиком, пригодится при следующем открытии файла
+            self.store_highlight_cache(content)
+            buffer = Buffer(path, content,
+                            cursor=self.code_editor.index(tk.INSERT),
+                            yview=self.code_editor.yview()[0],
+                            highlight=self.highlighter.snapshot() if self.highlighter.enabled else None,
+                            brackets=self.bracket_index.snapshot(),
+                            modified=self.buffer_modified,
+                            long_lines=self.long_line_guard.active,
+                            plain_text=self.plain_text,
+                            undo=self.undo_history,
+                            recovery=self.recovery)
+            if self.recovery is not None:
+                self.recovery.flush()
+        # Правки при замене содержимого виджета в историю буфера и журнал восстановления не попадают
+        self.undo_history = None
+        self.recovery = None
+        # Снимки ссылаются на кэши разбора, дальше они не должны меняться
+        self.highlighter.invalidate()
+        self.bracket_index.invalidate()
+        self.buffers.store(buffer)
+    
+    def store_highlight_cache(self, content, wait=False):
+        """
+        Записывает в дисковый кэш разбор, уже выполненный подсветчиком.
+
+        Args:
+            content: текст буфера, совпадающий с файлом на диске
+            wait: записать в текущем потоке (при выходе из редактора фоновый поток не успеет)
+        """
+        highlighter = self.highlighter
+        if not self.current_file or self.buffer_modified or not highlighter.enabled or highlighter.column_limit:
+            return
+        if highlighter.tokenizer is not self.lexer_registry.tokenizer_for(self.current_file):
+            return
+        if len(highlighter.lines) != content.count("\n") + 1:
+            return  # Подсветчик ещё не прочитал этот текст
+        states, spans = highlighter.parsed()
+        if wait:
+            if states and self.highlight_cache.supports(content, highlighter.tokenizer):
+                self.highlight_cache.store(content, highlighter.tokenizer, states, spans)
+        else:
+            self.highlight_cache.store_async(content, highlighter.tokenizer, states, spans)
+    
+    def _restore_buffer(self, buffer):
+        """Переносит снимок буфера в виджет без чтения файла и повторного разбора"""
+        file_path = buffer.path
+        name = os.path.basename(file_path)
+        self.close_large_file()
+        self.file_loader.cancel()
+        self.paste_guard.cancel()
+        self.current_file = file_path
+        self.set_long_line_mode(False)
+        self.semantic_highlighter.clear()
+        if self.recovery is not None:
+            # Буфер без файла при переключении не сохраняется: его журнал больше не нужен
+            self.recovery.discard()
+            self.recovery = None
+        self.replace_buffer_text(buffer.text())
+        self.undo_history = buffer.undo or UndoHistory()
+        self.recovery = buffer.recovery or RecoveryJournal(self.recovery_writer, file_path)
+        self.set_long_line_mode(buffer.long_lines)
+        self.set_plain_text_mode(buffer.plain_text)
+        
+        # Разбор из снимка: подсветка и индекс скобок не строятся заново
+        tokenizer = self.lexer_registry.tokenizer_for(file_path)
+        if tokenizer and buffer.highlight:
+            self.highlighter.set_tokenizer(tokenizer)
+            self.highlighter.enabled = True
+            self.highlighter.restore(*buffer.highlight)
+        self.bracket_index.set_filetype(os.path.splitext(file_path)[1])
+        if buffer.brackets:
+            self.bracket_index.restore(buffer.brackets)
+        
+        self.buffer_modified = buffer.modified
+        self.code_editor.mark_set(tk.INSERT, buffer.cursor)
+        self.code_editor.yview_moveto(buffer.yview)
+        self.title(f"VSKode Editor - {name} - Kanagawa")
+        self.status_text.configure(text=f"Открыт буфер: {name}" + (" (сжат в памяти)" if buffer.compressed else ""))
+        self.update_line_numbers()
+        self.highlight_syntax()
+        self.update_brackets()
+        self.highlight_current_line()
+        self.update_open_editors()
+    
+    def close_buffer(self):
+        """Закрывает активный буфер и переключается на последний использованный"""
+        path = self.buffers.active
+        if path is None:
+            self.new_file()
+            return
+        if self.buffer_modified:
+            answer = messagebox.askyesnocancel("Закрыть файл",
+                                               f"Сохранить изменения в {os.path.basename(path)}?")
+            if answer is None:
+                return
+            if answer:
+                # Буфер закрывается, только когда файл записан: при ошибке записи правки остаются
+                self.save_file(on_saved=lambda: self._close_saved(path))
+                return
+        elif not (self.large_file.active or self.file_loader.active):
+            # Разбор закрываемого файла пригодится при следующем открытии
+            self.store_highlight_cache(self.document.text())
+        self._finish_close(path)
+    
+    def _finish_close(self, path):
+        """Удаляет журнал восстановления активного буфера, закрывает его и открывает следующий"""
+        if self.recovery is not None:
+            self.recovery.discard()
+        self.buffers.close(path)
+        following = self.buffers.recent()
+        if following:
+            self.open_buffer(following)
+        else:
+            self.new_file()
+    
+    def _close_saved(self, path):
+        """
+        Закрывает буфер после записи его файла.
+
+        Буфер, изменённый заново, пока шла запись, остаётся открытым.
+
+        Args:
+            path: путь закрываемого буфера
+        """
+        if path == self.buffers.active:
+            if not self.buffer_modified:
+                self._finish_close(path)
+            return
+        # Пока шла запись, пользователь переключился на другой буфер
+        buffer = self.buffers.get(path)
+        if buffer is None or buffer.modified:
+            return
+        if buffer.recovery is not None:
+            buffer.recovery.discard()
+        self.buffers.close(path)
+        self.update_open_editors()
+    
+    def next_buffer(self):
+        """Переключается на буфер, использованный перед текущим"""
+        following = self.buffers.recent()
+        if following:
+            self.open_buffer(following)
+    
+    def update_open_editors(self):
+        """Обновляет список открытых буферов"""
+        self.open_editors_list.delete(0, tk.END)
+        for path in self.buffers.opened:
+            if path == self.buffers.active:
+                modified = self.buffer_modified
+            else:
+                modified = self.buffers.get(path) is not None and self.buffers.get(path).modified
+            self.open_editors_list.insert(tk.END, ("● " if modified else "  ") + os.path.basename(path))
+            if path == self.buffers.active:
+                self.open_editors_list.selection_set(tk.END)
+    
+    def _open_editor_at(self, event):
+        """Путь буфера под указателем в списке открытых редакторов"""
+        index = self.open_editors_list.nearest(event.y)
+        if 0 <= index < len(self.buffers.opened):
+            return self.buffers.opened[index]
+        return None
+    
+    def on_open_editor_click(self, event):
+        """Переключается на выбранный в списке буфер"""
+        path = self._open_editor_at(event)
+        if path:
+            self.open_buffer(path)
+    
+    def on_open_editor_close(self, event):
+        """Закрывает буфер по щелчку средней кнопкой"""
+        path = self._open_editor_at(event)
+        if path:
+            self.open_buffer(path)
+            if self.buffers.active == path:
+                self.close_buffer()
     
     def load_file(self, file_path, goto_line=None):
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
+            file_path = os.path.abspath(file_path)
+            size = os.path.getsize(file_path)
+            content = None
+            if size < ChunkedFileLoader.THRESHOLD:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    content = f.read()
+            
+            # Файл читается с диска заново, прежний снимок его буфера не нужен
+            if file_path != self.buffers.active:
+                self.stash_active_buffer()
+            self.undo_history = None
+            if self.recovery is not None:
+                # Буфер перечитывается с диска (или заменяется буфер без файла): его правки отброшены
+                self.recovery.discard()
+                self.recovery = None
+            self.buffers.activate(file_path)
+            self.current_file = file_path
+            self.update_open_editors()
+            self.close_large_file()
+            self.file_loader.cancel()
+            self.paste_guard.cancel()
+            if size >= LargeFileViewer.THRESHOLD:
+                self.open_large_file(file_path, goto_line)
+                return
+            if content is None:
+                self.load_file_progressive(file_path, goto_line)
+                return
             
-            self.code_editor.delete("1.0", tk.END)
-            self.code_editor.insert("1.0", content)
+            self.replace_buffer_text(content)
             self.title(f"VSKode Editor - {os.path.basename(file_path)} - Kanagawa")
             self.status_text.configure(text=f"Файл загружен: {os.path.basename(file_path)}")
+            self._finish_load(file_path, content, goto_line)
+            
+        except Exception as e:
+            # Файл не открылся: в редакторе остаётся прежний буфер
+            self.current_file = self.buffers.active
+            messagebox.showerror("Ошибка", f"Не удалось открыть файл: {e}")
+    
+    def load_file_progressive(self, file_path, goto_line=None):
+        """Загружает файл порциями, не блокируя интерфейс"""
+        name = os.path.basename(file_path)
+        self.title(f"VSKode Editor - {name} - Kanagawa")
+        self.set_long_line_mode(False)
+        # Подсветка и индексы строятся после загрузки, а не на каждую порцию
+        self.highlighter.clear()
+        self.semantic_highlighter.clear()
+        self.bracket_index.clear()
+        
+        def on_progress(progress):
+            self.status_text.configure(text=f"Загрузка {name}: {int(progress * 100)}%")
+        
+        def on_done():
+            # Порции не публиковались как правки: подписчики перечитывают загруженный текст
+            self.publish_reset()
+            self.status_text.configure(text=f"Файл загружен: {name}")
+            self._finish_load(file_path, self.document.text(), goto_line)
+        
+        def on_error(error):
+            messagebox.showerror("Ошибка", f"Не удалось открыть файл: {error}")
+        
+        def on_first_chunk():
+            # Первый экран уже в виджете: подсвечиваем только его
+            self.update_line_numbers()
+            self.highlight_syntax()
+        
+        self.file_loader.start(file_path, on_first_chunk=on_first_chunk,
+                               on_progress=on_progress, on_done=on_done, on_error=on_error)
+    
+    def _finish_load(self, file_path, content, goto_line=None):
+        """Завершает открытие файла: режимы, кэш подсветки, подсветка и переход к строке"""
+        try:
+            self.buffer_modified = False
+            self.set_plain_text_mode(False)
+            # История отмены файла восстанавливается из журнала, если файл не менялся вне редактора
+            self.undo_history = UndoHistory(file_path, content)
+            # Журнал восстановления отсчитывает правки от файла на диске
+            self.recovery = RecoveryJournal(self.recovery_writer, file_path, content_digest(content))
+            self.update_open_editors()
+            
+            # Файлы с патологически длинными строками открываются в защищённом режиме
+            self.set_long_line_mode(self.long_line_guard.detect(content))
+            
+            # Неизменённый файл подсвечивается из кэша без повторного разбора
+            tokenizer = self.lexer_registry.tokenizer_for(file_path)
+            if tokenizer and not self.long_line_guard.active:
+                cached = self.highlight_cache.load(content, tokenizer)
+                if cached:
+                    self.highlighter.set_tokenizer(tokenizer)
+                    self.highlighter.enabled = True
+                    self.highlighter.restore(*cached)
             
             # Обновляем интерфейс
             self.update_line_numbers()
             self.highlight_syntax()
+            self.update_brackets()
             
             # Если указана строка, переходим к ней
             if goto_line:
@@ -1868,7 +2600,98 @@ class CodeEditor(ctk.CTk):
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось открыть файл: {e}")
     
-    def save_file(self):
+    def open_large_file(self, file_path, goto_line=None):
+        """Открывает очень большой файл в режиме постраничного просмотра"""
+        self.close_split_view()
+        self.set_long_line_mode(False)
+        self.highlighter.enabled = False
+        self.highlighter.clear()
+        self.semantic_highlighter.clear()
+        self.bracket_index.clear()
+        # Окна файла не передаются индексу скобок дельтами: после просмотра он читает текст заново
+        self.bracket_index.invalidate()
+        self.large_file.open(file_path)
+        self.current_file = file_path
+        self.buffer_modified = False
+        self.line_numbers.line_offset = 0
+        self.title(f"VSKode Editor - {os.path.basename(file_path)} - Kanagawa")
+        self.status_text.configure(text=f"Большой файл (только чтение): {os.path.basename(file_path)}")
+        if goto_line:
+            self.large_file.goto(goto_line)
+        self.update_line_numbers()
+        self.highlight_current_line()
+    
+    def close_large_file(self):
+        """Выходит из режима просмотра большого файла"""
+        if self.large_file.active:
+            self.large_file.close()
+            self.line_numbers.line_offset = 0
+    
+    def replace_buffer_text(self, text):
+        """
+        Заменяет текст виджета текстом другого буфера (открытие файла, смена буфера).
+
+        Подписчики событий правки получают одно событие сброса (start = None)
+        вместо дельт удаления прежнего текста и вставки нового.
+        """
+        self._replacing_buffer = True
+        try:
+            self.code_editor.delete("1.0", tk.END)
+            if text:
+                self.code_editor.insert("1.0", text)
+        finally:
+            self._replacing_buffer = False
+        self.publish_reset()
+    
+    def publish_reset(self):
+        """Сообщает подписчикам событий правки, что текст буфера заменён целиком"""
+        self.edit_events.publish(None, None, None, self.document.version, self.current_file)
+    
+    def on_large_file_page(self):
+        """В виджет загружено новое окно большого файла: подписчики перечитывают текст"""
+        self.folds.invalidate()
+        self.publish_reset()
+    
+    def on_large_file_progress(self, lines, done):
+        """Показывает прогресс индексации большого файла"""
+        name = os.path.basename(self.large_file.path)
+        if done:
+            self.status_text.configure(text=f"Большой файл (только чтение): {name}, строк: {lines}")
+        else:
+            self.status_text.configure(text=f"Индексация {name}: {lines} строк...")
+    
+    def goto_line(self):
+        """Переходит к строке по номеру"""
+        line = simpledialog.askinteger("Перейти к строке", "Номер строки:", parent=self, minvalue=1)
+        if not line:
+            return
+        if self.large_file.active:
+            self.large_file.goto(line)
+        else:
+            self.code_editor.mark_set(tk.INSERT, f"{line}.0")
+            self.code_editor.see(tk.INSERT)
+        self.highlight_current_line()
+    
+    def save_file(self, on_saved=None):
+        """
+        Сохраняет активный буфер.
+
+        Снимок текста записывается в фоновом потоке, о завершении записи
+        сообщается в строке состояния.
+
+        Args:
+            on_saved: функция без аргументов, вызываемая в потоке интерфейса после
+                успешной записи файла (например, запуск кода из файла)
+
+        Returns:
+            True, если сохранение начато
+        """
+        if self.large_file.active:
+            self.status_text.configure(text="Большой файл открыт только для чтения")
+            return False
+        if self.file_loader.active:
+            self.status_text.configure(text="Файл ещё загружается")
+            return False
         if not self.current_file:
             self.current_file = filedialog.asksaveasfilename(
                 defaultextension=".py",
@@ -1878,14 +2701,100 @@ class CodeEditor(ctk.CTk):
                 ]
             )
         
-        if self.current_file:
+        if not self.current_file:
+            return False
+        try:
+            self.current_file = os.path.abspath(self.current_file)
+            if self.buffers.active != self.current_file:
+                # Сохранение под новым именем переименовывает буфер
+                self.buffers.rename(self.buffers.active, self.current_file)
+            content = self.document.text()
+            job = self.file_saver.save(self.current_file, content)
+            if self.undo_history is not None:
+                self.undo_history.saved(self.current_file, content)
+            # Журнал восстановления начинается заново, только когда файл записан (см. on_file_saved)
+            self.buffer_modified = False
+            self.update_open_editors()
+            self.status_text.configure(text=f"Сохранение: {os.path.basename(self.current_file)}...")
+            
+            # Готовим кэш подсветки для следующего открытия файла
+            self.store_highlight_cache(content)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить файл: {e}")
+            return False
+        
+        self._after_save(job, on_saved)
+        return True
+    
+    def write_file(self, path, content, on_written=None):
+        """
+        Записывает текст в файл через очередь сохранений, не дожидаясь записи.
+
+        Запись идёт после уже начатых сохранений этого файла, поэтому они не
+        перезапишут новый текст.
+
+        Args:
+            on_written: функция без аргументов, вызываемая в потоке интерфейса после
+                успешной записи файла
+        """
+        job = self.file_saver.save(os.path.abspath(path), content)
+        self._after_save(job, on_written)
+    
+    def _after_save(self, job, callback):
+        """Регистрирует продолжение после записи задания и запускает опрос результатов"""
+        if callback is not None:
+            self._save_callbacks.setdefault(job, []).append(callback)
+        self._poll_saves()
+    
+    def _poll_saves(self):
+        """Забирает результаты фоновых сохранений и сообщает о них"""
+        if self._save_poll_job is not None:
+            self.after_cancel(self._save_poll_job)
+            self._save_poll_job = None
+        while True:
             try:
-                content = self.code_editor.get("1.0", tk.END)
-                with open(self.current_file, "w", encoding="utf-8") as f:
-                    f.write(content)
-                self.status_text.configure(text=f"Файл сохранен: {os.path.basename(self.current_file)}")
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Не удалось сохранить файл: {e}")
+                job = self.file_saver.results.get_nowait()
+            except queue.Empty:
+                break
+            name = os.path.basename(job.path)
+            callbacks = self._save_callbacks.pop(job, ())
+            if job.error is not None:
+                # Файл не записан: буфер снова считается изменённым, а журнал восстановления
+                # получает полный текст - на файл на диске опереться нельзя
+                buffer = self.buffers.get(job.path)
+                if job.path == self.buffers.active:
+                    self.buffer_modified = True
+                    if self.recovery is not None:
+                        self.recovery.checkpoint(self.document.text())
+                elif buffer is not None:
+                    buffer.modified = True
+                    if buffer.recovery is not None and not buffer.unloaded:
+                        buffer.recovery.checkpoint(buffer.text())
+                self.update_open_editors()
+                self.status_text.configure(text=f"Ошибка сохранения: {name}")
+                messagebox.showerror("Ошибка", f"Не удалось сохранить файл {name}: {job.error}")
+            else:
+                if not self.file_saver.busy(job.path):
+                    self.on_file_saved(job)
+                    self.status_text.configure(text=f"Файл сохранен: {name}")
+                for callback in callbacks:
+                    callback()
+        if self.file_saver.busy():
+            self._save_poll_job = self.after(20, self._poll_saves)
+    
+    def on_file_saved(self, job):
+        """Файл записан и новых сохранений нет: журнал восстановления буфера начинается от файла"""
+        if job.path == self.buffers.active:
+            journal = self.recovery
+            text = self.document.text() if self.buffer_modified else None
+        else:
+            buffer = self.buffers.get(job.path)
+            if buffer is None:
+                return
+            journal = buffer.recovery
+            text = buffer.text() if buffer.modified and not buffer.unloaded else None
+        if journal is not None:
+            journal.saved(job.path, job.content, text)
     
     def open_project(self):
         project_path = filedialog.askdirectory()
@@ -1936,133 +2845,35 @@ class CodeEditor(ctk.CTk):
             elif item.startswith("📄 "):
                 item = item[2:].strip()
                 file_path = os.path.join(self.current_project, item)
-                self.current_file = file_path
-                self.load_file(file_path)
+                self.open_buffer(file_path)
     
     def highlight_syntax(self, event=None):
         """Подсветка синтаксиса, работает даже для несохраненных файлов"""
-        # Форматируем код для отображения в редакторе
-        self.code_editor.tag_remove("keyword", "1.0", tk.END)
-        self.code_editor.tag_remove("string", "1.0", tk.END)
-        self.code_editor.tag_remove("comment", "1.0", tk.END)
-        self.code_editor.tag_remove("function", "1.0", tk.END)
-        self.code_editor.tag_remove("class", "1.0", tk.END)
-        self.code_editor.tag_remove("number", "1.0", tk.END)
-        self.code_editor.tag_remove("operator", "1.0", tk.END)
-        
-        # Настройка тегов для подсветки в цветах Kanagawa
-        self.code_editor.tag_configure("keyword", foreground=KanagawaTheme.KEYWORD)
-        self.code_editor.tag_configure("string", foreground=KanagawaTheme.STRING)
-        self.code_editor.tag_configure("comment", foreground=KanagawaTheme.COMMENT)
-        self.code_editor.tag_configure("function", foreground=KanagawaTheme.FUNCTION)
-        self.code_editor.tag_configure("class", foreground=KanagawaTheme.CLASS)
-        self.code_editor.tag_configure("number", foreground=KanagawaTheme.NUMBER)
-        self.code_editor.tag_configure("operator", foreground=KanagawaTheme.OPERATOR)
-        
+        # Большие файлы в режиме просмотра и буферы в режиме простого текста не подсвечиваются
+        if self.large_file.active or self.plain_text:
+            return
         # Определяем тип файла для подсветки
-        use_python_lexer = True
         if self.current_file:
-            if not self.current_file.endswith('.py'):
-                try:
-                    extension = os.path.splitext(self.current_file)[1]
-                    self.current_filetype = extension
-                    use_python_lexer = False
-                except:
-                    use_python_lexer = True
-        
-        # Подсветка для Python (работает даже для несохраненных файлов)
-        if use_python_lexer or self.current_filetype == '.py':
-            # Ключевые слова
-            keywords = ["def", "class", "if", "else", "elif", "while", "for", "in", "try", 
-                       "except", "finally", "import", "from", "as", "return", "break", 
-                       "continue", "pass", "True", "False", "None", "and", "or", "not",
-                       "with", "async", "await", "yield", "lambda", "assert", "del", "global",
-                       "nonlocal", "raise", "is"]
-            
-            for keyword in keywords:
-                start_pos = "1.0"
-                while True:
-                    start_pos = self.code_editor.search(f"\\y{keyword}\\y", start_pos, tk.END, regexp=True)
-                    if not start_pos:
-                        break
-                    end_pos = f"{start_pos}+{len(keyword)}c"
-                    self.code_editor.tag_add("keyword", start_pos, end_pos)
-                    start_pos = end_pos
-            
-            # Операторы
-            operators = ["+", "-", "*", "/", "==", "!=", "<", ">", "<=", ">=", "=", "+=", "-=", "*=", "/="]
-            for op in operators:
-                start_pos = "1.0"
-                while True:
-                    start_pos = self.code_editor.search(f"{op}", start_pos, tk.END)
-                    if not start_pos:
-                        break
-                    end_pos = f"{start_pos}+{len(op)}c"
-                    self.code_editor.tag_add("operator", start_pos, end_pos)
-                    start_pos = end_pos
-            
-            # Числа
-            start_pos = "1.0"
-            while True:
-                start_pos = self.code_editor.search(r'\y\d+\y', start_pos, tk.END, regexp=True)
-                if not start_pos:
-                    break
-                end_pos = self.code_editor.search(r'\W', start_pos, tk.END, regexp=True)
-                if not end_pos:
-                    end_pos = tk.END
-                self.code_editor.tag_add("number", start_pos, end_pos)
-                start_pos = end_pos
-            
-            # Строки
-            for quote in ['"', "'"]:
-                start_pos = "1.0"
-                while True:
-                    start_pos = self.code_editor.search(f'{quote}', start_pos, tk.END)
-                    if not start_pos:
-                        break
-                    end_pos = self.code_editor.search(f'{quote}', f"{start_pos}+1c", tk.END)
-                    if not end_pos:
-                        break
-                    end_pos = f"{end_pos}+1c"
-                    self.code_editor.tag_add("string", start_pos, end_pos)
-                    start_pos = end_pos
-            
-            # Комментарии
-            start_pos = "1.0"
-            while True:
-                start_pos = self.code_editor.search('#', start_pos, tk.END)
-                if not start_pos:
-                    break
-                line = int(float(start_pos))
-                end_pos = f"{line}.end"
-                self.code_editor.tag_add("comment", start_pos, end_pos)
-                start_pos = f"{line+1}.0"
-            
-            # Функции
-            start_pos = "1.0"
-            while True:
-                start_pos = self.code_editor.search('def ', start_pos, tk.END)
-                if not start_pos:
-                    break
-                name_start = f"{start_pos}+4c"
-                name_end = self.code_editor.search('\\(', name_start, tk.END)
-                if not name_end:
-                    break
-                self.code_editor.tag_add("function", name_start, name_end)
-                start_pos = name_end
-            
-            # Классы
-            start_pos = "1.0"
-            while True:
-                start_pos = self.code_editor.search('class ', start_pos, tk.END)
-                if not start_pos:
-                    break
-                name_start = f"{start_pos}+6c"
-                name_end = self.code_editor.search('\\(|:', name_start, tk.END, regexp=True)
-                if not name_end:
-                    break
-                self.code_editor.tag_add("class", name_start, name_end)
-                start_pos = name_end
+            self.current_filetype = os.path.splitext(self.current_file)[1]
+        
+        # Python подсвечивается собственным токенизатором (в том числе для несохраненных
+        # файлов), остальные языки - лексерами pygments. Перекрашиваются только
+        # изменившиеся строки в видимой области
+        tokenizer = self.lexer_registry.tokenizer_for(self.current_file)
+        if tokenizer:
+            self.highlighter.set_tokenizer(tokenizer)
+            self.highlighter.enabled = True
+            self.highlighter.highlight()
+        elif self.highlighter.enabled:
+            self.highlighter.enabled = False
+            self.highlighter.clear()
+        
+        # Семантическая подсветка определений, параметров и встроенных имен только для Python
+        if (self.highlighter.enabled and not self.long_line_guard.active
+                and (not self.current_file or self.current_file.endswith('.py'))):
+            self.semantic_highlighter.request()
+        else:
+            self.semantic_highlighter.clear()
     
     def run_current_code(self):
         """Запускает текущий код и выводит результат в консоль"""
@@ -2074,7 +2885,7 @@ class CodeEditor(ctk.CTk):
         self.clear_console()
         
         # Получаем текущий код из редактора
-        code = self.code_editor.get("1.0", tk.END)
+        code = self.document.text()
         
         # Если нет кода, ничего не делаем
         if not code.strip():
@@ -2083,10 +2894,9 @@ class CodeEditor(ctk.CTk):
         
         # Если файл не сохранен, создаем временный файл
         if self.current_file:
-            # Сохраняем текущий файл перед запуском
-            self.save_file()
+            # Файл запускается, когда сохранение записано: интерфейс не ждёт диска
             file_to_run = self.current_file
-            file_extension = os.path.splitext(file_to_run)[1]
+            self.save_file(on_saved=lambda: self._run_file(file_to_run, os.path.splitext(file_to_run)[1]))
         else:
             # Создаем временный файл
             try:
@@ -2108,7 +2918,10 @@ class CodeEditor(ctk.CTk):
             except Exception as e:
                 self.write_to_console(f"Ошибка создания временного файла: {str(e)}\n", "error")
                 return
-        
+            self._run_file(file_to_run, file_extension)
+    
+    def _run_file(self, file_to_run, file_extension):
+        """Запускает записанный на диск файл обработчиком его языка или выбранным дебаггером"""
         # Проверяем, есть ли обработчик для данного расширения файла
         handler_found = False
         language_name = None
@@ -2400,7 +3213,7 @@ class CodeEditor(ctk.CTk):
     def run_code_in_external_console(self):
         """Запускает код в отдельном окне консоли"""
         # Получаем текущий код из редактора
-        code = self.code_editor.get("1.0", tk.END)
+        code = self.document.text()
         
         # Если нет кода, ничего не делаем
         if not code.strip():
@@ -2409,9 +3222,9 @@ class CodeEditor(ctk.CTk):
         
         # Если файл не сохранен, создаем временный файл
         if self.current_file:
-            # Сохраняем текущий файл перед запуском
-            self.save_file()
+            # Файл запускается, когда сохранение записано: интерфейс не ждёт диска
             file_to_run = self.current_file
+            self.save_file(on_saved=lambda: self._run_in_external_console(file_to_run))
         else:
             # Создаем временный файл
             try:
@@ -2432,7 +3245,10 @@ class CodeEditor(ctk.CTk):
             except Exception as e:
                 messagebox.showerror("Ошибка", f"Не удалось создать временный файл: {e}")
                 return
-        
+            self._run_in_external_console(file_to_run)
+    
+    def _run_in_external_console(self, file_to_run):
+        """Запускает записанный на диск файл в отдельном окне консоли"""
         # Запускаем код в отдельном окне консоли
         try:
             subprocess.Popen(
@@ -2492,21 +3308,20 @@ class CodeEditor(ctk.CTk):
         # Обновляем цвета основного окна
         self.configure(fg_color=self.theme.BACKGROUND)
         
-        # Обновляем цвета для редактора кода
-        self.code_editor.configure(
-            bg=self.theme.BACKGROUND, 
-            fg=self.theme.FOREGROUND,
-            insertbackground=self.theme.CURSOR,
-            selectbackground=self.theme.SELECTION
-        )
+        # Обновляем цвета для окон редактора кода
+        for editor in self.editor_views:
+            editor.configure(
+                bg=self.theme.BACKGROUND, 
+                fg=self.theme.FOREGROUND,
+                insertbackground=self.theme.CURSOR,
+                selectbackground=self.theme.SELECTION
+            )
         
         # Обновляем номера строк
-        self.line_numbers.configure(
-            bg=self.theme.BACKGROUND, 
-            fg=self.theme.COMMENT,
-            insertbackground=self.theme.CURSOR,
-            selectbackground=self.theme.SELECTION
-        )
+        for gutter in (self.line_numbers, self.split_gutter):
+            if gutter is not None:
+                gutter.set_colors(fg=self.theme.COMMENT, active_fg=self.theme.FOREGROUND,
+                                  bg=self.theme.BACKGROUND)
         
         # Обновляем теги для подсветки синтаксиса
         self.code_editor.tag_configure("keyword", foreground=self.theme.KEYWORD)
@@ -2516,6 +3331,11 @@ class CodeEditor(ctk.CTk):
         self.code_editor.tag_configure("class", foreground=self.theme.CLASS)
         self.code_editor.tag_configure("number", foreground=self.theme.NUMBER)
         self.code_editor.tag_configure("operator", foreground=self.theme.OPERATOR)
+        self.code_editor.tag_configure("semantic_function", foreground=self.theme.FUNCTION)
+        self.code_editor.tag_configure("semantic_class", foreground=self.theme.CLASS)
+        self.code_editor.tag_configure("parameter", foreground=self.theme.PARAMETER)
+        self.code_editor.tag_configure("decorator", foreground=self.theme.DECORATOR)
+        self.code_editor.tag_configure("builtin", foreground=self.theme.BUILTIN)
         
         # Обновляем цвета консоли
         self.console_output.configure(
@@ -2718,7 +3538,11 @@ class CodeEditor(ctk.CTk):
                 'new_file': 'Новый файл',
                 'find': 'Поиск',
                 'toggle_console': 'Показать/скрыть консоль',
-                'toggle_explorer': 'Показать/скрыть проводник'
+                'toggle_explorer': 'Показать/скрыть проводник',
+                'jump_to_bracket': 'Перейти к парной скобке',
+                'next_buffer': 'Следующий открытый файл',
+                'toggle_fold': 'Свернуть/развернуть блок',
+                'split_view': 'Разделить редактор'
             }
             
             action_name = action_translations.get(action, action)
@@ -2948,13 +3772,19 @@ class CodeEditor(ctk.CTk):
     def apply_settings(self):
         """Применить настройки к редактору"""
         # Обновляем шрифт
-        self.code_editor.configure(font=self.settings.get_font())
-        self.line_numbers.configure(font=self.settings.get_font())
+        for editor in self.editor_views:
+            editor.configure(font=self.settings.get_font())
+        for gutter in (self.line_numbers, self.split_gutter):
+            if gutter is not None:
+                gutter.set_font(self.settings.get_font())
         self.console_output.configure(font=(self.settings.font_family, self.settings.font_size))
         self.chat_history.configure(font=(self.settings.font_family, self.settings.font_size))
         
         # Настройки табуляции
-        self.code_editor.configure(tabs=self.settings.tab_size * 7)  # Примерное соответствие в пикселях
+        for editor in self.editor_views:
+            editor.configure(tabs=self.settings.tab_size * 7)  # Примерное соответствие в пикселях
+        self.bracket_index.tab_size = self.settings.tab_size
+        self.bracket_index.schedule_render()
         
         # Привязываем горячие клавиши заново
         self.bind_hotkeys()
@@ -2978,28 +3808,8 @@ class CodeEditor(ctk.CTk):
         self.show_whitespace(self.settings.show_whitespace)
     
     def show_whitespace(self, show=True):
-        """Показать или скрыть пробелы"""
-        # Сначала удаляем все существующие теги whitespace
-        self.code_editor.tag_remove("whitespace", "1.0", tk.END)
-        
-        if show:
-            # Находим все пробелы в тексте и применяем тег
-            content = self.code_editor.get("1.0", tk.END)
-            start_idx = "1.0"
-            
-            # Применяем тег только к выделенной строке
-            # Получаем текущую позицию курсора
-            current_line = int(float(self.code_editor.index(tk.INSERT)))
-            line_start = f"{current_line}.0"
-            line_end = f"{current_line}.end"
-            
-            # Получаем содержимое строки
-            line_content = self.code_editor.get(line_start, line_end)
-            
-            # Ищем пробелы и добавляем тег
-            for i, char in enumerate(line_content):
-                if char == ' ':
-                    self.code_editor.tag_add("whitespace", f"{current_line}.{i}", f"{current_line}.{i+1}")
+        """Показать или скрыть пробелы, табуляции и пробелы в конце строк в видимой области"""
+        self.whitespace_renderer.set_enabled(show)
     
     def handle_tab(self, event):
         """Обработка нажатия Tab"""
@@ -3013,17 +3823,12 @@ class CodeEditor(ctk.CTk):
             end_line = int(sel_end.split('.')[0])
             
             if start_line != end_line:
-                # Выделено несколько строк - добавляем отступ к каждой строке
-                for line in range(start_line, end_line + 1):
-                    line_start = f"{line}.0"
-                    
-                    # Добавляем табуляцию в начало строки
-                    if self.settings.use_spaces_for_tab:
-                        # Используем пробелы вместо табуляции
-                        self.code_editor.insert(line_start, ' ' * self.settings.tab_size)
-                    else:
-                        # Используем символ табуляции
-                        self.code_editor.insert(line_start, '\t')
+                # Выделено несколько строк - добавляем отступ к каждой строке одним пакетом правок
+                indent = ' ' * self.settings.tab_size if self.settings.use_spaces_for_tab else '\t'
+                transaction = self.edit_tracker.transaction()
+                for row in range(start_line - 1, end_line):
+                    transaction.insert((row, 0), indent)
+                transaction.commit()
                 
                 # Обновляем выделение
                 new_sel_start = f"{start_line}.0"
@@ -3059,27 +3864,28 @@ class CodeEditor(ctk.CTk):
             # Получаем границы выделения
             sel_start = self.code_editor.index(tk.SEL_FIRST)
             sel_end = self.code_editor.index(tk.SEL_LAST)
-            
-            # Проверяем, охватывает ли выделение несколько строк
             start_line = int(sel_start.split('.')[0])
             end_line = int(sel_end.split('.')[0])
-            
-            # Уменьшаем отступ для каждой строки
-            for line in range(start_line, end_line + 1):
-                line_start = f"{line}.0"
-                line_content = self.code_editor.get(line_start, f"{line}.end")
-                
-                # Проверяем начало строки
-                if line_content.startswith('\t'):
-                    # Удаляем табуляцию
-                    self.code_editor.delete(line_start, f"{line}.1")
-                elif line_content.startswith(' '):
-                    # Удаляем пробелы (до self.settings.tab_size)
-                    spaces_to_remove = min(sum(1 for c in line_content if c == ' ' and line_content.index(c) < self.settings.tab_size), 
-                                         self.settings.tab_size)
-                    if spaces_to_remove > 0:
-                        self.code_editor.delete(line_start, f"{line}.{spaces_to_remove}")
-            
+            has_selection = True
+        except tk.TclError:
+            # Нет выделения, уменьшаем отступ в текущей строке
+            start_line = end_line = int(float(self.code_editor.index(tk.INSERT)))
+            has_selection = False
+        
+        # Уменьшаем отступ каждой строки одним пакетом правок
+        transaction = self.edit_tracker.transaction()
+        for row in range(start_line - 1, end_line):
+            line_content = self.document.line(row)
+            if line_content.startswith('\t'):
+                # Удаляем табуляцию
+                transaction.delete((row, 0), (row, 1))
+            elif line_content.startswith(' '):
+                # Удаляем пробелы (до self.settings.tab_size)
+                spaces_to_remove = min(len(line_content) - len(line_content.lstrip(' ')), self.settings.tab_size)
+                transaction.delete((row, 0), (row, spaces_to_remove))
+        transaction.commit()
+        
+        if has_selection:
             # Обновляем выделение
             new_sel_start = f"{start_line}.0"
             if self.code_editor.get(f"{end_line}.0", f"{end_line}.end") in ['\n', '']:
@@ -3090,23 +3896,8 @@ class CodeEditor(ctk.CTk):
             self.code_editor.tag_remove(tk.SEL, "1.0", tk.END)
             self.code_editor.tag_add(tk.SEL, new_sel_start, new_sel_end)
             self.code_editor.mark_set(tk.INSERT, new_sel_end)
-            
-            return "break"
-        except:
-            # Нет выделения, пытаемся уменьшить отступ в текущей строке
-            current_line = int(float(self.code_editor.index(tk.INSERT)))
-            line_start = f"{current_line}.0"
-            line_content = self.code_editor.get(line_start, f"{current_line}.end")
-            
-            if line_content.startswith('\t'):
-                self.code_editor.delete(line_start, f"{current_line}.1")
-            elif line_content.startswith(' '):
-                spaces_to_remove = min(sum(1 for c in line_content if c == ' ' and line_content.index(c) < self.settings.tab_size), 
-                                     self.settings.tab_size)
-                if spaces_to_remove > 0:
-                    self.code_editor.delete(line_start, f"{current_line}.{spaces_to_remove}")
-            
-            return "break"
+        
+        return "break"
     
     def bind_hotkeys(self):
         """Привязать горячие клавиши"""
@@ -3136,10 +3927,126 @@ class CodeEditor(ctk.CTk):
                 self.bind(f"<{key}>", lambda e: self.toggle_console())
             elif action == 'toggle_explorer':
                 self.bind(f"<{key}>", lambda e: self.toggle_explorer())
+            elif action == 'jump_to_bracket':
+                self.bind(f"<{key}>", lambda e: self.jump_to_matching_bracket())
+            elif action == 'next_buffer':
+                # Привязка на самом редакторе перекрывает стандартную привязку класса Text
+                for editor in self.editor_views:
+                    editor.bind(f"<{key}>", lambda e: self.next_buffer() or "break")
+            elif action == 'toggle_fold':
+                self.bind(f"<{key}>", lambda e: self.toggle_fold())
+            elif action == 'split_view':
+                self.bind(f"<{key}>", lambda e: self.toggle_split_view())
     
     def find_text(self):
-        """Функция поиска текста (заглушка)"""
-        messagebox.showinfo("Поиск", "Функция поиска пока не реализована")
+        """Функция поиска текста (пока только для больших файлов)"""
+        if not self.large_file.active:
+            messagebox.showinfo("Поиск", "Функция поиска пока не реализована")
+            return
+        pattern = simpledialog.askstring("Поиск", "Найти в файле:", parent=self)
+        if not pattern:
+            return
+        # Поиск идёт по mmap от строки после курсора
+        current = int(self.code_editor.index(tk.INSERT).split(".")[0]) + self.large_file.first
+        line = self.large_file.search(pattern, current)
+        if line is None:
+            self.status_text.configure(text=f"Не найдено: {pattern}")
+        else:
+            self.large_file.goto(line)
+            self.highlight_current_line()
+    
+    def handle_paste(self, event=None):
+        """Вставка из буфера обмена: большой текст вставляется порциями"""
+        if self.large_file.active or self.file_loader.active or self.paste_guard.active:
+            return "break"
+        try:
+            text = self.clipboard_get()
+        except tk.TclError:
+            return None
+        if len(text) < PasteGuard.THRESHOLD:
+            # Обычная вставка средствами виджета
+            return None
+        
+        size_mb = len(text) / (1024 * 1024)
+        if len(text) >= PasteGuard.PLAIN_THRESHOLD and messagebox.askyesno(
+                "Большая вставка", f"Вставляется {size_mb:.1f} МБ текста. Вставить как простой текст без подсветки?"):
+            self.set_plain_text_mode(True)
+        
+        history = self.undo_history
+        if history is not None:
+            # Вставка - отдельный шаг отмены: набранное до неё к ней не присоединяется
+            history.seal()
+        try:
+            self.code_editor.delete(tk.SEL_FIRST, tk.SEL_LAST)
+        except tk.TclError:
+            pass
+        
+        def on_progress(progress):
+            self.status_text.configure(text=f"Вставка {size_mb:.1f} МБ: {int(progress * 100)}%")
+        
+        def end_step():
+            # Набранное после вставки начинает новый шаг
+            if history is not None:
+                history.joining = False
+                history.seal()
+        
+        if history is not None:
+            # Все порции вставки отменяются одним шагом
+            history.seal()
+            history.joining = True
+        
+        def on_done():
+            end_step()
+            self.status_text.configure(text=f"Вставлено {size_mb:.1f} МБ")
+            # Один проход конвейера обновлений: разбираются только изменившиеся строки
+            self.change_scheduler.mark()
+        
+        self.paste_guard.start(text, self.code_editor.index(tk.INSERT), on_progress=on_progress, on_done=on_done,
+                               widget=self.code_editor, on_cancel=end_step)
+        return "break"
+    
+    def undo_edit(self, event=None):
+        """Отменяет последний шаг истории правок"""
+        if self.undo_history is None or self.paste_guard.active or self.file_loader.active:
+            return "break"
+        entry = self.undo_history.undo(self._replace_offsets)
+        if entry is not None:
+            self._show_offset(entry.offset + len(entry.removed))
+        return "break"
+    
+    def redo_edit(self, event=None):
+        """Повторяет отменённый шаг истории правок"""
+        if self.undo_history is None or self.paste_guard.active or self.file_loader.active:
+            return "break"
+        entry = self.undo_history.redo(self._replace_offsets)
+        if entry is not None:
+            self._show_offset(entry.offset + len(entry.inserted))
+        return "break"
+    
+    def _replace_offsets(self, start, end, text):
+        """Заменяет текст между смещениями документа (правка для истории отмены)"""
+        start_line, start_column = self.document.position(start)
+        end_line, end_column = self.document.position(end)
+        self.code_editor.replace(f"{start_line + 1}.{start_column}", f"{end_line + 1}.{end_column}", text)
+    
+    def _show_offset(self, offset):
+        """Ставит курсор на смещение документа и обновляет редактор"""
+        line, column = self.document.position(offset)
+        self.code_editor.mark_set(tk.INSERT, f"{line + 1}.{column}")
+        self.code_editor.see(tk.INSERT)
+        self.change_scheduler.mark()
+    
+    def set_plain_text_mode(self, enabled):
+        """Включает или выключает показ буфера без подсветки синтаксиса"""
+        if enabled == self.plain_text:
+            return
+        self.plain_text = enabled
+        if enabled:
+            self.highlighter.enabled = False
+            self.highlighter.clear()
+            self.semantic_highlighter.clear()
+        else:
+            self.highlight_syntax()
     
     def handle_return(self, event):
         """Обработка нажатия Enter для автоматической табуляции"""
@@ -3147,8 +4054,12 @@ class CodeEditor(ctk.CTk):
         current_line_num = int(float(self.code_editor.index(tk.INSERT)))
         current_line = self.code_editor.get(f"{current_line_num}.0", f"{current_line_num}.end")
         
-        # Проверяем, заканчивается ли строка на двоеточие (блок кода Python)
-        if current_line.rstrip().endswith(':'):
+        # Проверяем, открывает ли строка блок кода Python: по синтаксическому дереву,
+        # если оно есть, иначе по двоеточию в конце строки
+        opens_block = self.highlighter.opens_block(current_line_num - 1)
+        if opens_block is None:
+            opens_block = current_line.rstrip().endswith(':')
+        if opens_block:
             # Позволяем стандартной обработке Enter сначала сработать
             self.code_editor.after(1, lambda: self.add_auto_indent())
             return None  # Даем стандартной обработке выполниться
@@ -3199,15 +4110,8 @@ class CodeEditor(ctk.CTk):
         self.code_editor.insert(f"{line_num}.0", indent)
     
     def on_text_change(self, event=None):
-        """Обработчик изменения текста в редакторе"""
-        self.update_line_numbers()
-        self.highlight_syntax()
-        self.highlight_current_line()
-        self.update_cursor_position()
-        
-        # Показываем пробелы в текущей строке, если включено
-        if self.settings.show_whitespace:
-            self.show_whitespace(True)
+        """Обработчик изменения текста в редакторе: помечает задачи конвейера обновлений"""
+        self.change_scheduler.mark()
     
     def _generate_offline_response(self, message):
         """Генерирует простые ответы в офлайн-режиме"""
@@ -3356,34 +4260,34 @@ class CodeEditor(ctk.CTk):
                         
                         # Функция для принятия изменений
                         def accept_changes(new_content):
-                            # Записываем содержимое в файл
-                            with open(file_path, "w", encoding="utf-8") as f:
-                                f.write(new_content)
+                            # Файл записывается в фоне, остальное выполняется после записи
+                            def on_written():
+                                # Показываем сообщение об успешной замене
+                                self.chat_history.configure(state="normal")
+                                self.chat_history.insert(tk.END, f"✅ Файл успешно обновлен: {os.path.basename(file_path)}\n\n", "success")
                             
-                            # Показываем сообщение об успешной замене
-                            self.chat_history.configure(state="normal")
-                            self.chat_history.insert(tk.END, f"✅ Файл успешно обновлен: {os.path.basename(file_path)}\n\n", "success")
+                                # Если это текущий открытый файл, обновляем его в редакторе
+                                if self.current_file and os.path.abspath(self.current_file) == os.path.abspath(file_path):
+                                    # При загрузке перейти на начало файла для лучшего обзора изменений
+                                    self.load_file(self.current_file, goto_line=1)
+                                    self.chat_history.insert(tk.END, "📄 Содержимое редактора обновлено\n\n", "info")
                             
-                            # Если это текущий открытый файл, обновляем его в редакторе
-                            if self.current_file and os.path.abspath(self.current_file) == os.path.abspath(file_path):
-                                # При загрузке перейти на начало файла для лучшего обзора изменений
-                                self.load_file(self.current_file, goto_line=1)
-                                self.chat_history.insert(tk.END, "📄 Содержимое редактора обновлено\n\n", "info")
+                                self.chat_history.see(tk.END)
+                                self.chat_history.configure(state="disabled")
                             
-                            self.chat_history.see(tk.END)
-                            self.chat_history.configure(state="disabled")
+                                # Формируем сообщение об успешной замене для нейросети
+                                message = f"Файл {file_path} успешно обновлен."
                             
-                            # Формируем сообщение об успешной замене для нейросети
-                            message = f"Файл {file_path} успешно обновлен."
+                                # Добавляем в историю чата сообщение для продолжения диалога
+                                self.chat_messages.append({"role": "user", "content": message})
                             
-                            # Добавляем в историю чата сообщение для продолжения диалога
-                            self.chat_messages.append({"role": "user", "content": message})
+                                # Запускаем генерацию ответа в отдельном потоке
+                                self.is_generating = True
+                                self.generation_thread = threading.Thread(target=self._generate_ai_response)
+                                self.generation_thread.daemon = True
+                                self.generation_thread.start()
                             
-                            # Запускаем генерацию ответа в отдельном потоке
-                            self.is_generating = True
-                            self.generation_thread = threading.Thread(target=self._generate_ai_response)
-                            self.generation_thread.daemon = True
-                            self.generation_thread.start()
+                            self.write_file(file_path, new_content, on_written=on_written)
                         
                         # Функция для отказа от изменений
                         def reject_changes():
@@ -3436,6 +4340,7 @@ class CodeEditor(ctk.CTk):
                     self.code_editor.delete("1.0", tk.END)
                     self.code_editor.insert("1.0", content)
                     self.highlight_syntax()
+                    self.update_brackets()
                     self.update_line_numbers()
                     self.chat_history.insert(tk.END, "📄 Содержимое редактора обновлено\n\n", "info")
                 
@@ -3708,6 +4613,18 @@ class CodeEditor(ctk.CTk):
 if __name__ == "__main__":
     app = CodeEditor()
     app.mainloop()
+    # Разбор открытого файла сохраняется в кэш подсветки для следующего запуска
+    if not (app.large_file.active or app.file_loader.active):
+        app.store_highlight_cache(app.document.text(), wait=True)
+    # Дожидаемся записи файлов, сохранение которых ещё не завершено
+    app.file_saver.wait()
+    while not app.file_saver.results.empty():
+        job = app.file_saver.results.get()
+        if job.error is None and not app.file_saver.busy(job.path):
+            app.on_file_saved(job)
+    # Несохранённые правки остаются в журнале восстановления до следующего запуска
+    app.flush_recovery()
+    app.recovery_writer.close()
 
 
 
@@ -0,0 +1,105 @@
+"""
+Модуль вставки больших фрагментов текста.
+
+Большой текст из буфера обмена вставляется в виджет tk.Text порциями по
+одной за тик цикла событий, без обработки после каждой порции: интерфейс
+остаётся отзывчивым, а подсветка и индексы обновляются один раз после
+вставки - и только в изменившихся строках.
+"""
+
+import tkinter as tk
+
+
+class PasteGuard:
+    """Вставка большого текста в виджет tk.Text порциями"""
+
+    # Текст такого размера (символов) и больше вставляется порциями
+    THRESHOLD = 256 * 1024
+    # Текст такого размера и больше предлагается вставить без подсветки
+    PLAIN_THRESHOLD = 4 * 1024 * 1024
+    # Размер порции в символах
+    CHUNK_CHARS = 64 * 1024
+    # Интервал между порциями (мс)
+    TICK = 1
+    # Метка позиции вставки (сдвигается вправо вместе со вставленным текстом)
+    MARK = "paste_guard"
+
+    def __init__(self, text_widget):
+        """
+        Args:
+            text_widget: виджет tk.Text
+        """
+        self.text = text_widget
+        self.views = [text_widget]  # Окна буфера (виджет и его двойники), закрываемые на время вставки
+        self.target = text_widget   # Окно, в которое идёт текущая вставка
+        self.active = False
+        self._payload = ""
+        self._position = 0
+        self._callbacks = (None, None, None)
+        self._job = None
+
+    def start(self, text, index=tk.INSERT, on_progress=None, on_done=None, widget=None, on_cancel=None):
+        """
+        Начинает вставку текста.
+
+        Args:
+            text: вставляемый текст
+            index: позиция вставки
+            on_progress: функция (доля вставленного от 0 до 1)
+            on_done: вызывается после вставки последней порции
+            widget: окно, в которое вставляется текст (None - основной виджет)
+            on_cancel: вызывается, если вставка прервана до конца
+        """
+        self.cancel()
+        self.active = True
+        self.target = widget if widget is not None else self.text
+        self._payload = text
+        self._position = 0
+        self._callbacks = (on_progress, on_done, on_cancel)
+        self.target.mark_set(self.MARK, index)
+        self.target.mark_gravity(self.MARK, tk.RIGHT)
+        # Пока текст вставляется, все окна буфера доступны только для чтения
+        self._set_state("disabled")
+        self._job = self.text.after(self.TICK, self._pump)
+
+    def _set_state(self, state):
+        for view in self.views:
+            view.configure(state=state)
+
+    def cancel(self):
+        """Прерывает вставку; уже вставленные порции остаются в тексте"""
+        if not self.active:
+            return
+        if self._job is not None:
+            self.text.after_cancel(self._job)
+            self._job = None
+        self._finish()
+        on_cancel = self._callbacks[2]
+        if on_cancel:
+            on_cancel()
+
+    def _finish(self):
+        self.active = False
+        self._payload = ""
+        self._set_state("normal")
+        self.target.mark_set(tk.INSERT, self.MARK)
+        self.target.mark_unset(self.MARK)
+
+    def _pump(self):
+        """Вставляет в виджет одну порцию"""
+        self._job = None
+        on_progress, on_done, _ = self._callbacks
+        chunk = self._payload[self._position:self._position + self.CHUNK_CHARS]
+        self._position += len(chunk)
+        self.target.configure(state="normal")
+        self.target.insert(self.MARK, chunk)
+        self.target.configure(state="disabled")
+        if self._position < len(self._payload):
+            if on_progress:
+                on_progress(self._position / len(self._payload))
+            self._job = self.text.after(self.TICK, self._pump)
+            return
+        self._finish()
+        self.target.see(tk.INSERT)
+        if on_done:
+            on_done()
@@ -224,7 +224,9 @@ class Plugin(ABC):
             language_name: Имя языка
             file_extensions: Список расширений файлов
             run_command: Функция для запуска кода на этом языке
-            syntax_keywords: Словарь с ключевыми словами для подсветки
+            syntax_keywords: Словарь с ключевыми словами для подсветки. Ключ "lexer"
+                задает лексер pygments (имя, класс или функция, создающая лексер),
+                который будет создан при первом открытии файла этого языка
             
         Returns:
             True если язык зарегистрирован, иначе False
@@ -242,6 +244,12 @@ class Plugin(ABC):
                 "run_command": run_command,
                 "syntax": syntax_keywords or {}
             }
+            
+            # Регистрируем лексер для подсветки синтаксиса (создается лениво)
+            lexer = (syntax_keywords or {}).get("lexer")
+            if lexer and hasattr(self.app, 'lexer_registry'):
+                self.app.lexer_registry.register(file_extensions, lexer)
+            
             print(f"[DEBUG] {self.name}: Язык {language_name} успешно зарегистрирован")
             
             # Выводим информацию о расширениях
@@ -253,6 +261,62 @@ class Plugin(ABC):
             traceback.print_exc()
             return False
     
+    def register_editor_task(self, task_name, callback, priority=100, immediate=False):
+        """
+        Регистрирует задачу, выполняемую после изменения текста в редакторе.
+        
+        Повторные изменения текста сливаются в один вызов задачи. Встроенные
+        задачи имеют приоритеты 0-40 (курсор, текущая строка, подсветка, скобки,
+        номера строк, пробелы), задачи с большим приоритетом выполняются после них.
+        
+        Args:
+            task_name: Уникальное имя задачи
+            callback: Функция без аргументов
+            priority: Порядок выполнения (меньше - раньше)
+            immediate: Выполнять сразу, без задержки (только для дешевых задач)
+            
+        Returns:
+            True если задача зарегистрирована, иначе False
+        """
+        if not hasattr(self.app, 'change_scheduler'):
+            print(f"[ERROR] {self.name}: change_scheduler не существует в приложении")
+            return False
+        self.app.change_scheduler.register(f"{self.name}.{task_name}", callback, priority, immediate)
+        print(f"[DEBUG] {self.name}: Задача редактора {task_name} зарегистрирована")
+        return True
+    
+    def unregister_editor_task(self, task_name):
+        """Удаляет задачу, зарегистрированную register_editor_task."""
+        if hasattr(self.app, 'change_scheduler'):
+            self.app.change_scheduler.unregister(f"{self.name}.{task_name}")
+    
+    def subscribe_edits(self, callback):
+        """
+        Подписывает функцию на события правки текста в редакторе.
+        
+        Функция вызывается после каждой правки с событием EditEvent: текст между
+        позициями event.start и event.end (строка, колонка с нуля; позиции до
+        правки) заменён на event.inserted_text, event.version - версия документа
+        после правки, event.path - файл буфера. Если event.start равен None,
+        текст нужно перечитать целиком из self.app.document.snapshot().
+        
+        Args:
+            callback: Функция (event)
+            
+        Returns:
+            True если подписка оформлена, иначе False
+        """
+        if not hasattr(self.app, 'edit_events'):
+            print(f"[ERROR] {self.name}: edit_events не существует в приложении")
+            return False
+        self.app.edit_events.subscribe(callback)
+        return True
+    
+    def unsubscribe_edits(self, callback):
+        """Отменяет подписку, оформленную subscribe_edits."""
+        if hasattr(self.app, 'edit_events'):
+            self.app.edit_events.unsubscribe(callback)
+    
     def add_gui_window(self, title, content_callback, width=500, height=400):
         """
         Создает новое окно GUI и возвращает его.
@@ -28,7 +28,8 @@ class JavaScriptSupport(Plugin):
                 "import", "export", "default", "async", "await"
             ],
             "operators": ["=>", "==", "===", "!=", "!==", "+", "-", "*", "/", "%", "&&", "||", "!"],
-            "builtin": ["console", "document", "window", "Math", "Array", "Object", "String", "Number", "Boolean"]
+            "builtin": ["console", "document", "window", "Math", "Array", "Object", "String", "Number", "Boolean"],
+            "lexer": "javascript"  # Лексер pygments для подсветки
         }
         
         # Боковая кнопка плагина и другие элементы интерфейса
@@ -119,9 +120,11 @@ class JavaScriptSupport(Plugin):
         # Очищаем консоль перед запуском
         self.app.clear_console()
         
-        # Сохраняем текущий файл перед запуском
-        self.app.save_file()
-        
+        # Файл запускается, когда сохранение записано: интерфейс не ждёт диска
+        self.app.save_file(on_saved=lambda: self._run_saved_js(current_file))
+    
+    def _run_saved_js(self, current_file):
+        """Запускает записанный на диск JavaScript файл."""
         # Запускаем файл
         self.app.write_to_console(f"Запуск JavaScript: {os.path.basename(current_file)}\n", "info")
         
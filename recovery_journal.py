@@ -0,0 +1,320 @@
+"""
+Модуль журнала восстановления несохранённых буферов.
+
+Каждая правка буфера дописывается в журнал ~/.vpycode/recovery/<ключ>.journal
+как дельта (позиции до правки и вставленный текст), поэтому автосохранение
+стоит столько, сколько сама правка, а не весь файл. Началом журнала служит
+содержимое файла на диске (в журнале - только его хэш) или контрольная
+точка - сжатый полный текст. Контрольная точка пишется заново, когда
+правок накопилось больше, чем текста в буфере. Записи копятся в памяти и
+сбрасываются на диск фоновым потоком раз в FLUSH_INTERVAL. После
+успешной записи файла журнал начинается заново, а при запуске редактора оставшиеся
+журналы проигрываются на модели документа - за время, пропорциональное
+объёму правок.
+"""
+
+import hashlib
+import json
+import os
+import queue
+import struct
+import threading
+import uuid
+import zlib
+
+from document import Document
+from undo_history import content_digest
+
+# Каталог журналов по умолчанию
+DEFAULT_RECOVERY_DIR = os.path.join(os.path.expanduser("~"), ".vpycode", "recovery")
+
+# Начало ключа журнала буфера без файла (у каждого буфера свой ключ)
+UNTITLED_PREFIX = "untitled-"
+
+_MAGIC = b"VPRJ1"
+_RECORD = struct.Struct("<cI")
+_EDIT = struct.Struct("<IIII")
+_SUFFIX = ".journal"
+
+# Типы записей журнала
+_HEADER = b"H"
+_CHECKPOINT = b"C"
+_EDIT_KIND = b"E"
+
+
+def _record(kind, payload=b""):
+    return _RECORD.pack(kind, len(payload)) + payload
+
+
+class RecoveryWriter:
+    """Фоновый поток, записывающий журналы восстановления"""
+
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def append(self, path, data):
+        """Дописывает данные в конец журнала"""
+        self.jobs.put(("append", path, data))
+
+    def rewrite(self, path, data):
+        """Заменяет журнал целиком (через временный файл)"""
+        self.jobs.put(("rewrite", path, data))
+
+    def remove(self, path):
+        """Удаляет журнал"""
+        self.jobs.put(("remove", path, None))
+
+    def close(self):
+        """Дописывает очередь и останавливает поток"""
+        self.jobs.put(None)
+        self._thread.join()
+
+    def _run(self):
+        """Основной цикл потока"""
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            action, path, data = job
+            try:
+                if action == "remove":
+                    if os.path.exists(path):
+                        os.remove(path)
+                    continue
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if action == "append":
+                    with open(path, "ab") as f:
+                        f.write(data)
+                else:
+                    temp_path = path + ".tmp"
+                    with open(temp_path, "wb") as f:
+                        f.write(data)
+                    os.replace(temp_path, path)
+            except OSError as e:
+                print(f"[ERROR] Не удалось записать журнал восстановления {path}: {e}")
+
+
+class RecoveryJournal:
+    """Журнал восстановления одного буфера"""
+
+    # Интервал сброса накопленных записей на диск (мс)
+    FLUSH_INTERVAL = 500
+    # Контрольная точка пишется, когда правок больше этого размера (байт) и больше текста буфера
+    CHECKPOINT_BYTES = 1024 * 1024
+
+    def __init__(self, writer, path=None, base_digest=None, recovery_dir=DEFAULT_RECOVERY_DIR):
+        """
+        Args:
+            writer: RecoveryWriter
+            path: путь к файлу буфера (None - буфер без файла)
+            base_digest: хэш содержимого файла на диске, от которого считаются правки
+                (None - журнал начинается с контрольной точки)
+            recovery_dir: каталог журналов
+        """
+        self.writer = writer
+        self.recovery_dir = recovery_dir
+        self.path = None
+        self.file = None
+        self.base_digest = None
+        self.started = False      # Заголовок журнала уже поставлен в очередь записи
+        self._pending = []        # Записи, ещё не отданные потоку записи
+        self._edit_bytes = 0      # Объём правок после начала журнала
+        self._untitled_key = UNTITLED_PREFIX + uuid.uuid4().hex
+        self._bind(path, base_digest)
+
+    def _bind(self, path, base_digest):
+        self.path = path
+        if path:
+            key = hashlib.sha1(os.path.abspath(path).encode("utf-8", "surrogatepass")).hexdigest()
+        else:
+            key = self._untitled_key
+        self.file = os.path.join(self.recovery_dir, key + _SUFFIX)
+        self.base_digest = base_digest if path else None
+        self.started = False
+        self._pending = []
+        self._edit_bytes = 0
+
+    def _header(self):
+        meta = {"path": self.path, "digest": self.base_digest.hex() if self.base_digest else None}
+        return _MAGIC + _record(_HEADER, json.dumps(meta).encode("utf-8"))
+
+    # --- Запись правок ---
+
+    def record(self, start, end, text, document):
+        """
+        Добавляет правку: текст между позициями start и end (строка, колонка
+        с нуля) заменён на text.
+
+        Args:
+            document: модель документа до применения правки (для первой контрольной точки)
+        """
+        if not self.started:
+            self._start(None if self.base_digest else document.text())
+        payload = _EDIT.pack(start[0], start[1], end[0], end[1]) + text.encode("utf-8", "surrogatepass")
+        self._pending.append(_record(_EDIT_KIND, payload))
+        self._edit_bytes += len(payload)
+
+    def _start(self, text):
+        """Начинает журнал заново: заголовок и контрольная точка, если нет файла-основы"""
+        data = self._header()
+        if text is not None:
+            data += _record(_CHECKPOINT, zlib.compress(text.encode("utf-8", "surrogatepass"), 1))
+        self._pending = []
+        self._edit_bytes = 0
+        self.started = True
+        self.writer.rewrite(self.file, data)
+
+    def needs_checkpoint(self, size):
+        """Пора ли заменить накопленные правки контрольной точкой (size - длина текста буфера)"""
+        return self._edit_bytes > max(self.CHECKPOINT_BYTES, size)
+
+    def checkpoint(self, text):
+        """Переписывает журнал: заголовок и полный текст буфера (файл на диске больше не нужен)"""
+        self.base_digest = None
+        self._start(text)
+
+    def flush(self):
+        """Отдаёт накопленные записи потоку записи"""
+        if self._pending:
+            self.writer.append(self.file, b"".join(self._pending))
+            self._pending = []
+
+    # --- Сохранение и закрытие буфера ---
+
+    def saved(self, path, content, text=None):
+        """
+        Файл записан с текстом content: журнал начинается заново от файла на диске.
+
+        Args:
+            path: путь к записанному файлу
+            content: записанный текст
+            text: текущий текст буфера, если он менялся после снимка content
+                (None - не менялся)
+        """
+        self.discard()
+        self._bind(path, content_digest(content))
+        if text is not None and text != content:
+            # Правки после снимка перемешаны в журнале с более ранними - сохраняем текст целиком
+            self.checkpoint(text)
+
+    def discard(self):
+        """Удаляет журнал (изменения сохранены или отброшены)"""
+        self._pending = []
+        self._edit_bytes = 0
+        if self.started:
+            self.writer.remove(self.file)
+        self.started = False
+
+
+class RecoveredBuffer:
+    """Буфер, восстановленный из журнала"""
+
+    def __init__(self, path, text, journal):
+        """
+        Args:
+            path: путь к файлу буфера (None - буфер без файла)
+            text: восстановленный текст
+            journal: путь к файлу журнала
+        """
+        self.path = path
+        self.text = text
+        self.journal = journal
+
+
+def _read_text(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def replay(data, read_file=_read_text):
+    """
+    Восстанавливает текст буфера по журналу.
+
+    Файл-основа читается, только если после последней контрольной точки
+    есть правки.
+
+    Args:
+        data: содержимое журнала
+        read_file: функция (путь) -> текст файла
+
+    Returns:
+        (путь к файлу, текст или None, если правок нет) или None, если основа
+        журнала недоступна (файл изменён вне редактора или удалён)
+    """
+    if not data.startswith(_MAGIC):
+        raise ValueError("неверная сигнатура")
+    meta = None
+    document = None
+    position = len(_MAGIC)
+    while position + _RECORD.size <= len(data):
+        kind, length = _RECORD.unpack_from(data, position)
+        payload = position + _RECORD.size
+        if payload + length > len(data):
+            break  # Запись оборвана при аварийном завершении
+        body = data[payload:payload + length]
+        position = payload + length
+        if kind == _HEADER:
+            meta = json.loads(body.decode("utf-8"))
+        elif kind == _CHECKPOINT:
+            document = Document(zlib.decompress(body).decode("utf-8", "surrogatepass"))
+        elif kind == _EDIT_KIND and meta is not None:
+            if document is None:
+                # Правки считаются от файла на диске, если он не менялся вне редактора
+                if not meta.get("digest"):
+                    return None
+                try:
+                    base = read_file(meta["path"])
+                except (OSError, UnicodeDecodeError):
+                    return None
+                if content_digest(base).hex() != meta["digest"]:
+                    return None
+                document = Document(base)
+            first_line, first_column, last_line, last_column = _EDIT.unpack_from(body)
+            text = body[_EDIT.size:].decode("utf-8", "surrogatepass")
+            document.replace((first_line, first_column), (last_line, last_column), text)
+    if meta is None:
+        return None
+    return meta.get("path"), document.text() if document is not None else None
+
+
+def pending_recoveries(recovery_dir=DEFAULT_RECOVERY_DIR):
+    """
+    Проигрывает журналы, оставшиеся после аварийного завершения.
+
+    Журналы без изменений относительно файла и журналы, основа которых
+    недоступна, удаляются.
+
+    Returns:
+        Список RecoveredBuffer
+    """
+    try:
+        names = sorted(name for name in os.listdir(recovery_dir) if name.endswith(_SUFFIX))
+    except OSError:
+        return []
+    recovered = []
+    for name in names:
+        journal = os.path.join(recovery_dir, name)
+        try:
+            with open(journal, "rb") as f:
+                result = replay(f.read())
+            if result is not None and result[1] is not None:
+                path, text = result
+                if path is None:
+                    changed = bool(text)
+                else:
+                    try:
+                        changed = _read_text(path) != text
+                    except (OSError, UnicodeDecodeError):
+                        changed = True  # Файл удалён: восстановленный текст - единственная копия
+                if changed:
+                    recovered.append(RecoveredBuffer(path, text, journal))
+                    continue
+        except Exception as e:
+            print(f"[ERROR] Повреждённый журнал восстановления {journal}: {e}")
+        try:
+            os.remove(journal)
+        except OSError:
+            pass
+    return recovered
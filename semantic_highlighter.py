@@ -0,0 +1,268 @@
+"""
+Модуль семантической подсветки Python-кода.
+
+Текст буфера разбирается модулем ast в отдельном процессе, чтобы разбор
+больших файлов не занимал GIL процесса интерфейса. Процесс возвращает
+компактные массивы построчных отрезков для определений, параметров,
+декораторов и встроенных имён. Результат применяется, только если он
+соответствует текущему поколению буфера, и, как лексическая подсветка,
+теги ставятся лишь на видимые строки окон с запасом и расставляются
+заново при прокрутке.
+"""
+
+import ast
+import builtins
+import queue
+import re
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from editor_views import visible_windows, window_segments
+from syntax_tokenizer import apply_ranges, group_spans
+
+# Теги семантической подсветки
+SEMANTIC_TAGS = ("semantic_function", "semantic_class", "parameter", "decorator", "builtin")
+
+_BUILTIN_NAMES = frozenset(dir(builtins))
+
+# Имя после def/class (поиск по имени нашёл бы его и внутри ключевого слова)
+_DEFINITION_NAME = re.compile(r"\b(?:def|class)\s+(\w+)")
+
+_executor = None
+
+
+def get_executor():
+    """Возвращает общий пул процессов для семантического анализа"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=1)
+    return _executor
+
+
+def analyze_source(source):
+    """
+    Разбирает исходный код и собирает позиции семантических элементов.
+
+    Выполняется в дочернем процессе, поэтому результат должен быть компактным.
+
+    Args:
+        source: текст Python-модуля
+
+    Returns:
+        Словарь {тег: array('I', [строка, начало, конец, ...])} с номерами строк
+        от нуля (отрезок на несколько строк разбит по строкам) или None, если
+        код содержит синтаксическую ошибку
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return None
+
+    lines = source.split("\n")
+    spans = {tag: array("I") for tag in SEMANTIC_TAGS}
+
+    def char_col(line_no, byte_col):
+        # Смещения ast указаны в байтах UTF-8, а Tk считает символы
+        line = lines[line_no - 1]
+        if line.isascii():
+            return byte_col
+        return len(line.encode("utf-8")[:byte_col].decode("utf-8", errors="ignore"))
+
+    def add(tag, line_no, start, end_line_no, end):
+        start = char_col(line_no, start)
+        for row in range(line_no, end_line_no):
+            spans[tag].extend((row - 1, start, len(lines[row - 1])))
+            start = 0
+        spans[tag].extend((end_line_no - 1, start, char_col(end_line_no, end)))
+
+    def add_name(tag, node, name):
+        # Позиция имени после def/class определяется по тексту строки
+        line = lines[node.lineno - 1]
+        match = _DEFINITION_NAME.search(line, char_col(node.lineno, node.col_offset))
+        if match and match.group(1) == name:
+            spans[tag].extend((node.lineno - 1, match.start(1), match.end(1)))
+
+    # Имена, переопределённые в модуле, не считаются встроенными
+    shadowed = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            shadowed.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            shadowed.add(node.name)
+
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            is_class = isinstance(node, ast.ClassDef)
+            add_name("semantic_class" if is_class else "semantic_function", node, node.name)
+            for decorator in node.decorator_list:
+                # Вместе с символом @ перед выражением
+                add("decorator", decorator.lineno, max(decorator.col_offset - 1, 0),
+                    decorator.end_lineno, decorator.end_col_offset)
+        elif isinstance(node, ast.arg):
+            add("parameter", node.lineno, node.col_offset,
+                node.lineno, node.col_offset + len(node.arg.encode("utf-8")))
+        elif (isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load)
+              and node.id in _BUILTIN_NAMES and node.id not in shadowed):
+            add("builtin", node.lineno, node.col_offset, node.end_lineno, node.end_col_offset)
+    return spans
+
+
+class SemanticHighlighter:
+    """Семантическая подсветка для виджета tk.Text на основе ast"""
+
+    # Интервал опроса результатов пула процессов (мс)
+    POLL_INTERVAL = 30
+    # Запас строк вокруг видимой области, на которые ставятся теги
+    VIEWPORT_MARGIN = 50
+    # Если строки с тегами уходят от видимой области дальше, теги снимаются
+    KEEP_DISTANCE = 200
+    # Метки границ участка с тегами: правки сдвигают их вместе с тегами
+    TAGGED_MARKS = ("semantic_first", "semantic_last")
+
+    def __init__(self, text_widget, highlighter):
+        """
+        Args:
+            text_widget: виджет tk.Text
+            highlighter: IncrementalHighlighter, задающий поколение буфера и окна просмотра
+        """
+        self.text = text_widget
+        self.highlighter = highlighter
+        self.enabled = True
+        self.results = queue.Queue()
+        self.spans = {}        # Отрезки применённого разбора: {строка: [(тег, начало, конец), ...]}
+        self.tagged = bytearray()  # 1 - строка окна уже перекрашена
+        self._generation = None    # Поколение, к которому относятся self.spans
+        self._has_tags = False     # Теги стоят между метками TAGGED_MARKS
+        self._running = None   # Поколение, которое сейчас анализируется
+        self._waiting = None   # (поколение, текст), ожидающие отправки
+        self._poll_job = None
+        self._viewport_job = None
+
+    def request(self):
+        """Запрашивает анализ текущей версии буфера"""
+        if not self.enabled or not self.highlighter.lines:
+            return
+        generation = self.highlighter.generation
+        waiting_generation = self._waiting[0] if self._waiting else None
+        if generation == self._running or generation == waiting_generation:
+            return
+        document = self.highlighter.document
+        # Текст документа собирается из фрагментов и кэшируется до правки
+        source = document.text() if document is not None else "\n".join(self.highlighter.lines)
+        self._waiting = (generation, source)
+        # Пока идёт анализ, новые запросы копятся, отправляется только последний
+        if self._running is None:
+            self._submit()
+
+    def clear(self):
+        """Удаляет семантическую подсветку"""
+        self._waiting = None
+        self.spans = {}
+        self._generation = None
+        self._remove_tags()
+
+    def schedule_viewport(self):
+        """Откладывает расстановку тегов на видимую область до простоя цикла событий"""
+        if self._viewport_job is None and self._generation is not None:
+            self._viewport_job = self.text.after_idle(self._run_scheduled_viewport)
+
+    def _run_scheduled_viewport(self):
+        self._viewport_job = None
+        self.update_viewport()
+
+    def update_viewport(self):
+        """Ставит теги на видимые строки окон с запасом и снимает их, если они ушли далеко"""
+        # Разбор старой версии текста к сдвинутым правкой строкам не относится
+        if self._generation != self.highlighter.generation or not self.highlighter.lines:
+            return
+        total = len(self.highlighter.lines)
+        windows = visible_windows(self.highlighter.views, self.VIEWPORT_MARGIN, total)
+        low, high = windows[0][0], windows[-1][1]
+        if self._has_tags:
+            tagged_low, tagged_high = self._tagged_rows()
+            if tagged_low < low - self.KEEP_DISTANCE or tagged_high > high + self.KEEP_DISTANCE:
+                self._remove_tags()
+        line_spans = []
+        for segment_low, segment_high in window_segments(windows, self.highlighter.folds):
+            row = self.tagged.find(0, segment_low, segment_high)
+            while row != -1:
+                if row in self.spans:
+                    line_spans.append((row + 1, self.spans[row]))
+                self.tagged[row] = 1
+                row = self.tagged.find(0, row + 1, segment_high)
+        if not line_spans:
+            return
+        apply_ranges(self.text, group_spans(line_spans, SEMANTIC_TAGS))
+        if self._has_tags:
+            tagged_low, tagged_high = self._tagged_rows()
+            low, high = min(low, tagged_low), max(high, tagged_high)
+        first, last = self.TAGGED_MARKS
+        self.text.mark_set(first, f"{low + 1}.0")
+        self.text.mark_gravity(first, "left")
+        self.text.mark_set(last, f"{high + 1}.0")
+        self.text.mark_gravity(last, "right")
+        self._has_tags = True
+
+    def _tagged_rows(self):
+        """Строки [low, high) с тегами по текущему положению меток"""
+        first, last = self.TAGGED_MARKS
+        return (int(self.text.index(first).split(".")[0]) - 1,
+                int(self.text.index(last).split(".")[0]) - 1)
+
+    def _remove_tags(self):
+        """Снимает теги с участка между метками, на который они ставились"""
+        if self._has_tags:
+            first, last = self.TAGGED_MARKS
+            for tag in SEMANTIC_TAGS:
+                self.text.tag_remove(tag, first, last)
+            self.text.mark_unset(first, last)
+            self._has_tags = False
+        self.tagged = bytearray(len(self.tagged))
+
+    def _submit(self):
+        generation, source = self._waiting
+        self._waiting = None
+        self._running = generation
+        try:
+            future = get_executor().submit(analyze_source, source)
+        except Exception as e:
+            print(f"[ERROR] Не удалось запустить семантический анализ: {e}")
+            self._running = None
+            return
+        # Обратный вызов выполняется в служебном потоке пула - передаём результат через очередь
+        future.add_done_callback(lambda f, generation=generation: self.results.put((generation, f)))
+        if self._poll_job is None:
+            self._poll_job = self.text.after(self.POLL_INTERVAL, self._poll_results)
+
+    def _poll_results(self):
+        """Забирает результат анализа и применяет его, если буфер не изменился"""
+        self._poll_job = None
+        try:
+            generation, future = self.results.get_nowait()
+        except queue.Empty:
+            self._poll_job = self.text.after(self.POLL_INTERVAL, self._poll_results)
+            return
+
+        self._running = None
+        try:
+            spans = future.result()
+        except Exception as e:
+            print(f"[ERROR] Ошибка семантического анализа: {e}")
+            spans = None
+        if spans is not None and self.enabled and generation == self.highlighter.generation:
+            self._apply(spans, generation)
+        if self._waiting:
+            self._submit()
+
+    def _apply(self, spans, generation):
+        """Раскладывает отрезки разбора по строкам и перекрашивает видимую область"""
+        self._remove_tags()
+        by_row = {}
+        for tag in SEMANTIC_TAGS:
+            positions = spans[tag]
+            for i in range(0, len(positions), 3):
+                by_row.setdefault(positions[i], []).append((tag, positions[i + 1], positions[i + 2]))
+        self.spans = by_row
+        self.tagged = bytearray(len(self.highlighter.lines))
+        self._generation = generation
+        self.update_viewport()
@@ -0,0 +1,423 @@
+"""
+Модуль инкрементальной подсветки синтаксиса.
+
+Подсветчик запоминает состояние лексера на конце каждой строки (открытая
+тройная строка, глубина скобок) и после изменения текста заново разбирает
+только строки, начиная с первой изменённой, пока состояние не совпадёт
+с закэшированным. Изменения приходят дельтами правок документа
+(apply_edit), так что весь текст не перечитывается и не сравнивается.
+Теги ставятся только на видимую область редактора.
+"""
+
+import queue
+import time
+import tkinter as tk
+
+from syntax_tokenizer import PythonTokenizer, group_spans, apply_ranges, relex_lines
+from highlight_worker import HighlightJob, HighlightWorker
+from editor_views import visible_windows, window_segments
+from edit_tracker import changed_rows
+
+
+def diff_lines(old_lines, new_lines):
+    """
+    Находит изменённый участок между двумя версиями текста.
+
+    Returns:
+        None, если текст не изменился, иначе кортеж (first, old_end, new_end):
+        строки [first, old_end) старой версии заменены строками [first, new_end) новой
+    """
+    if old_lines is new_lines:
+        return None
+    old_count = len(old_lines)
+    new_count = len(new_lines)
+    limit = min(old_count, new_count)
+
+    first = 0
+    while first < limit and old_lines[first] == new_lines[first]:
+        first += 1
+    if first == old_count == new_count:
+        return None
+
+    tail = 0
+    while (tail < limit - first and
+           old_lines[old_count - 1 - tail] == new_lines[new_count - 1 - tail]):
+        tail += 1
+    return first, old_count - tail, new_count - tail
+
+
+class IncrementalHighlighter:
+    """
+    Инкрементальный подсветчик синтаксиса для виджета tk.Text.
+
+    Разбор строк выполняется лениво - только до конца видимой области,
+    а теги ставятся лишь на видимые строки с запасом. Теги строк, ушедших
+    далеко за пределы экрана, удаляются. При наличии фонового потока разбор
+    выполняется в нём, а теги ставятся порциями в моменты простоя.
+    """
+
+    # Количество строк, подсвечиваемых сверх видимой области
+    VIEWPORT_MARGIN = 50
+    # Теги строк дальше этого расстояния от видимой области удаляются
+    KEEP_DISTANCE = 200
+    # Бюджет времени на одну порцию расстановки тегов (секунды)
+    FRAME_BUDGET = 0.008
+    # Количество строк, перекрашиваемых между проверками бюджета
+    SLICE_LINES = 32
+    # Интервал опроса результатов фонового потока (мс)
+    POLL_INTERVAL = 10
+
+    def __init__(self, text_widget, tokenizer=None, background=True):
+        """
+        Инициализация подсветчика
+
+        Args:
+            text_widget: виджет tk.Text, в котором выполняется подсветка
+            tokenizer: токенизатор языка (по умолчанию Python)
+            background: выполнять разбор в фоновом потоке
+        """
+        self.text = text_widget
+        self.tokenizer = tokenizer or PythonTokenizer()
+        self.worker = HighlightWorker() if background else None
+        self.enabled = True
+        self.generation = 0       # Номер версии буфера, растёт при каждом изменении
+        self.lines = []           # Строки текста (пустой список - текст ещё не прочитан)
+        self.states = []          # Состояние лексера на конце строки (None - строку нужно разобрать)
+        self.spans = []           # Закэшированные токены каждой строки
+        self.tagged = bytearray() # 1 - теги строки в виджете соответствуют кэшу
+        self._lines_owned = False # self.lines можно изменять на месте (список не отдан наружу)
+        self.valid_upto = 0       # Строки до этого индекса разобраны и достоверны
+        self._viewport_job = None
+        self._tag_job = None
+        self._tag_windows = []
+        self._poll_job = None
+        self._pending = None      # Последнее отправленное в поток задание
+        self._failed_generation = None  # Поколение, разбор которого в потоке завершился ошибкой
+        self.tree = None          # Синтаксическое дерево для токенизаторов на tree-sitter
+        self.column_limit = None  # Строки разбираются только до этой колонки (None - целиком)
+        self.document = None      # Модель документа, из которой берутся строки (None - из виджета)
+        self.folds = None         # FoldManager: свёрнутые строки не перекрашиваются
+        self.views = [text_widget] # Окна, показывающие буфер (виджет и его двойники)
+
+    def invalidate(self):
+        """Сбрасывает кэш, следующий проход разберёт текст заново"""
+        self.generation += 1
+        self.lines = []
+        self.states = []
+        self.spans = []
+        self.tagged = bytearray()
+        self.valid_upto = 0
+        self._pending = None
+        self.tree = None
+        if self.worker:
+            self.worker.cancel()
+
+    def set_tokenizer(self, tokenizer):
+        """Меняет токенизатор языка, подсветка строится заново"""
+        if tokenizer is self.tokenizer:
+            return
+        self.clear()
+        self.tokenizer = tokenizer
+
+    def set_column_limit(self, limit):
+        """Ограничивает разбор строк первыми limit колонками (None - без ограничения)"""
+        if limit == self.column_limit:
+            return
+        self.clear()
+        self.column_limit = limit
+
+    def clear(self):
+        """Удаляет подсветку и сбрасывает кэш"""
+        for tag in self.tokenizer.tags:
+            self.text.tag_remove(tag, "1.0", tk.END)
+        self.invalidate()
+
+    def restore(self, lines, states, spans, valid_upto=None, tree=None):
+        """
+        Подставляет готовый разбор текста (например, из дискового кэша).
+
+        Args:
+            lines: строки текста, который сейчас находится в виджете
+            states: состояния лексера на конце каждой строки
+            spans: отрезки токенов каждой строки
+            valid_upto: до какой строки разбор достоверен (по умолчанию - весь текст)
+            tree: синтаксическое дерево для токенизаторов на tree-sitter
+        """
+        self.clear()
+        self.lines = lines
+        self._lines_owned = False
+        self.states = list(states)
+        self.spans = list(spans)
+        self.tagged = bytearray(len(lines))
+        self.valid_upto = len(lines) if valid_upto is None else valid_upto
+        self.tree = tree
+
+    def snapshot(self):
+        """
+        Возвращает состояние разбора для последующего restore (например, при
+        переключении буферов). Списки не копируются, поэтому до следующего
+        прохода подсветчик нужно сбросить через invalidate или restore.
+        """
+        self._lines_owned = False
+        return self.lines, self.states, self.spans, self.valid_upto, self.tree
+
+    def parsed(self):
+        """
+        Разобранное начало текста (например, для дискового кэша).
+
+        Returns:
+            (states, spans) - копии состояний и отрезков строк [0, valid_upto)
+        """
+        valid = self.valid_upto
+        return self.states[:valid], self.spans[:valid]
+
+    def highlight(self):
+        """
+        Обновляет подсветку видимой области. Текст читается целиком, только
+        если кэш пуст или правки не передаются через apply_edit (document = None).
+        """
+        if not self.enabled:
+            return
+        if self.document is None or not self.lines:
+            if self.document is not None:
+                lines = self.document.lines()
+            else:
+                lines = self.text.get("1.0", "end-1c").split("\n")
+            lines = self._limit_columns(lines)
+            change = diff_lines(self.lines, lines)
+            if change is not None:
+                self.lines = lines
+                self._lines_owned = False
+                self._mark_changed(*change)
+                if getattr(self.tokenizer, "tree_based", False):
+                    self._update_tree(None)  # Без дельты правки дерево строится заново
+        self.update_viewport()
+
+    def apply_edit(self, start, end, text):
+        """
+        Переносит правку документа в кэш строк без перечитывания всего текста.
+
+        Args:
+            start: начало заменённого текста (строка, колонка с нуля; позиция до правки),
+                None - текст заменён целиком
+            end: конец заменённого текста
+            text: вставленный текст
+        """
+        if self.document is None or not self.lines:
+            return  # Кэш пуст: текст будет прочитан целиком при highlight
+        if start is None:
+            self.invalidate()
+            return
+        first, old_end, new_end = changed_rows(start, end, text)
+        if not self._lines_owned:
+            # Прежний список строк мог уйти в фоновый поток или в снимок
+            self.lines = list(self.lines)
+            self._lines_owned = True
+        self.lines[first:old_end] = self._limit_columns(self.document.lines(first, new_end))
+        self._mark_changed(first, old_end, new_end)
+        if getattr(self.tokenizer, "tree_based", False):
+            self._update_tree((start, end, text))
+
+    def _limit_columns(self, lines):
+        """Обрезает хвосты длинных строк: они не разбираются и не подсвечиваются"""
+        limit = self.column_limit
+        if limit:
+            return [line[:limit] if len(line) > limit else line for line in lines]
+        return lines
+
+    def _mark_changed(self, first, old_end, new_end):
+        """Помечает строки [first, new_end), заменившие строки [first, old_end), как требующие разбора"""
+        count = new_end - first
+        self.states[first:old_end] = [None] * count
+        self.spans[first:old_end] = [None] * count
+        self.tagged[first:old_end] = bytes(count)
+        self.valid_upto = min(self.valid_upto, first)
+        self.generation += 1
+
+    def _update_tree(self, edit):
+        """
+        Переносит правку в синтаксическое дерево и сбрасывает затронутые строки.
+
+        Args:
+            edit: дельта правки (start, end, text) или None - дерево строится заново
+        """
+        lines = self.lines
+        if self.tree is None or edit is None:
+            self.tree = self.tokenizer.create_tree(lines)
+        else:
+            for low, high in self.tree.edit(lines, *edit):
+                high = min(high, len(lines))
+                self.spans[low:high] = [None] * (high - low)
+                self.tagged[low:high] = bytes(high - low)
+        # Дерево описывает весь текст, разбор строк по состояниям не нужен
+        self.valid_upto = len(lines)
+
+    def opens_block(self, row):
+        """
+        Проверяет по синтаксическому дереву, открывает ли строка row блок кода.
+
+        Returns:
+            True или False, либо None, если дерева нет или оно не позволяет судить
+        """
+        if self.tree is None or row >= len(self.lines):
+            return None
+        return self.tree.opens_block(row)
+
+    def enclosing_definitions(self, row):
+        """Возвращает определения, содержащие строку row (пустой список без дерева)"""
+        if self.tree is None or row >= len(self.lines):
+            return []
+        return self.tree.enclosing_definitions(row)
+
+    def schedule_viewport(self):
+        """Откладывает обновление видимой области до простоя цикла событий"""
+        if self._viewport_job is None:
+            self._viewport_job = self.text.after_idle(self._run_scheduled_viewport)
+
+    def _run_scheduled_viewport(self):
+        self._viewport_job = None
+        self.update_viewport()
+
+    def update_viewport(self):
+        """Подсвечивает видимые области всех окон с запасом и снимает теги далеко за их пределами"""
+        if not self.enabled or not self.lines:
+            return
+        total = len(self.lines)
+        windows = visible_windows(self.views, self.VIEWPORT_MARGIN, total)
+        low, high = windows[0][0], windows[-1][1]
+
+        if self.tree is not None:
+            for window_low, window_high in windows:
+                self._fill_tree_spans(window_low, window_high)
+        elif self.valid_upto < high:
+            if self.worker:
+                self._request_lex(high)
+            else:
+                self._store(relex_lines(self.tokenizer, self.lines, self.states,
+                                        self.valid_upto, high))
+
+        # Пока фоновый разбор не завершён, перекрашиваем только достоверные строки
+        self._schedule_tagging(windows)
+        self._drop_far_tags(max(low - self.KEEP_DISTANCE, 0), min(high + self.KEEP_DISTANCE, total))
+
+    def _fill_tree_spans(self, low, high):
+        """Запрашивает у дерева отрезки строк окна, для которых их ещё нет"""
+        if None not in self.spans[low:high]:
+            return
+        for line_no, line_spans in enumerate(self.tree.line_spans(low, high), low):
+            if self.spans[line_no] != line_spans:
+                self.spans[line_no] = line_spans
+                self.tagged[line_no] = 0
+
+    def _request_lex(self, stop):
+        """Отправляет задание на разбор в фоновый поток"""
+        pending = self._pending
+        if pending and pending.generation == self.generation and pending.stop >= stop:
+            return
+        if self._failed_generation == self.generation:
+            return  # Тот же текст снова не разобрать, повтор - после следующей правки
+        # Поток получает снимки: список строк до следующей правки копируется, кэш состояний - сразу
+        self._lines_owned = False
+        self._pending = HighlightJob(self.generation, self.tokenizer, self.lines,
+                                     list(self.states), self.valid_upto, stop)
+        self.worker.submit(self._pending)
+        if self._poll_job is None:
+            self._poll_job = self.text.after(self.POLL_INTERVAL, self._poll_results)
+
+    def _poll_results(self):
+        """Забирает результаты фонового потока, устаревшие отбрасывает"""
+        self._poll_job = None
+        updated = False
+        while True:
+            try:
+                job = self.worker.results.get_nowait()
+            except queue.Empty:
+                break
+            if job is self._pending:
+                self._pending = None
+            if job.error is not None:
+                if job.generation == self.generation:
+                    print(f"[ERROR] Ошибка фоновой подсветки: {job.error}")
+                    self._failed_generation = job.generation
+                continue
+            # Результат применим, только если текст с момента снимка не менялся
+            if (job.generation == self.generation and job.start <= self.valid_upto
+                    and job.result[1] > self.valid_upto):
+                self._store(job.result)
+                updated = True
+
+        pending = self._pending
+        if pending and pending.generation == self.generation:
+            self._poll_job = self.text.after(self.POLL_INTERVAL, self._poll_results)
+        else:
+            self._pending = None
+        if updated:
+            self.update_viewport()
+
+    def _store(self, result):
+        """Сохраняет результат разбора в кэш строк"""
+        segments, valid_end, broken = result
+        for first, states, spans in segments:
+            self.states[first:first + len(states)] = states
+            for line_no, line_spans in enumerate(spans, first):
+                if self.spans[line_no] != line_spans:
+                    self.spans[line_no] = line_spans
+                    self.tagged[line_no] = 0
+        # Следующая строка разобрана от старого состояния - сбрасываем её,
+        # чтобы совпадение состояний дальше не перешагнуло этот разрыв
+        if broken:
+            self.states[valid_end] = None
+        self.valid_upto = valid_end
+
+    def _schedule_tagging(self, windows):
+        """Запускает порционную расстановку тегов на строки окон [low, high)"""
+        self._tag_windows = windows
+        if self._tag_job is None and any(self.tagged.find(0, low, min(high, self.valid_upto)) != -1
+                                         for low, high in windows):
+            self._tag_job = self.text.after_idle(self._tag_slice)
+
+    def _tag_slice(self):
+        """Перекрашивает строки, пока не исчерпан бюджет кадра"""
+        self._tag_job = None
+        deadline = time.perf_counter() + self.FRAME_BUDGET
+        windows = [(low, min(high, self.valid_upto)) for low, high in self._tag_windows]
+        for low, high in window_segments(windows, self.folds):
+            while True:
+                line_no = self.tagged.find(0, low, high)
+                if line_no == -1:
+                    break
+                self._tag_range(line_no, min(line_no + self.SLICE_LINES, high))
+                if time.perf_counter() >= deadline:
+                    self._tag_job = self.text.after_idle(self._tag_slice)
+                    return
+
+    def _tag_range(self, low, high):
+        """Ставит теги на строки [low, high), теги которых устарели"""
+        tags = self.tokenizer.tags
+        line_spans = []
+        line_no = self.tagged.find(0, low, high)
+        while line_no != -1:
+            run_end = self.tagged.find(1, line_no, high)
+            if run_end == -1:
+                run_end = high
+            # Старые теги снимаем со всего участка сразу
+            for tag in tags:
+                self.text.tag_remove(tag, f"{line_no + 1}.0", f"{run_end}.end")
+            for index in range(line_no, run_end):
+                line_spans.append((index + 1, self.spans[index]))
+            self.tagged[line_no:run_end] = b"\x01" * (run_end - line_no)
+            line_no = self.tagged.find(0, run_end, high)
+
+        if line_spans:
+            apply_ranges(self.text, group_spans(line_spans, tags))
+
+    def _drop_far_tags(self, keep_low, keep_high):
+        """Снимает теги со строк вне диапазона [keep_low, keep_high)"""
+        if self.tagged.find(1, 0, keep_low) != -1:
+            for tag in self.tokenizer.tags:
+                self.text.tag_remove(tag, "1.0", f"{keep_low + 1}.0")
+            self.tagged[:keep_low] = bytes(keep_low)
+        if self.tagged.find(1, keep_high) != -1:
+            for tag in self.tokenizer.tags:
+                self.text.tag_remove(tag, f"{keep_high + 1}.0", tk.END)
+            self.tagged[keep_high:] = bytes(len(self.tagged) - keep_high)
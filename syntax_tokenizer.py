@@ -0,0 +1,223 @@
+"""
+Модуль токенизации исходного кода для подсветки синтаксиса.
+
+Не зависит от интерфейса: текст разбирается за один проход единым
+скомпилированным регулярным выражением, результатом являются
+типизированные отрезки (тег, начало, конец).
+"""
+
+import re
+
+# Ключевые слова Python
+PYTHON_KEYWORDS = ["def", "class", "if", "else", "elif", "while", "for", "in", "try",
+                   "except", "finally", "import", "from", "as", "return", "break",
+                   "continue", "pass", "True", "False", "None", "and", "or", "not",
+                   "with", "async", "await", "yield", "lambda", "assert", "del", "global",
+                   "nonlocal", "raise", "is"]
+
+# Теги подсветки, которые выдаёт токенизатор
+HIGHLIGHT_TAGS = ("keyword", "string", "comment", "function", "class", "number", "operator")
+
+
+class PythonTokenizer:
+    """Токенизатор Python-кода на основе одного общего регулярного выражения"""
+
+    tags = HIGHLIGHT_TAGS
+
+    # Версия разбора для дискового кэша, меняется при изменении правил
+    version = "python-1"
+
+    # Состояние на конце строки: (открытая тройная кавычка или None, глубина скобок)
+    initial_state = (None, 0)
+
+    _keywords = frozenset(PYTHON_KEYWORDS)
+
+    _token_re = re.compile(r"""
+          (?P<comment>\#.*)
+        | (?P<triple>(?:\b[rRbBuUfF]{1,2})?(?:\"\"\"|'''))
+        | (?P<string>(?:\b[rRbBuUfF]{1,2})?(?:"(?:[^"\\]|\\.)*"?|'(?:[^'\\]|\\.)*'?))
+        | (?P<number>\b(?:0[xX][0-9a-fA-F_]+|\d[\d_]*(?:\.\d*)?(?:[eE][-+]?\d+)?[jJ]?)\b)
+        | (?P<name>[A-Za-z_]\w*)
+        | (?P<operator>[-+*/=<>!]=?)
+        | (?P<open>[(\[{])
+        | (?P<close>[)\]}])
+    """, re.VERBOSE)
+
+    _triple_end = {
+        '"""': re.compile(r'(?:[^\\]|\\.)*?"""', re.DOTALL),
+        "'''": re.compile(r"(?:[^\\]|\\.)*?'''", re.DOTALL),
+    }
+
+    def tokenize_line(self, line, state):
+        """
+        Разбирает одну строку кода.
+
+        Args:
+            line: текст строки без символа перевода строки
+            state: состояние на конце предыдущей строки
+
+        Returns:
+            Кортеж (spans, new_state), где spans - список (тег, начальная колонка, конечная колонка)
+        """
+        delim, depth = state
+        spans = []
+        pos = 0
+        length = len(line)
+
+        # Продолжение многострочной строки с предыдущей строки
+        if delim:
+            match = self._triple_end[delim].match(line)
+            if not match:
+                if length:
+                    spans.append(("string", 0, length))
+                return spans, (delim, depth)
+            pos = match.end()
+            spans.append(("string", 0, pos))
+
+        search = self._token_re.search
+        keywords = self._keywords
+        pending_tag = None  # Тег для имени после def/class
+        while pos < length:
+            match = search(line, pos)
+            if not match:
+                break
+            kind = match.lastgroup
+            start, end = match.span()
+            pos = end
+
+            if kind == "name":
+                word = match.group()
+                if word in keywords:
+                    spans.append(("keyword", start, end))
+                    pending_tag = "function" if word == "def" else "class" if word == "class" else None
+                    continue
+                if pending_tag:
+                    spans.append((pending_tag, start, end))
+            elif kind == "triple":
+                quote = match.group()[-3:]
+                closing = self._triple_end[quote].match(line, end)
+                if closing:
+                    pos = closing.end()
+                    spans.append(("string", start, pos))
+                else:
+                    spans.append(("string", start, length))
+                    return spans, (quote, depth)
+            elif kind == "open":
+                depth += 1
+            elif kind == "close":
+                depth = max(depth - 1, 0)
+            else:
+                spans.append((kind, start, end))
+            pending_tag = None
+
+        return spans, (None, depth)
+
+    def tokenize(self, text):
+        """
+        Разбирает весь текст за один проход.
+
+        Returns:
+            Список отрезков (тег, (строка, колонка), (строка, колонка)), строки нумеруются с 1
+        """
+        result = []
+        state = self.initial_state
+        for row, line in enumerate(text.split("\n"), 1):
+            spans, state = self.tokenize_line(line, state)
+            result.extend((tag, (row, start), (row, end)) for tag, start, end in spans)
+        return result
+
+
+def group_spans(line_spans, tags):
+    """
+    Группирует отрезки по тегам в списки индексов Tk.
+
+    Args:
+        line_spans: итерируемое из пар (номер строки с 1, список отрезков строки)
+        tags: теги, для которых нужно собрать диапазоны
+
+    Returns:
+        Словарь {тег: [начало, конец, начало, конец, ...]}
+    """
+    ranges = {tag: [] for tag in tags}
+    for row, spans in line_spans:
+        for tag, start, end in spans:
+            ranges[tag].extend((f"{row}.{start}", f"{row}.{end}"))
+    return ranges
+
+
+def apply_ranges(text_widget, ranges):
+    """Ставит теги одним вызовом tag_add на каждый тег"""
+    for tag, indices in ranges.items():
+        if indices:
+            text_widget.tag_add(tag, *indices)
+
+
+def relex_lines(tokenizer, lines, states, start, stop, is_cancelled=None):
+    """
+    Заново разбирает строки начиная с start, используя кэш состояний.
+
+    Разбор идёт, пока все строки до stop не станут достоверными. Если состояние
+    на конце строки совпало с закэшированным, следующие строки вплоть до
+    ближайшей изменённой (состояние None) не разбираются. Токенизаторы, которые
+    не умеют продолжать разбор с середины текста (resumable = False), разбирают
+    текст от начала до stop.
+
+    Args:
+        tokenizer: токенизатор языка
+        lines: строки текста
+        states: кэш состояний на конце каждой строки (None - строку нужно разобрать)
+        start: первая строка для разбора, все строки до неё достоверны
+        stop: строка, до которой разбор обязателен
+        is_cancelled: функция без аргументов, возвращающая True для прерывания разбора
+
+    Returns:
+        None при прерывании, иначе кортеж (segments, valid_end, broken), где
+        segments - список (первая строка, состояния, отрезки) разобранных участков,
+        valid_end - граница достоверных строк, broken - True, если строка valid_end
+        была разобрана от старого состояния и её кэш нужно сбросить
+    """
+    if not getattr(tokenizer, "resumable", True):
+        return _relex_text(tokenizer, lines, start, stop, is_cancelled)
+    tokenize_line = tokenizer.tokenize_line
+    total = len(lines)
+    segments = []
+    line_no = start
+    while line_no < stop:
+        state = states[line_no - 1] if line_no > 0 else tokenizer.initial_state
+        first = line_no
+        new_states = []
+        new_spans = []
+        segments.append((first, new_states, new_spans))
+        while True:
+            if is_cancelled and not (line_no - first) & 0xFF and is_cancelled():
+                return None
+            spans, state = tokenize_line(lines[line_no], state)
+            cached = states[line_no]
+            new_states.append(state)
+            new_spans.append(spans)
+            line_no += 1
+
+            if cached is not None and cached == state:
+                # Следующие строки достоверны вплоть до ближайшей изменённой
+                try:
+                    line_no = states.index(None, line_no)
+                except ValueError:
+                    line_no = total
+                break
+            if line_no >= stop:
+                return segments, line_no, line_no < total
+    return segments, line_no, False
+
+
+def _relex_text(tokenizer, lines, start, stop, is_cancelled):
+    """Разбор всего текста от начала до stop для relex_lines"""
+    total = len(lines)
+    stop = min(stop, total)
+    if start >= stop:
+        return [], start, False
+    spans = tokenizer.tokenize_lines(lines, stop, is_cancelled)
+    if spans is None:
+        return None
+    # Состояние строки не используется для продолжения разбора, важно лишь, что оно не None
+    states = [tokenizer.initial_state] * (stop - start)
+    return [(start, states, spans[start:stop])], stop, stop < total
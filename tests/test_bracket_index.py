@@ -0,0 +1,120 @@
+"""Тесты индекса скобок: сравнение с поиском пар по стеку"""
+
+import random
+
+import pytest
+
+from bracket_index import BracketIndex
+from document import Document
+
+
+class FakeText:
+    """Заглушка виджета: индексу скобок для запросов виджет не нужен"""
+
+
+def naive_pairs(text, index):
+    """Пары скобок, найденные стеком по скобкам из scan_line (позиция -> позиция)"""
+    pairs = {}
+    stack = []
+    for row, kinds in enumerate(index.kinds):
+        for col, char in zip(index.cols[row], kinds):
+            if char in "([{":
+                stack.append((row, col))
+            elif stack:
+                opening = stack.pop()
+                pairs[opening] = (row, col)
+                pairs[(row, col)] = opening
+    return pairs
+
+
+def check(index, text):
+    assert index.lines == text.split("\n")
+    pairs = naive_pairs(text, index)
+    for row, cols in enumerate(index.cols):
+        for col in cols:
+            found = index.find_match(row, col)
+            expected = pairs.get((row, col))
+            assert (found[:2] if found else None) == expected, (row, col)
+
+
+def random_text(rng):
+    return "".join(rng.choice("()[]{}x \n\n") for _ in range(rng.randint(0, 15)))
+
+
+@pytest.fixture(params=[2, BracketIndex.BLOCK_LINES])
+def index(request, monkeypatch):
+    monkeypatch.setattr(BracketIndex, "BLOCK_LINES", request.param)
+    index = BracketIndex(FakeText())
+    index.document = Document()
+    return index
+
+
+def test_matches_naive_stack_after_edits(index):
+    rng = random.Random(3)
+    text = "\n".join(random_text(rng).replace("\n", "") for _ in range(50))
+    index.document.reset(text)
+    index.update()
+    check(index, text)
+    for step in range(300):
+        lines = text.split("\n")
+        first = rng.randrange(len(lines))
+        last = rng.randrange(first, min(first + 3, len(lines)))
+        start = (first, rng.randint(0, len(lines[first])))
+        end = (last, rng.randint(0, len(lines[last])))
+        if end < start:
+            end = start
+        inserted = random_text(rng)
+        index.document.replace(start, end, inserted)
+        index.apply_edit(start, end, inserted)
+        text = index.document.text()
+        if step % 25 == 0:
+            check(index, text)
+    check(index, text)
+
+
+def test_skips_strings_and_comments(index):
+    index.document.reset('call("(", x)  # )\n')
+    index.update()
+    assert index.find_match(0, 4) == (0, 11, True)
+
+
+def test_depth_at(index):
+    text = "(\n[\n]\n)\n"
+    index.document.reset(text)
+    index.update()
+    assert [index.depth_at(row) for row in range(5)] == [0, 1, 2, 1, 0]
+
+
+def test_brackets_inside_triple_quoted_strings_are_skipped(index):
+    index.document.reset('f(\n"""\n)\n"""\n)\n')
+    index.update()
+    assert [list(cols) for cols in index.cols] == [[1], [], [], [], [0], []]
+    assert index.find_match(0, 1) == (4, 0, True)
+
+
+def test_literal_state_after_edits_matches_fresh_scan(index):
+    rng = random.Random(5)
+    pieces = ['"""', "'''", "(", ")", "[", "]", "x", "\n", "#", "\\"]
+    text = "".join(rng.choice(pieces) for _ in range(200))
+    index.document.reset(text)
+    index.update()
+    for _ in range(300):
+        lines = text.split("\n")
+        first = rng.randrange(len(lines))
+        last = rng.randrange(first, min(first + 3, len(lines)))
+        start = (first, rng.randint(0, len(lines[first])))
+        end = (last, rng.randint(0, len(lines[last])))
+        if end < start:
+            end = start
+        inserted = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 6)))
+        index.document.replace(start, end, inserted)
+        index.apply_edit(start, end, inserted)
+        text = index.document.text()
+    fresh = BracketIndex(FakeText())
+    fresh.document = Document(text)
+    fresh.update()
+    assert index.states == fresh.states
+    assert index.cols == fresh.cols
+    assert [index.depth_at(row) for row in range(len(index.lines) + 1)] == \
+        [fresh.depth_at(row) for row in range(len(fresh.lines) + 1)]
+    check(index, text)
@@ -0,0 +1,82 @@
+"""Тесты планировщика: дорогие задачи ждут паузы в наборе, но не дольше предела"""
+
+import pytest
+
+import change_scheduler
+from change_scheduler import ChangeScheduler
+
+
+class Clock:
+    """Часы и очередь after, которые тест продвигает вручную (мс)"""
+
+    def __init__(self):
+        self.now = 0
+        self.jobs = {}
+        self._next = 0
+
+    def perf_counter(self):
+        return self.now / 1000
+
+    def after(self, delay, callback):
+        self._next += 1
+        self.jobs[self._next] = (self.now + delay, callback)
+        return self._next
+
+    def after_idle(self, callback):
+        return self.after(0, callback)
+
+    def after_cancel(self, job):
+        self.jobs.pop(job, None)
+
+    def advance(self, ms):
+        """Продвигает время, выполняя наступившие задачи"""
+        stop = self.now + ms
+        while True:
+            due = [(when, job) for job, (when, _) in self.jobs.items() if when <= stop]
+            if not due:
+                break
+            self.now, job = min(due)
+            self.jobs.pop(job)[1]()
+        self.now = stop
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(change_scheduler.time, "perf_counter", clock.perf_counter)
+    return clock
+
+
+def test_typing_postpones_expensive_tasks(clock):
+    calls = []
+    scheduler = ChangeScheduler(clock)
+    scheduler.register("syntax", lambda: calls.append(clock.now))
+    for _ in range(3):
+        scheduler.mark()
+        clock.advance(20)
+    assert calls == []
+    clock.advance(ChangeScheduler.DELAY)
+    assert calls == [40 + ChangeScheduler.DELAY]
+
+
+def test_continuous_typing_is_capped_by_max_latency(clock):
+    calls = []
+    scheduler = ChangeScheduler(clock)
+    scheduler.register("syntax", lambda: calls.append(clock.now))
+    scheduler.register("cursor", lambda: None, immediate=True)
+    for _ in range(20):
+        scheduler.mark()
+        clock.advance(10)
+    assert calls[0] == ChangeScheduler.MAX_LATENCY
+
+
+def test_immediate_marks_do_not_postpone(clock):
+    calls = []
+    scheduler = ChangeScheduler(clock)
+    scheduler.register("syntax", lambda: calls.append(clock.now))
+    scheduler.register("cursor", lambda: None, immediate=True)
+    scheduler.mark("syntax")
+    clock.advance(20)
+    scheduler.mark("cursor")
+    clock.advance(ChangeScheduler.DELAY - 20)
+    assert calls == [ChangeScheduler.DELAY]
@@ -0,0 +1,83 @@
+"""Тесты модели документа: сравнение с правками обычной строки"""
+
+import random
+
+import pytest
+
+from document import Document, LineIndex
+
+
+def offset_of(text, line, column):
+    lines = text.split("\n")
+    return sum(len(part) + 1 for part in lines[:line]) + column
+
+
+def random_position(text, rng):
+    lines = text.split("\n")
+    line = rng.randrange(len(lines))
+    return line, rng.randint(0, len(lines[line]))
+
+
+def random_text(rng):
+    return "".join(rng.choice("ab\n\n") for _ in range(rng.randint(0, 12)))
+
+
+@pytest.fixture(params=[4, LineIndex.BLOCK_LINES])
+def block_lines(request, monkeypatch):
+    """Маленькие блоки индекса, чтобы правки делили и сливали блоки"""
+    monkeypatch.setattr(LineIndex, "BLOCK_LINES", request.param)
+    return request.param
+
+
+def check(document, text):
+    lines = text.split("\n")
+    assert document.text() == text
+    assert len(document) == len(text)
+    assert document.line_count == len(lines)
+    assert document.lines() == lines
+    for line, expected in enumerate(lines):
+        assert document.line(line) == expected
+        assert document.offset(line, 0) == offset_of(text, line, 0)
+    for offset in range(len(text) + 1):
+        line = text.count("\n", 0, offset)
+        assert document.position(offset) == (line, offset - offset_of(text, line, 0))
+
+
+def test_replace_matches_string(block_lines):
+    rng = random.Random(block_lines)
+    text = "\n".join("line %d" % number for number in range(40))
+    document = Document(text)
+    for step in range(400):
+        start = random_position(text, rng)
+        end = random_position(text, rng)
+        if offset_of(text, *end) < offset_of(text, *start):
+            start, end = end, start
+        inserted = random_text(rng)
+        document.replace(start, end, inserted)
+        low = offset_of(text, *start)
+        high = offset_of(text, *end)
+        text = text[:low] + inserted + text[high:]
+        if step % 20 == 0:
+            check(document, text)
+        else:
+            assert document.text() == text
+    check(document, text)
+
+
+def test_snapshot_is_not_affected_by_later_edits(block_lines):
+    rng = random.Random(7)
+    text = "\n".join("x" * (number % 5) for number in range(60))
+    document = Document(text)
+    snapshot = document.snapshot()
+    for _ in range(100):
+        start = random_position(document.text(), rng)
+        document.replace(start, start, random_text(rng))
+    check(snapshot, text)
+    assert snapshot.lines(10, 20) == text.split("\n")[10:20]
+
+
+def test_line_slices():
+    document = Document("a\nbb\nccc\n")
+    assert document.lines(1, 3) == ["bb", "ccc"]
+    assert document.lines(2) == ["ccc", ""]
+    assert document.lines(5, 7) == []
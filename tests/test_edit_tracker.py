@@ -0,0 +1,136 @@
+"""Тесты пакета правок: заменяемый участок, курсор и выделение после commit"""
+
+import types
+
+import pytest
+
+from edit_tracker import EditTransaction, parse_index
+
+
+class FakeTracker:
+    """
+    Заглушка EditTracker с текстом, курсором и выделением. replace ведёт себя
+    как Tk: курсор и границы выделения внутри заменённого участка уходят к его началу.
+    """
+
+    def __init__(self, text, insert, selection=()):
+        self.value = text
+        self.insert = insert
+        self.selection = list(selection)
+        self.replaced = []
+        self.text = self
+
+    def _offset(self, index):
+        row, column = index.split(".")
+        lines = self.value.split("\n")
+        row = int(row) - 1
+        column = len(lines[row]) if column == "end" else int(column)
+        return sum(len(line) + 1 for line in lines[:row]) + column
+
+    def _index(self, offset):
+        row = self.value.count("\n", 0, offset)
+        return row, offset - (self.value.rfind("\n", 0, offset) + 1)
+
+    def call(self, *args):
+        if args[0] == "index":
+            if args[1] == "end-1c":
+                position = self._index(len(self.value))
+            elif args[1] == "insert":
+                position = self.insert
+            else:
+                position = parse_index(args[1])
+            return f"{position[0] + 1}.{position[1]}"
+        if args[0] == "get":
+            return self.value[self._offset(args[1]):self._offset(args[2])]
+        if args[:3] == ("tag", "ranges", "sel"):
+            return tuple(f"{row + 1}.{column}" for row, column in self.selection)
+        if args[:3] == ("tag", "remove", "sel"):
+            self.selection = []
+        elif args[:3] == ("tag", "add", "sel"):
+            self.selection = [parse_index(index) for index in args[3:]]
+        elif args[:3] == ("mark", "set", "insert"):
+            self.insert = parse_index(args[3])
+        else:
+            raise AssertionError(args)
+
+    def replace(self, start, end, text):
+        low, high = self._offset(start), self._offset(end)
+        self.replaced.append((start, end, text))
+
+        def moved(position):
+            offset = self._offset(f"{position[0] + 1}.{position[1]}")
+            if offset >= high:
+                return offset - (high - low) + len(text)
+            return min(offset, low)
+
+        insert = moved(self.insert)
+        selection = [moved(position) for position in self.selection]
+        self.value = self.value[:low] + text + self.value[high:]
+        self.insert = self._index(insert)
+        self.selection = [self._index(offset) for offset in selection]
+
+
+def test_indent_keeps_cursor_and_selection():
+    tracker = FakeTracker("def f():\n    a = 1\n    b = 2\nc\n", insert=(1, 6), selection=[(1, 2), (2, 3)])
+    transaction = EditTransaction(tracker)
+    for row in range(3):
+        transaction.insert((row, 0), "    ")
+    transaction.commit()
+    assert tracker.value == "    def f():\n        a = 1\n        b = 2\nc\n"
+    assert tracker.insert == (1, 10)
+    assert tracker.selection == [(1, 6), (2, 7)]
+
+
+def test_only_changed_span_is_replaced():
+    tracker = FakeTracker("aaa\nbbb\nccc", insert=(2, 3))
+    transaction = EditTransaction(tracker)
+    transaction.replace((0, 1), (0, 2), "X")
+    transaction.replace((1, 1), (1, 1), "Y")
+    transaction.commit()
+    assert tracker.value == "aXa\nbYbb\nccc"
+    assert tracker.replaced == [("1.1", "2.1", "Xa\nbY")]
+    assert tracker.insert == (2, 3)
+
+
+def test_cursor_inside_deleted_text_moves_to_its_start():
+    tracker = FakeTracker("        x\n        y", insert=(1, 2))
+    transaction = EditTransaction(tracker)
+    transaction.delete((0, 0), (0, 4))
+    transaction.delete((1, 0), (1, 4))
+    transaction.commit()
+    assert tracker.value == "    x\n    y"
+    assert tracker.insert == (1, 0)
+
+
+def test_tab_and_shift_tab_place_cursor():
+    """Tab и Shift+Tab в настоящем виджете (нужны дисплей и customtkinter)"""
+    tk = pytest.importorskip("tkinter")
+    pytest.importorskip("customtkinter")
+    from edit_tracker import EditTracker
+    from main import CodeEditor
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("нет дисплея")
+    try:
+        text = tk.Text(root)
+        text.insert("1.0", "x = 1\n    y = 2\n")
+        editor = types.SimpleNamespace(
+            code_editor=text, edit_tracker=EditTracker(text),
+            settings=types.SimpleNamespace(tab_size=4, use_spaces_for_tab=True),
+            document=types.SimpleNamespace(line=lambda row: text.get(f"{row + 1}.0", f"{row + 1}.end")))
+
+        # Без выделения курсор остаётся у того же символа строки
+        text.mark_set(tk.INSERT, "2.6")
+        CodeEditor.handle_shift_tab(editor, None)
+        assert text.get("2.0", "2.end") == "y = 2"
+        assert text.index(tk.INSERT) == "2.2"
+
+        # Отступ нескольких строк: курсор в конце выделения
+        text.tag_add(tk.SEL, "1.2", "2.3")
+        CodeEditor.handle_tab(editor, None)
+        assert text.get("1.0", "end-1c") == "    x = 1\n    y = 2\n"
+        assert text.index(tk.INSERT) == "2.9"
+        assert str(text.tag_ranges(tk.SEL)[0]) == "1.0"
+    finally:
+        root.destroy()
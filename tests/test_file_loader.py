@@ -0,0 +1,24 @@
+"""Тесты потока чтения загрузчика файлов"""
+
+import queue
+import threading
+
+from file_loader import ChunkedFileLoader
+
+
+def test_reader_exits_after_cancel(tmp_path, monkeypatch):
+    monkeypatch.setattr(ChunkedFileLoader, "CHUNK_CHARS", 16)
+    monkeypatch.setattr(ChunkedFileLoader, "PUT_TIMEOUT", 0.01)
+    path = tmp_path / "big.txt"
+    path.write_text("x" * 16 * 100, encoding="utf-8")
+    loader = ChunkedFileLoader(None)
+    chunks = queue.Queue(maxsize=2)
+    cancelled = threading.Event()
+    thread = threading.Thread(target=loader._read, args=(str(path), chunks, cancelled), daemon=True)
+    thread.start()
+    while not chunks.full():
+        pass
+    # Очередь заполнена и никем не разбирается: поток ждёт места
+    cancelled.set()
+    thread.join(2)
+    assert not thread.is_alive()
@@ -0,0 +1,76 @@
+"""Тесты атомарного сохранения файлов"""
+
+import os
+import stat
+
+import pytest
+
+import file_saver
+from file_saver import FileSaver, write_atomic
+
+
+def mode_of(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+@pytest.mark.skipif(os.name != "posix", reason="права доступа POSIX")
+def test_new_file_gets_umask_permissions(tmp_path):
+    path = tmp_path / "new.py"
+    write_atomic(str(path), "x = 1\n", fsync=False)
+    assert path.read_text(encoding="utf-8") == "x = 1\n"
+    assert mode_of(path) == 0o666 & ~file_saver._UMASK
+
+
+@pytest.mark.skipif(os.name != "posix", reason="права доступа POSIX")
+def test_existing_permissions_are_kept(tmp_path):
+    path = tmp_path / "script.sh"
+    path.write_text("old\n", encoding="utf-8")
+    os.chmod(path, 0o750)
+    write_atomic(str(path), "new\n", fsync=False)
+    assert mode_of(path) == 0o750
+    assert path.read_text(encoding="utf-8") == "new\n"
+
+
+def test_newlines_are_translated(tmp_path):
+    path = tmp_path / "lines.txt"
+    write_atomic(str(path), "a\nb\n", fsync=False)
+    assert path.read_bytes() == f"a{os.linesep}b{os.linesep}".encode("utf-8")
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="нет символических ссылок")
+def test_symlink_target_is_written(tmp_path):
+    target = tmp_path / "real.py"
+    target.write_text("old\n", encoding="utf-8")
+    link = tmp_path / "link.py"
+    try:
+        os.symlink(target, link)
+    except OSError:
+        pytest.skip("создание ссылок запрещено")
+    write_atomic(str(link), "new\n", fsync=False)
+    assert os.path.islink(link)
+    assert target.read_text(encoding="utf-8") == "new\n"
+
+
+def test_no_temp_files_left(tmp_path):
+    write_atomic(str(tmp_path / "a.txt"), "text", fsync=False)
+    assert sorted(os.listdir(tmp_path)) == ["a.txt"]
+
+
+def test_saver_writes_and_reports(tmp_path):
+    saver = FileSaver(fsync=False)
+    path = str(tmp_path / "saved.txt")
+    job = saver.save(path, "first")
+    assert job.wait(5)
+    assert saver.results.get(timeout=5) is job
+    assert not saver.busy(path)
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "first"
+    saver.stop()
+
+
+def test_saver_reports_errors(tmp_path):
+    saver = FileSaver(fsync=False)
+    job = saver.save(str(tmp_path / "missing" / "file.txt"), "text")
+    assert not job.wait(5)
+    assert isinstance(job.error, OSError)
+    saver.stop()
@@ -0,0 +1,72 @@
+"""Тесты дискового кэша подсветки: запись готового разбора и его восстановление"""
+
+import os
+
+import pytest
+
+from highlight_cache import HighlightCache
+from syntax_tokenizer import PythonTokenizer, relex_lines
+
+TEXT = "\n".join(f'def f{n}(x):\n    return "{n}" + x  # {n}' for n in range(150))
+
+
+def parse(tokenizer, lines, stop):
+    """Разбор строк [0, stop) так, как его выполняет подсветчик"""
+    segments, valid_end, _ = relex_lines(tokenizer, lines, [None] * len(lines), 0, stop)
+    _, states, spans = segments[0]
+    return states[:valid_end], spans[:valid_end]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return HighlightCache(str(tmp_path / "cache"))
+
+
+def test_stored_parse_is_restored(cache):
+    tokenizer = PythonTokenizer()
+    lines = TEXT.split("\n")
+    states, spans = parse(tokenizer, lines, len(lines))
+    cache.store(TEXT, tokenizer, states, spans)
+
+    cached_lines, cached_states, cached_spans, valid = cache.load(TEXT, tokenizer)
+    assert cached_lines == lines
+    assert valid == len(lines)
+    assert cached_states == states
+    assert cached_spans == spans
+
+
+def test_parsed_prefix_is_restored_and_extended(cache):
+    tokenizer = PythonTokenizer()
+    lines = TEXT.split("\n")
+    states, spans = parse(tokenizer, lines, 40)
+    cache.store(TEXT, tokenizer, states, spans)
+
+    _, cached_states, cached_spans, valid = cache.load(TEXT, tokenizer)
+    assert valid == len(states)
+    assert cached_states[:valid] == states
+    assert cached_states[valid:] == [None] * (len(lines) - valid)
+    assert cached_spans[valid:] == [None] * (len(lines) - valid)
+
+    # Более полный разбор заменяет запись, более короткий - нет
+    full_states, full_spans = parse(tokenizer, lines, len(lines))
+    cache.store(TEXT, tokenizer, full_states, full_spans)
+    cache.store(TEXT, tokenizer, states, spans)
+    assert cache.load(TEXT, tokenizer)[3] == len(lines)
+
+
+def test_other_text_misses(cache):
+    tokenizer = PythonTokenizer()
+    lines = TEXT.split("\n")
+    cache.store(TEXT, tokenizer, *parse(tokenizer, lines, len(lines)))
+    assert cache.load(TEXT + "\n", tokenizer) is None
+
+
+def test_foreign_file_in_place_of_entry_is_replaced(cache):
+    tokenizer = PythonTokenizer()
+    lines = TEXT.split("\n")
+    path = cache._path(TEXT, tokenizer)
+    os.makedirs(cache.cache_dir)
+    with open(path, "wb") as f:
+        f.write(b"not a cache entry")
+    cache.store(TEXT, tokenizer, *parse(tokenizer, lines, len(lines)))
+    assert cache.load(TEXT, tokenizer)[3] == len(lines)
@@ -0,0 +1,31 @@
+"""Тесты фонового потока разбора"""
+
+from highlight_worker import HighlightJob, HighlightWorker
+from syntax_tokenizer import PythonTokenizer
+
+
+class FailingTokenizer(PythonTokenizer):
+    def tokenize_line(self, line, state):
+        raise ValueError("сбой лексера")
+
+
+def run(tokenizer, lines):
+    worker = HighlightWorker()
+    job = HighlightJob(1, tokenizer, lines, [None] * len(lines), 0, len(lines))
+    worker.submit(job)
+    try:
+        return worker.results.get(timeout=5)
+    finally:
+        worker.stop()
+
+
+def test_result_is_posted():
+    job = run(PythonTokenizer(), ["x = 1", "y = 2"])
+    assert job.error is None
+    assert job.result[1] == 2
+
+
+def test_failed_job_is_posted_with_error():
+    job = run(FailingTokenizer(), ["x = 1"])
+    assert job.result is None
+    assert isinstance(job.error, ValueError)
@@ -0,0 +1,39 @@
+"""Тесты разбора файлов лексерами pygments"""
+
+from lexer_registry import LexerRegistry
+from syntax_tokenizer import relex_lines
+
+
+def lex(file_name, text):
+    """Разбирает текст с нуля и возвращает отрезки каждой строки"""
+    tokenizer = LexerRegistry().tokenizer_for(file_name)
+    lines = text.split("\n")
+    segments, valid_end, broken = relex_lines(tokenizer, lines, [None] * len(lines), 0, len(lines))
+    assert valid_end == len(lines) and not broken
+    result = []
+    for _, _, spans in segments:
+        result.extend(spans)
+    return lines, result
+
+
+def test_ruby_heredoc():
+    lines, spans = lex("script.rb", "text = <<~EOS\n  hello #{name}\n  world\nEOS\nputs text")
+    assert ("string", 0, len(lines[2])) in spans[2]
+    assert spans[4] == []
+
+
+def test_javascript_multiline_comment():
+    lines, spans = lex("app.js", "let a = 1; /* first\nlet b = 2;\n*/ let c = 3;")
+    assert ("comment", 11, len(lines[0])) in spans[0]
+    assert spans[1] == [("comment", 0, len(lines[1]))]
+    assert spans[2][0] == ("comment", 0, 2)
+    assert ("keyword", 3, 6) in spans[2]
+
+
+def test_relex_from_middle_matches_full_lex():
+    text = "let a = `x\n${a} y`;\n/* c\nd */ let e = 1;\n"
+    lines, full = lex("app.js", text)
+    tokenizer = LexerRegistry().tokenizer_for("app.js")
+    segments, _, _ = relex_lines(tokenizer, lines, [None] * len(lines), 2, len(lines))
+    assert segments[0][0] == 2
+    assert segments[0][2] == full[2:]
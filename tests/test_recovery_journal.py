@@ -0,0 +1,111 @@
+"""Тесты журнала восстановления: запись правок и проигрывание после перезапуска"""
+
+import os
+
+import pytest
+
+from document import Document
+from recovery_journal import RecoveryJournal, RecoveryWriter, pending_recoveries
+from undo_history import content_digest
+
+
+@pytest.fixture
+def writer():
+    writer = RecoveryWriter()
+    yield writer
+    writer.close()  # Повторная остановка уже остановленного потока ничего не делает
+
+
+def edit(journal, document, start, end, text):
+    """Правка буфера так, как её записывает редактор"""
+    journal.record(start, end, text, document)
+    document.replace(start, end, text)
+
+
+def test_edits_replay_on_top_of_file(tmp_path, writer):
+    path = tmp_path / "a.py"
+    path.write_text("x = 1\ny = 2\n", encoding="utf-8")
+    document = Document(path.read_text(encoding="utf-8"))
+    journal = RecoveryJournal(writer, str(path), content_digest(document.text()), str(tmp_path / "rec"))
+    edit(journal, document, (0, 4), (0, 5), "10")
+    edit(journal, document, (2, 0), (2, 0), "z = 3\n")
+    journal.flush()
+    writer.close()
+
+    recovered = pending_recoveries(str(tmp_path / "rec"))
+    assert [(item.path, item.text) for item in recovered] == [(str(path), document.text())]
+
+
+def test_file_changed_outside_editor_drops_journal(tmp_path, writer):
+    path = tmp_path / "a.py"
+    path.write_text("a\n", encoding="utf-8")
+    document = Document("a\n")
+    journal = RecoveryJournal(writer, str(path), content_digest("a\n"), str(tmp_path / "rec"))
+    edit(journal, document, (0, 1), (0, 1), "b")
+    journal.flush()
+    writer.close()
+    path.write_text("other\n", encoding="utf-8")
+
+    assert pending_recoveries(str(tmp_path / "rec")) == []
+    assert os.listdir(tmp_path / "rec") == []
+
+
+def test_untitled_buffers_have_separate_journals(tmp_path, writer):
+    recovery_dir = str(tmp_path / "rec")
+    first = RecoveryJournal(writer, recovery_dir=recovery_dir)
+    second = RecoveryJournal(writer, recovery_dir=recovery_dir)
+    assert first.file != second.file
+    edit(first, Document(), (0, 0), (0, 0), "first")
+    edit(second, Document(), (0, 0), (0, 0), "second")
+    first.flush()
+    second.flush()
+    writer.close()
+
+    texts = sorted(item.text for item in pending_recoveries(recovery_dir))
+    assert texts == ["first", "second"]
+
+
+def test_saved_restarts_journal_from_file(tmp_path, writer):
+    path = tmp_path / "a.py"
+    recovery_dir = str(tmp_path / "rec")
+    document = Document()
+    journal = RecoveryJournal(writer, recovery_dir=recovery_dir)
+    edit(journal, document, (0, 0), (0, 0), "saved text")
+    path.write_text(document.text(), encoding="utf-8")
+    journal.saved(str(path), document.text())
+    journal.flush()
+    writer.close()
+    assert os.listdir(recovery_dir) == []
+
+
+def test_saved_keeps_edits_made_during_save(tmp_path, writer):
+    path = tmp_path / "a.py"
+    recovery_dir = str(tmp_path / "rec")
+    document = Document()
+    journal = RecoveryJournal(writer, recovery_dir=recovery_dir)
+    edit(journal, document, (0, 0), (0, 0), "saved")
+    content = document.text()
+    # Правка, сделанная пока файл записывался
+    edit(journal, document, (0, 5), (0, 5), " and edited")
+    path.write_text(content, encoding="utf-8")
+    journal.saved(str(path), content, document.text())
+    edit(journal, document, (0, 0), (0, 0), ">")
+    journal.flush()
+    writer.close()
+
+    recovered = pending_recoveries(recovery_dir)
+    assert [(item.path, item.text) for item in recovered] == [(str(path), ">saved and edited")]
+
+
+def test_checkpoint_replaces_edits(tmp_path, writer):
+    recovery_dir = str(tmp_path / "rec")
+    document = Document("base")
+    journal = RecoveryJournal(writer, recovery_dir=recovery_dir)
+    for _ in range(10):
+        edit(journal, document, (0, 0), (0, 0), "x")
+    journal.checkpoint(document.text())
+    edit(journal, document, (0, 0), (0, 0), "y")
+    journal.flush()
+    writer.close()
+
+    assert [item.text for item in pending_recoveries(recovery_dir)] == ["y" + "x" * 10 + "base"]
@@ -0,0 +1,81 @@
+"""Тесты семантической подсветки: построчные отрезки и теги только в видимой области"""
+
+import types
+
+from semantic_highlighter import SemanticHighlighter, analyze_source
+
+SOURCE = "\n".join(f"def f{n}(x):\n    return len(x)" for n in range(300))
+
+
+class FakeText:
+    """Виджет, показывающий строки [first, first + 20) и запоминающий вызовы тегов"""
+
+    def __init__(self, first=0):
+        self.first = first
+        self.added = []
+        self.removed = []
+        self.marks = {}
+
+    def index(self, index):
+        if index == "@0,0":
+            return f"{self.first + 1}.0"
+        if index.startswith("@"):
+            return f"{self.first + 20}.0"
+        return self.marks[index]
+
+    def winfo_height(self):
+        return 400
+
+    def tag_add(self, tag, *indices):
+        self.added.append((tag, indices))
+
+    def tag_remove(self, tag, start, end):
+        self.removed.append((tag, start, end))
+
+    def mark_set(self, name, index):
+        self.marks[name] = index
+
+    def mark_gravity(self, name, gravity):
+        pass
+
+    def mark_unset(self, *names):
+        for name in names:
+            del self.marks[name]
+
+
+def highlighter_for(text):
+    lines = SOURCE.split("\n")
+    highlighter = types.SimpleNamespace(lines=lines, generation=1, views=[text], folds=None, document=None)
+    semantic = SemanticHighlighter(text, highlighter)
+    semantic._apply(analyze_source(SOURCE), 1)
+    return semantic
+
+
+def tagged_rows(text):
+    return {int(index.split(".")[0]) - 1 for _, indices in text.added for index in indices}
+
+
+def test_multiline_decorator_is_split_by_lines():
+    spans = analyze_source("@decorate(\n    1)\ndef f():\n    pass")
+    assert list(spans["decorator"]) == [0, 0, 10, 1, 0, 6]
+    assert list(spans["semantic_function"]) == [2, 4, 5]
+
+
+def test_only_visible_rows_are_tagged():
+    text = FakeText()
+    highlighter_for(text)
+    rows = tagged_rows(text)
+    assert rows
+    assert max(rows) < 20 + SemanticHighlighter.VIEWPORT_MARGIN
+
+
+def test_scroll_tags_new_rows_and_drops_far_ones():
+    text = FakeText()
+    semantic = highlighter_for(text)
+    text.first = 500
+    text.added = []
+    semantic.update_viewport()
+    rows = tagged_rows(text)
+    assert min(rows) >= 500 - SemanticHighlighter.VIEWPORT_MARGIN
+    # Теги у начала файла ушли дальше KEEP_DISTANCE и сняты
+    assert ("builtin", "semantic_first", "semantic_last") in text.removed
@@ -0,0 +1,64 @@
+"""Тесты инкрементального разбора: повторный разбор после правок совпадает с разбором с нуля"""
+
+import random
+
+from syntax_tokenizer import PythonTokenizer, relex_lines
+
+
+def fresh(tokenizer, lines):
+    """Разбор всего текста с пустым кэшем"""
+    segments, valid_end, _ = relex_lines(tokenizer, lines, [None] * len(lines), 0, len(lines))
+    assert valid_end == len(lines)
+    _, states, spans = segments[0]
+    return states, spans
+
+
+class Cache:
+    """Кэш строк так, как его ведёт подсветчик (IncrementalHighlighter._mark_changed и _store)"""
+
+    def __init__(self, tokenizer, lines):
+        self.tokenizer = tokenizer
+        self.lines = lines
+        self.states, self.spans = fresh(tokenizer, lines)
+        self.valid_upto = len(lines)
+
+    def replace(self, first, old_end, new_lines):
+        count = len(new_lines)
+        self.lines[first:old_end] = new_lines
+        self.states[first:old_end] = [None] * count
+        self.spans[first:old_end] = [None] * count
+        self.valid_upto = min(self.valid_upto, first)
+
+    def relex(self, stop):
+        while self.valid_upto < stop:
+            segments, valid_end, broken = relex_lines(self.tokenizer, self.lines, self.states,
+                                                      self.valid_upto, stop)
+            for first, states, spans in segments:
+                self.states[first:first + len(states)] = states
+                self.spans[first:first + len(spans)] = spans
+            if broken:
+                self.states[valid_end] = None
+            self.valid_upto = valid_end
+
+
+def random_line(rng):
+    pieces = ['"""', "'''", '"', "'", "(", ")", "x", "def", "1", "#", " ", "\\"]
+    return "".join(rng.choice(pieces) for _ in range(rng.randint(0, 8)))
+
+
+def test_incremental_relex_matches_fresh_parse():
+    rng = random.Random(7)
+    tokenizer = PythonTokenizer()
+    cache = Cache(tokenizer, [random_line(rng) for _ in range(120)])
+    for step in range(400):
+        total = len(cache.lines)
+        first = rng.randrange(total)
+        old_end = rng.randint(first + 1, min(first + 3, total))
+        new_lines = [random_line(rng) for _ in range(rng.randint(1, 3))]
+        cache.replace(first, old_end, new_lines)
+        # Как при прокрутке: разбирается только начало текста, остальное - позже
+        cache.relex(rng.randint(0, len(cache.lines)) if step % 3 else len(cache.lines))
+    cache.relex(len(cache.lines))
+    states, spans = fresh(tokenizer, cache.lines)
+    assert cache.states == states
+    assert cache.spans == spans
@@ -0,0 +1,41 @@
+"""Тесты перевода дельты правки в параметры Tree.edit (tree-sitter для них не нужен)"""
+
+import random
+
+from document import Document, LineIndex
+from tree_sitter_backend import _line_bytes, input_edit
+
+
+def byte_point(text, offset):
+    """Смещение в байтах и точка (строка, колонка в байтах) символа offset"""
+    prefix = text[:offset]
+    row = prefix.count("\n")
+    column = prefix[prefix.rfind("\n") + 1:]
+    return len(prefix.encode("utf-8")), (row, len(column.encode("utf-8")))
+
+
+def test_input_edit_matches_byte_offsets():
+    rng = random.Random(5)
+    document = Document("привет = 1\nx = 'ё'\n\ny\n")
+    lines = document.lines()
+    line_bytes = LineIndex(_line_bytes(lines, 0, len(lines), len(lines)))
+    for _ in range(300):
+        old_text = document.text()
+        lines = document.lines()
+        row = rng.randrange(len(lines))
+        start = (row, rng.randint(0, len(lines[row])))
+        last = rng.randrange(row, min(row + 2, len(lines)))
+        end = (last, rng.randint(0, len(lines[last])))
+        if end < start:
+            end = start
+        text = "".join(rng.choice("aё\n") for _ in range(rng.randint(0, 4)))
+        low = document.offset(*start)
+        high = document.offset(*end)
+        document.replace(start, end, text)
+
+        edit = input_edit(line_bytes, document.lines(), start, end, text)
+        start_byte, start_point = byte_point(old_text, low)
+        old_end_byte, old_end_point = byte_point(old_text, high)
+        new_end_byte, new_end_point = byte_point(document.text(), low + len(text))
+        assert edit == (start_byte, old_end_byte, new_end_byte, start_point, old_end_point, new_end_point)
+        assert line_bytes.start(len(line_bytes)) == len(document.text().encode("utf-8"))
@@ -0,0 +1,120 @@
+"""Тесты истории отмены: объединение правок в шаги"""
+
+import pytest
+
+import undo_history
+from undo_history import UndoHistory
+
+
+class Buffer:
+    """Текст буфера, который правят история и набор"""
+
+    def __init__(self, history, text=""):
+        self.history = history
+        self.text = text
+
+    def replace(self, start, end, text):
+        self.text = self.text[:start] + text + self.text[end:]
+
+    def type(self, offset, text):
+        self.history.record(offset, "", text)
+        self.replace(offset, offset, text)
+
+    def undo(self):
+        return self.history.undo(self.replace)
+
+
+@pytest.fixture(params=["memory", "journal"])
+def history(request, tmp_path):
+    if request.param == "memory":
+        return UndoHistory()
+    path = tmp_path / "a.py"
+    path.write_text("", encoding="utf-8")
+    return UndoHistory(str(path), "", str(tmp_path / "undo"))
+
+
+def test_typing_merges_into_one_step(history):
+    buffer = Buffer(history)
+    buffer.type(0, "a")
+    buffer.type(1, "b")
+    buffer.undo()
+    assert buffer.text == ""
+
+
+def test_paste_is_a_separate_step(history):
+    buffer = Buffer(history)
+    buffer.type(0, "ab")
+
+    # Вставка порциями так, как её выполняет редактор
+    history.seal()
+    history.joining = True
+    buffer.type(2, "PA")
+    buffer.type(4, "STE\n")
+    history.joining = False
+    history.seal()
+
+    buffer.type(8, "cd")
+    buffer.undo()
+    assert buffer.text == "abPASTE\n"
+    buffer.undo()
+    assert buffer.text == "ab"
+    buffer.undo()
+    assert buffer.text == ""
+
+
+def test_journal_replays_after_reopen(tmp_path):
+    path = tmp_path / "a.py"
+    undo_dir = str(tmp_path / "undo")
+    path.write_text("", encoding="utf-8")
+    history = UndoHistory(str(path), "", undo_dir)
+    buffer = Buffer(history)
+    buffer.type(0, "one\n")
+    buffer.type(4, "two\n")
+    buffer.undo()
+    buffer.type(4, "three\n")
+    history.saved(str(path), buffer.text)
+    path.write_text(buffer.text, encoding="utf-8")
+    # Правка после сохранения в файл не попала и при открытии отбрасывается
+    buffer.type(10, "lost\n")
+
+    reopened = Buffer(UndoHistory(str(path), path.read_text(encoding="utf-8"), undo_dir), "one\nthree\n")
+    assert reopened.undo() is not None
+    assert reopened.text == "one\n"
+    assert reopened.undo() is not None
+    assert reopened.text == ""
+    assert reopened.undo() is None
+
+
+def test_journal_ignored_when_file_changed_outside(tmp_path):
+    path = tmp_path / "a.py"
+    undo_dir = str(tmp_path / "undo")
+    path.write_text("", encoding="utf-8")
+    history = UndoHistory(str(path), "", undo_dir)
+    Buffer(history).type(0, "x\n")
+    history.saved(str(path), "x\n")
+
+    reopened = UndoHistory(str(path), "changed\n", undo_dir)
+    assert not reopened.can_undo()
+
+
+def test_spilled_steps_survive_journal_failure(tmp_path, monkeypatch):
+    path = tmp_path / "a.py"
+    path.write_text("", encoding="utf-8")
+    history = UndoHistory(str(path), "", str(tmp_path / "undo"))
+    buffer = Buffer(history)
+    buffer.type(0, "one\n")
+    buffer.type(4, "two\n")
+    history.spill()
+
+    def failing_open(file, mode="r", *args, **kwargs):
+        if "a" in mode:
+            raise OSError("диск заполнен")
+        return open(file, mode, *args, **kwargs)
+
+    # Журнал перестаёт записываться: вытесненные шаги читаются обратно в память
+    monkeypatch.setattr(undo_history, "open", failing_open, raising=False)
+    buffer.undo()
+    assert history.journal is None
+    assert buffer.text == "one\n"
+    buffer.undo()
+    assert buffer.text == ""
@@ -20,6 +20,9 @@ class KanagawaTheme:
     NUMBER = "#FF9E64"      # Orange for numbers
     CLASS = "#7FB4CA"       # Cyan for classes
     OPERATOR = "#FF5D62"    # Red for operators
+    PARAMETER = "#B8B4D0"   # Light violet for parameters
+    DECORATOR = "#E6C384"   # Yellow for decorators
+    BUILTIN = "#7AA89F"     # Aqua for builtins
     
     # UI colors
     SELECTION = "#2D4F67"
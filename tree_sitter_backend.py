@@ -0,0 +1,278 @@
+"""
+Модуль инкрементального разбора на основе tree-sitter.
+
+Если установлены пакеты tree_sitter и tree_sitter_python, Python-код
+разбирается в синтаксическое дерево, которое обновляется на месте по
+изменённому участку текста: стоимость повторного разбора зависит от
+размера правки, а не от размера файла. Дерево используется для подсветки,
+отступов и структурных запросов. Без этих пакетов редактор работает
+на собственном токенизаторе.
+"""
+
+from document import LineIndex
+from edit_tracker import changed_rows
+from syntax_tokenizer import HIGHLIGHT_TAGS, PYTHON_KEYWORDS
+
+try:
+    import tree_sitter
+    import tree_sitter_python
+    TREE_SITTER_AVAILABLE = True
+except ImportError:
+    TREE_SITTER_AVAILABLE = False
+
+# Запрос подсветки: имена захватов совпадают с тегами подсветки
+_PYTHON_OPERATORS = ["-", "+", "*", "/", "=", "<", ">", "!=", "==", "<=", ">=",
+                     "+=", "-=", "*=", "/="]
+PYTHON_HIGHLIGHT_QUERY = f"""
+(comment) @comment
+(string) @string
+[(integer) (float)] @number
+[(true) (false) (none)] @keyword
+[{" ".join(f'"{word}"' for word in PYTHON_KEYWORDS if word not in ("True", "False", "None"))}] @keyword
+(function_definition name: (identifier) @function)
+(class_definition name: (identifier) @class)
+[{" ".join(f'"{op}"' for op in _PYTHON_OPERATORS)}] @operator
+"""
+
+# Конструкции, двоеточие которых не открывает блок
+_INLINE_COLON_PARENTS = frozenset(("lambda", "pair", "slice", "subscript", "typed_parameter",
+                                   "typed_default_parameter", "format_specifier", "interpolation"))
+
+# Узлы определений для структурных запросов
+_DEFINITION_TYPES = frozenset(("function_definition", "class_definition"))
+
+
+def _byte_col(line, col):
+    """Переводит колонку в символах в колонку в байтах UTF-8"""
+    if line.isascii():
+        return min(col, len(line))
+    return len(line[:col].encode("utf-8"))
+
+
+def _line_bytes(lines, first, stop, total):
+    """Длины строк [first, stop) в байтах UTF-8 с переводом строки (total - число строк текста)"""
+    lengths = [len(line.encode("utf-8")) + 1 for line in lines[first:stop]]
+    if stop == total and lengths:
+        lengths[-1] -= 1
+    return lengths
+
+
+def input_edit(line_bytes, lines, start, end, text):
+    """
+    Вычисляет параметры правки для Tree.edit и переносит её в индекс длин строк.
+
+    Args:
+        line_bytes: LineIndex длин строк в байтах до правки (обновляется)
+        lines: строки текста после правки
+        start: начало заменённого текста (строка, колонка в символах; до правки)
+        end: конец заменённого текста
+        text: вставленный текст
+
+    Returns:
+        Кортеж (start_byte, old_end_byte, new_end_byte, start_point, old_end_point, new_end_point)
+    """
+    first, old_end, new_end = changed_rows(start, end, text)
+    start_col = _byte_col(lines[first], start[1])
+    start_byte = line_bytes.start(first) + start_col
+
+    # Хвост последней затронутой строки после конца правки не изменился
+    last_line = lines[new_end - 1]
+    end_chars = len(text) - text.rfind("\n") - 1
+    if new_end - 1 == first:
+        end_chars += start[1]
+    new_end_col = _byte_col(last_line, end_chars)
+    tail = len(last_line.encode("utf-8")) - new_end_col
+    old_last = old_end - 1
+    old_last_bytes = line_bytes.length(old_last) - (old_end < len(line_bytes))
+    old_end_col = old_last_bytes - tail
+    old_end_byte = line_bytes.start(old_last) + old_end_col
+
+    line_bytes.splice(first, old_end - first, _line_bytes(lines, first, new_end, len(lines)))
+    new_end_byte = line_bytes.start(new_end - 1) + new_end_col
+    return (start_byte, old_end_byte, new_end_byte,
+            (first, start_col), (old_last, old_end_col), (new_end - 1, new_end_col))
+
+
+def _char_col(line, byte_col):
+    """Переводит колонку в байтах UTF-8 в колонку в символах"""
+    if line.isascii():
+        return byte_col
+    return len(line.encode("utf-8")[:byte_col].decode("utf-8", errors="ignore"))
+
+
+class TreeSitterTokenizer:
+    """
+    Токенизатор на основе tree-sitter.
+
+    В отличие от построчных токенизаторов хранит не состояние строк,
+    а синтаксическое дерево буфера (см. SyntaxTree), поэтому подсветчик
+    работает с ним отдельно.
+    """
+
+    tags = HIGHLIGHT_TAGS
+    tree_based = True
+    initial_state = None
+
+    def __init__(self, language, query_source):
+        """
+        Args:
+            language: язык tree_sitter.Language
+            query_source: текст запроса подсветки с захватами по именам тегов
+        """
+        self.language = language
+        self.query = tree_sitter.Query(language, query_source)
+        self.version = f"tree-sitter-{tree_sitter.__version__}"
+
+    def create_tree(self, lines):
+        """Разбирает текст целиком и возвращает дерево буфера"""
+        return SyntaxTree(self, lines)
+
+
+class SyntaxTree:
+    """Синтаксическое дерево одного буфера, обновляемое по правкам"""
+
+    def __init__(self, tokenizer, lines):
+        """
+        Args:
+            tokenizer: TreeSitterTokenizer
+            lines: строки текста
+        """
+        self.tokenizer = tokenizer
+        self.parser = tree_sitter.Parser(tokenizer.language)
+        self.lines = lines
+        # Длины строк в байтах: смещение правки находится за O(log n)
+        self.line_bytes = LineIndex(_line_bytes(lines, 0, len(lines), len(lines)))
+        self.tree = self.parser.parse(self._reader(lines))
+
+    # Количество строк, отдаваемых парсеру за одно чтение
+    READ_LINES = 64
+
+    @classmethod
+    def _reader(cls, lines):
+        """Функция чтения текста для парсера: отдаёт текст от позиции порциями строк"""
+        count = len(lines)
+        step = cls.READ_LINES
+
+        def read(byte_offset, point):
+            row, column = point
+            if row >= count:
+                return b""
+            chunk = "\n".join(lines[row:row + step])
+            if row + step < count:
+                chunk += "\n"
+            return chunk.encode("utf-8")[column:]
+        return read
+
+    def edit(self, lines, start, end, text):
+        """
+        Переносит правку в дерево и разбирает только затронутый участок.
+
+        Args:
+            lines: новые строки текста
+            start: начало заменённого текста (строка, колонка с нуля; позиция до правки)
+            end: конец заменённого текста
+            text: вставленный текст
+
+        Returns:
+            Список диапазонов строк [low, high), подсветка которых могла измениться
+        """
+        old_tree = self.tree
+        old_tree.edit(*input_edit(self.line_bytes, lines, start, end, text))
+        self.lines = lines
+        self.tree = self.parser.parse(self._reader(lines), old_tree)
+
+        first, _, new_end = changed_rows(start, end, text)
+        changed = [(first, new_end)]
+        for changed_range in old_tree.changed_ranges(self.tree):
+            changed.append((changed_range.start_point[0], changed_range.end_point[0] + 1))
+        return changed
+
+    def line_spans(self, low, high):
+        """
+        Собирает отрезки подсветки строк [low, high).
+
+        Returns:
+            Список списков (тег, начальная колонка, конечная колонка) для каждой строки
+        """
+        lines = self.lines
+        result = [[] for _ in range(high - low)]
+        cursor = tree_sitter.QueryCursor(self.tokenizer.query)
+        cursor.set_point_range((low, 0), (high, 0))
+        for tag, nodes in cursor.captures(self.tree.root_node).items():
+            for node in nodes:
+                start_row, start_col = node.start_point
+                end_row, end_col = node.end_point
+                # Многострочные узлы разбиваем по строкам окна
+                for row in range(max(start_row, low), min(end_row + 1, high)):
+                    line = lines[row]
+                    start = _char_col(line, start_col) if row == start_row else 0
+                    end = _char_col(line, end_col) if row == end_row else len(line)
+                    if end > start:
+                        result[row - low].append((tag, start, end))
+        for spans in result:
+            spans.sort(key=lambda span: span[1])
+        return result
+
+    def _last_leaf(self, row):
+        """Последний узел строки row без учёта комментариев и пробелов или None"""
+        line = self.lines[row].encode("utf-8")
+        end = len(line.rstrip())
+        root = self.tree.root_node
+        while end > 0:
+            node = root.descendant_for_point_range((row, end - 1), (row, end - 1))
+            if node.type != "comment":
+                return node
+            end = len(line[:node.start_point[1]].rstrip()) if node.start_point[0] == row else 0
+        return None
+
+    def opens_block(self, row):
+        """
+        Проверяет, открывает ли строка row блок кода (двоеточие в конце оператора).
+
+        Returns:
+            True или False, либо None, если дерево в этом месте не позволяет судить
+        """
+        node = self._last_leaf(row)
+        if node is None:
+            return None
+        if node.type != ":":
+            # Двоеточие в комментарии или строке блок не открывает
+            return False
+        parent = node.parent
+        if parent is None or parent.type == "ERROR":
+            return None
+        return parent.type not in _INLINE_COLON_PARENTS
+
+    def enclosing_definitions(self, row):
+        """
+        Возвращает определения функций и классов, содержащие строку row.
+
+        Returns:
+            Список (тип, имя, первая строка, последняя строка) от внешнего к внутреннему
+        """
+        node = self.tree.root_node.descendant_for_point_range((row, 0), (row, 0))
+        result = []
+        while node is not None:
+            if node.type in _DEFINITION_TYPES:
+                name = node.child_by_field_name("name")
+                name_text = ""
+                if name is not None:
+                    name_row, name_col = name.start_point
+                    line = self.lines[name_row].encode("utf-8")
+                    name_text = line[name_col:name.end_point[1]].decode("utf-8", errors="ignore")
+                result.append((node.type, name_text, node.start_point[0], node.end_point[0]))
+            node = node.parent
+        result.reverse()
+        return result
+
+
+def create_python_tokenizer():
+    """Создаёт токенизатор Python на tree-sitter или возвращает None, если он недоступен"""
+    if not TREE_SITTER_AVAILABLE:
+        return None
+    try:
+        language = tree_sitter.Language(tree_sitter_python.language())
+        return TreeSitterTokenizer(language, PYTHON_HIGHLIGHT_QUERY)
+    except Exception as e:
+        print(f"[ERROR] Не удалось инициализировать tree-sitter: {e}")
+        return None
@@ -0,0 +1,397 @@
+"""
+Модуль истории отмены правок.
+
+История хранит правки как дельты (смещение, удалённый текст, вставленный
+текст), поэтому отмена и повтор стоят столько, сколько сама правка.
+Для файла на диске история пишется в журнал ~/.vpycode/undo/<хэш пути>.undo
+только дописыванием: записи правок сжимаются zlib, отмена, повтор и
+сохранение отмечаются короткими записями. При следующем открытии файла
+журнал проигрывается до последнего сохранения, содержимое которого
+совпадает с файлом, и отмена работает и после перезапуска редактора.
+Старые правки вытесняются из памяти: в стеке остаётся только их позиция
+в журнале, а текст правки читается с диска, когда до неё дойдёт отмена.
+"""
+
+import hashlib
+import os
+import struct
+import time
+import zlib
+
+# Каталог журналов по умолчанию
+DEFAULT_UNDO_DIR = os.path.join(os.path.expanduser("~"), ".vpycode", "undo")
+
+_MAGIC = b"VPUH1"
+_RECORD = struct.Struct("<cI")
+_EDIT = struct.Struct("<qI")
+_SUFFIX = ".undo"
+
+# Типы записей журнала
+_DO = b"D"
+_UNDO = b"U"
+_REDO = b"R"
+_SAVE = b"S"
+
+
+def content_digest(content):
+    """Хэш содержимого файла для сверки журнала с файлом"""
+    return hashlib.sha1(content.encode("utf-8", "surrogatepass")).digest()
+
+
+class UndoEntry:
+    """Правка: текст removed по смещению offset заменён на inserted"""
+
+    __slots__ = ("offset", "removed", "inserted", "position", "time", "sealed")
+
+    def __init__(self, offset, removed, inserted, position=None):
+        self.offset = offset
+        self.removed = removed
+        self.inserted = inserted
+        self.position = position  # Позиция записи в журнале (None - ещё не записана)
+        self.time = time.monotonic()
+        self.sealed = position is not None  # Шаг закрыт: следующие правки к нему не присоединяются
+
+    @property
+    def size(self):
+        return len(self.removed) + len(self.inserted)
+
+
+class UndoHistory:
+    """
+    История отмены одного буфера.
+
+    Элемент стеков done и undone - UndoEntry или позиция записи в журнале,
+    если правка вытеснена из памяти.
+    """
+
+    # Сколько символов правок хранится в памяти, остальные читаются из журнала
+    MEMORY_CAP = 4 * 1024 * 1024
+    # Максимальное количество шагов отмены
+    MAX_STEPS = 10000
+    # Журнал больше этого размера (байт) при открытии переписывается заново
+    COMPACT_BYTES = 16 * 1024 * 1024
+    # Набор символов подряд объединяется в один шаг, если паузы короче (секунды)
+    MERGE_INTERVAL = 1.0
+
+    def __init__(self, path=None, content="", undo_dir=DEFAULT_UNDO_DIR):
+        """
+        Args:
+            path: путь к файлу буфера (None - история только в памяти)
+            content: текст файла на диске
+            undo_dir: каталог журналов
+        """
+        self.undo_dir = undo_dir
+        self.path = None
+        self.journal = None
+        self.done = []
+        self.undone = []
+        self.applying = False  # Правки выполняет сама история (отмена, повтор)
+        self.joining = False   # Вставки подряд объединяются в один шаг (вставка порциями)
+        self._resident = 0
+        if path:
+            self._open(path, content)
+
+    def _journal_path(self, path):
+        digest = hashlib.sha1(os.path.abspath(path).encode("utf-8", "surrogatepass")).hexdigest()
+        return os.path.join(self.undo_dir, digest + _SUFFIX)
+
+    # --- Журнал ---
+
+    def _open(self, path, content):
+        """Проигрывает журнал файла до последнего сохранения, совпадающего с содержимым"""
+        self.path = path
+        self.journal = self._journal_path(path)
+        try:
+            with open(self.journal, "rb") as f:
+                data = f.read()
+        except OSError:
+            self._start_journal(content)
+            return
+
+        try:
+            done, undone, end = self._replay(data, content_digest(content))
+        except Exception as e:
+            print(f"[ERROR] Повреждённый журнал отмены {self.journal}: {e}")
+            done = None
+        if done is None:
+            # Файл изменён вне редактора: старая история к нему не подходит
+            self._start_journal(content)
+            return
+
+        self.done, self.undone = done[-self.MAX_STEPS:], undone
+        if end < len(data):
+            # Правки после последнего сохранения не попали в файл - отбрасываем их
+            with open(self.journal, "r+b") as f:
+                f.truncate(end)
+        if end > self.COMPACT_BYTES:
+            self._compact(content)
+        print(f"[DEBUG] История отмены восстановлена: {len(self.done)} шагов")
+
+    @staticmethod
+    def _replay(data, digest):
+        """
+        Восстанавливает стеки по заголовкам записей, не распаковывая правки.
+
+        Returns:
+            (done, undone, конец последней записи сохранения) или (None, None, 0),
+            если ни одно сохранение не совпадает с содержимым файла
+        """
+        if not data.startswith(_MAGIC):
+            raise ValueError("неверная сигнатура")
+        done, undone = [], []
+        result = (None, None, 0)
+        position = len(_MAGIC)
+        while position + _RECORD.size <= len(data):
+            kind, length = _RECORD.unpack_from(data, position)
+            payload = position + _RECORD.size
+            if payload + length > len(data):
+                break  # Запись оборвана при аварийном завершении
+            if kind == _DO:
+                done.append(position)
+                undone.clear()
+            elif kind == _UNDO and done:
+                undone.append(done.pop())
+            elif kind == _REDO and undone:
+                done.append(undone.pop())
+            elif kind == _SAVE:
+                if data[payload:payload + length] == digest:
+                    result = (list(done), list(undone), payload + length)
+                else:
+                    result = (None, None, 0)
+            position = payload + length
+        return result
+
+    def _start_journal(self, content):
+        """Начинает пустой журнал, первая запись - сохранение текущего содержимого"""
+        self._write(_MAGIC + self._record(_SAVE, content_digest(content)), "wb")
+
+    def _compact(self, content):
+        """Переписывает журнал, оставляя только доступные шаги отмены"""
+        entries = [self._load(item) for item in self.done]
+        self._resident = 0
+        chunks = [_MAGIC]
+        position = len(_MAGIC)
+        for entry in entries:
+            entry.position = position
+            record = self._record(_DO, self._encode(entry))
+            chunks.append(record)
+            position += len(record)
+        chunks.append(self._record(_SAVE, content_digest(content)))
+        temp_path = self.journal + ".tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(b"".join(chunks))
+            os.replace(temp_path, self.journal)
+        except OSError as e:
+            print(f"[ERROR] Не удалось переписать журнал отмены: {e}")
+            return
+        self.done = [entry.position for entry in entries]
+        self.undone = []
+
+    @staticmethod
+    def _record(kind, payload=b""):
+        return _RECORD.pack(kind, len(payload)) + payload
+
+    @staticmethod
+    def _encode(entry):
+        removed = entry.removed.encode("utf-8", "surrogatepass")
+        inserted = entry.inserted.encode("utf-8", "surrogatepass")
+        return zlib.compress(_EDIT.pack(entry.offset, len(removed)) + removed + inserted, 1)
+
+    def _write(self, data, mode="ab"):
+        """Дописывает данные в журнал; возвращает позицию начала записи или None"""
+        if self.journal is None:
+            return None
+        try:
+            os.makedirs(self.undo_dir, exist_ok=True)
+            with open(self.journal, mode) as f:
+                position = f.tell()
+                f.write(data)
+            return position
+        except OSError as e:
+            print(f"[ERROR] Не удалось записать журнал отмены: {e}")
+            self._drop_journal()
+            return None
+
+    def _drop_journal(self):
+        """
+        Отключает журнал: вытесненные правки возвращаются в память.
+
+        Правку, которую уже не прочитать, отменить нельзя, как и всё, что
+        было до неё, поэтому такие шаги отбрасываются с сообщением.
+        """
+        for stack in (self.done, self.undone):
+            # Вытесненные правки лежат в начале стеков, начиная со старых
+            lost = 0
+            for index, item in enumerate(stack):
+                if isinstance(item, UndoEntry):
+                    continue
+                try:
+                    entry = self._load(item)
+                except (OSError, zlib.error, struct.error, UnicodeDecodeError) as e:
+                    print(f"[ERROR] Шаг отмены не прочитать из журнала {self.journal}: {e}")
+                    lost = index + 1
+                    continue
+                stack[index] = entry
+                self._resident += entry.size
+            self._forget(stack[:lost])
+            del stack[:lost]
+        self.journal = None
+
+    def _load(self, item):
+        """Правка из стека; вытесненная правка читается из журнала"""
+        if isinstance(item, UndoEntry):
+            return item
+        with open(self.journal, "rb") as f:
+            f.seek(item)
+            kind, length = _RECORD.unpack(f.read(_RECORD.size))
+            raw = zlib.decompress(f.read(length))
+        offset, removed_length = _EDIT.unpack_from(raw)
+        body = raw[_EDIT.size:]
+        entry = UndoEntry(offset, body[:removed_length].decode("utf-8", "surrogatepass"),
+                          body[removed_length:].decode("utf-8", "surrogatepass"), position=item)
+        entry.time = 0.0
+        return entry
+
+    def _seal(self):
+        """Закрывает последнюю правку, которая ещё могла расти при наборе, и записывает её в журнал"""
+        if self.done and isinstance(self.done[-1], UndoEntry) and not self.done[-1].sealed:
+            entry = self.done[-1]
+            entry.sealed = True
+            entry.position = self._write(self._record(_DO, self._encode(entry)))
+
+    def seal(self):
+        """Завершает текущий шаг: следующая правка начнёт новый шаг отмены"""
+        self._seal()
+
+    def _spill(self, cap=None):
+        """Вытесняет старые записанные в журнал правки из памяти"""
+        cap = self.MEMORY_CAP if cap is None else cap
+        if self._resident <= cap or self.journal is None:
+            return
+        self._seal()
+        if self.journal is None:
+            return  # Журнал отключился при записи: правки остаются в памяти
+        for stack in (self.done, self.undone):
+            for index, item in enumerate(stack):
+                if self._resident <= cap:
+                    return
+                if isinstance(item, UndoEntry) and item.position is not None:
+                    stack[index] = item.position
+                    self._resident -= item.size
+
+    def spill(self):
+        """Вытесняет из памяти все правки, уже записанные в журнал"""
+        self._spill(0)
+
+    # --- Запись и отмена правок ---
+
+    def record(self, offset, removed, inserted):
+        """Добавляет правку: текст removed по смещению offset заменён на inserted"""
+        if self.applying:
+            return
+        now = time.monotonic()
+        last = self.done[-1] if self.done and isinstance(self.done[-1], UndoEntry) else None
+        self._forget(self.undone)
+        self.undone = []
+        if last is not None and not last.sealed and (self.joining or (
+                now - last.time < self.MERGE_INTERVAL and "\n" not in inserted)):
+            if not removed and not last.removed and offset == last.offset + len(last.inserted):
+                # Набор символов подряд
+                last.inserted += inserted
+                last.time = now
+                self._resident += len(inserted)
+                return
+            if not inserted and not last.inserted and offset + len(removed) == last.offset:
+                # Удаление символов подряд клавишей Backspace
+                last.removed = removed + last.removed
+                last.offset = offset
+                last.time = now
+                self._resident += len(removed)
+                return
+        self._seal()
+        entry = UndoEntry(offset, removed, inserted)
+        self.done.append(entry)
+        self._resident += entry.size
+        if len(self.done) > self.MAX_STEPS:
+            self._forget(self.done[:1])
+            del self.done[0]
+        self._spill()
+
+    def _forget(self, items):
+        """Учитывает удаление элементов стека из памяти"""
+        self._resident -= sum(item.size for item in items if isinstance(item, UndoEntry))
+
+    def _pop(self, stack):
+        """Снимает правку со стека, при необходимости читая её из журнала"""
+        item = stack.pop()
+        entry = self._load(item)
+        if entry is not item:
+            self._resident += entry.size
+        return entry
+
+    def can_undo(self):
+        return bool(self.done)
+
+    def can_redo(self):
+        return bool(self.undone)
+
+    def undo(self, replace):
+        """
+        Отменяет последний шаг.
+
+        Args:
+            replace: функция (начальное смещение, конечное смещение, текст), выполняющая правку
+
+        Returns:
+            Отменённая правка или None, если отменять нечего
+        """
+        if not self.done:
+            return None
+        self._seal()
+        entry = self._pop(self.done)
+        self._apply(replace, entry.offset, entry.offset + len(entry.inserted), entry.removed)
+        self.undone.append(entry)
+        self._write(self._record(_UNDO))
+        return entry
+
+    def redo(self, replace):
+        """Повторяет отменённый шаг (аргументы как у undo)"""
+        if not self.undone:
+            return None
+        entry = self._pop(self.undone)
+        self._apply(replace, entry.offset, entry.offset + len(entry.removed), entry.inserted)
+        self.done.append(entry)
+        self._write(self._record(_REDO))
+        return entry
+
+    def _apply(self, replace, start, end, text):
+        self.applying = True
+        try:
+            replace(start, end, text)
+        finally:
+            self.applying = False
+
+    def saved(self, path, content):
+        """
+        Отмечает сохранение файла.
+
+        Args:
+            path: путь, под которым сохранён буфер
+            content: сохранённый текст
+        """
+        if path != self.path:
+            # Новый файл или сохранение под другим именем: журнал начинается заново
+            entries = [self._load(item) for item in self.done]
+            self._resident = sum(entry.size for entry in entries)
+            self.path = path
+            self.journal = self._journal_path(path)
+            self._write(_MAGIC, "wb")
+            for entry in entries:
+                entry.sealed = True
+                entry.position = self._write(self._record(_DO, self._encode(entry)))
+            self.done = entries
+            self.undone = []
+        else:
+            self._seal()
+        self._write(self._record(_SAVE, content_digest(content)))
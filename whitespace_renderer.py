@@ -0,0 +1,104 @@
+"""
+Модуль отображения пробельных символов.
+
+Пробелы, табуляции и пробелы в конце строк размечаются только в видимой
+области редактора. Каждая строка разбирается одним регулярным выражением
+на отрезки, результат кэшируется по тексту строки, а теги ставятся
+диапазонами - одним вызовом tag_add на каждый тег.
+"""
+
+import re
+import tkinter as tk
+from functools import lru_cache
+
+from editor_views import visible_windows, window_segments
+from syntax_tokenizer import group_spans, apply_ranges
+
+WHITESPACE_TAGS = ("whitespace", "whitespace_tab", "whitespace_trailing")
+
+_whitespace_re = re.compile(r"(?P<whitespace> +)|(?P<whitespace_tab>\t+)")
+
+
+@lru_cache(maxsize=8192)
+def whitespace_runs(line):
+    """
+    Находит отрезки пробельных символов строки.
+
+    Returns:
+        Кортеж (тег, начальная колонка, конечная колонка); пробелы и табуляции
+        в конце строки получают тег whitespace_trailing
+    """
+    runs = []
+    length = len(line)
+    trailing = len(line.rstrip(" \t"))
+    for match in _whitespace_re.finditer(line, 0, trailing):
+        runs.append((match.lastgroup, match.start(), match.end()))
+    if trailing < length:
+        runs.append(("whitespace_trailing", trailing, length))
+    return tuple(runs)
+
+
+class WhitespaceRenderer:
+    """Разметка пробельных символов видимой области виджета tk.Text"""
+
+    # Количество строк, размечаемых сверх видимой области
+    VIEWPORT_MARGIN = 20
+
+    def __init__(self, text_widget):
+        """
+        Args:
+            text_widget: виджет tk.Text
+        """
+        self.text = text_widget
+        self.enabled = False
+        self.column_limit = None  # Строки размечаются только до этой колонки
+        self.document = None      # Модель документа, из которой берутся строки (None - из виджета)
+        self.folds = None         # FoldManager: свёрнутые строки не размечаются
+        self.views = [text_widget] # Окна, показывающие буфер (виджет и его двойники)
+        self._render_job = None
+
+    def set_enabled(self, enabled):
+        """Включает или выключает отображение пробелов"""
+        self.enabled = enabled
+        if enabled:
+            self.render()
+        else:
+            self.clear()
+
+    def clear(self):
+        """Снимает разметку пробелов"""
+        for tag in WHITESPACE_TAGS:
+            self.text.tag_remove(tag, "1.0", tk.END)
+
+    def schedule_render(self):
+        """Откладывает разметку видимой области до простоя цикла событий"""
+        if self.enabled and self._render_job is None:
+            self._render_job = self.text.after_idle(self._run_scheduled_render)
+
+    def _run_scheduled_render(self):
+        self._render_job = None
+        self.render()
+
+    def render(self):
+        """Размечает пробелы в видимой области"""
+        if not self.enabled:
+            return
+        windows = visible_windows(self.views, self.VIEWPORT_MARGIN)
+        segments = window_segments(windows, self.folds)
+
+        limit = self.column_limit
+        line_spans = []
+        for low, high in segments:
+            if self.document is not None:
+                lines = self.document.lines(low, high)
+            else:
+                lines = self.text.get(f"{low + 1}.0", f"{high}.end").split("\n")
+            for row, line in enumerate(lines, low + 1):
+                if limit and len(line) > limit:
+                    line = line[:limit]
+                runs = whitespace_runs(line)
+                if runs:
+                    line_spans.append((row, runs))
+
+        self.clear()
+        apply_ranges(self.text, group_spans(line_spans, WHITESPACE_TAGS))